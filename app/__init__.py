@@ -17,14 +17,19 @@ def create_app(config_class=Config):
     
     db.init_app(app)
     migrate.init_app(app, db)
+    
+    # SQLite-Pragmas pro Verbindung (WAL, busy_timeout, ...; siehe app/sqlite_pragmas.py)
+    from app.sqlite_pragmas import install_sqlite_pragmas
+    with app.app_context():
+        install_sqlite_pragmas(app, db.engine)
     login_manager.init_app(app)
     
-    # User loader für Flask-Login
-    from app.models import User
+    # User loader für Flask-Login (mit kurzlebigem Cache, siehe app/user_cache.py)
+    from app.user_cache import load_cached_user
     @login_manager.user_loader
     def load_user(user_id):
         try:
-            return User.query.get(int(user_id))
+            return load_cached_user(int(user_id))
         except (ValueError, TypeError):
             return None
     
@@ -39,6 +44,10 @@ def create_app(config_class=Config):
     from app.routes import bp as main_bp
     app.register_blueprint(main_bp)
     
+    # CLI-Befehle registrieren
+    from app.commands import register_commands
+    register_commands(app)
+    
     # Upload-Ordner erstellen
     import os
     upload_folder = app.config.get('UPLOAD_FOLDER', 'app/static/uploads/certificates')
@@ -3,136 +3,313 @@ Backup & Restore Funktionen für die CoachManager Anwendung
 """
 from datetime import datetime, date, time
 from app import db
-from app.models import User, Certificate, Experience, TrainingPlan, TrainingActivity
+from app.models import User, Certificate, Experience, TrainingPlan, TrainingActivity, build_group_cells
+from app.storage import content_hash, is_thumbnail, create_missing_thumbnails, TEMP_PREFIX
+from app.user_cache import clear_user_cache
+from app.search import rebuild_search_index
 from flask import current_app
+from sqlalchemy import insert, or_
+import contextlib
+import hashlib
 import json
 import io
 import os
+import re
+import uuid
 import zipfile
 import shutil
+import tempfile
 
-def export_backup():
+# Anzahl Zeilen, die beim Export pro Datenbank-Batch geladen werden
+EXPORT_BATCH_SIZE = 500
+
+# Bereits komprimierte Formate werden nur gespeichert (nicht erneut deflated)
+STORED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.zip', '.gz'}
+
+# Backup-Arten im Manifest (manifest.json im ZIP)
+BACKUP_TYPE_FULL = 'full'
+BACKUP_TYPE_INCREMENTAL = 'incremental'
+MANIFEST_VERSION = 1
+
+# Obergrenze für einen einzelnen JSON-Wert (eine Zeile) beim gestreamten Lesen
+MAX_JSON_VALUE_SIZE = 16 * 1024 * 1024  # 16MB
+
+class BackupProgress:
     """
-    Exportiert alle Daten aus der Datenbank als JSON
+    Empfänger für Fortschrittsmeldungen von Backup und Restore.
+    Die Standard-Implementierung ignoriert alle Meldungen; Hintergrund-Jobs
+    (app/jobs.py) überschreiben die Methoden.
     """
-    backup_data = {
-        'version': '1.0',
-        'export_date': datetime.now().isoformat(),
-        'users': [],
-        'certificates': [],
-        'experiences': [],
-        'training_plans': [],
-        'training_activities': []
+    
+    def rows(self, table, count):
+        """count Zeilen der Tabelle table wurden verarbeitet"""
+        pass
+    
+    def file(self, size):
+        """Eine Datei mit size Bytes wurde geschrieben"""
+        pass
+
+def _isoformat(value):
+    """Gibt value.isoformat() zurück oder None"""
+    return value.isoformat() if value else None
+
+def serialize_user(user):
+    """Serialisiert einen Benutzer als JSON-kompatibles Dict"""
+    return {
+        'id': user.id,
+        'email': user.email,
+        'password_hash': user.password_hash,  # Wichtig: Passwörter werden mit exportiert
+        'full_name': user.full_name,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'license_number': user.license_number,
+        'mobile_phone': user.mobile_phone,
+        'address': user.address,
+        'zip_code': user.zip_code,
+        'city': user.city,
+        'birth_date': _isoformat(user.birth_date),
+        'team': user.team,
+        'is_admin': user.is_admin,
+        'created_date': _isoformat(user.created_date),
+        'updated_date': _isoformat(user.updated_date)
+    }
+
+def serialize_certificate(cert):
+    """Serialisiert ein Zertifikat als JSON-kompatibles Dict"""
+    return {
+        'id': cert.id,
+        'user_id': cert.user_id,
+        'title': cert.title,
+        'organization': cert.organization,
+        'acquisition_date': _isoformat(cert.acquisition_date),
+        'valid_until': _isoformat(cert.valid_until),
+        'file_url': cert.file_url,
+        'created_date': _isoformat(cert.created_date),
+        'updated_date': _isoformat(cert.updated_date)
     }
+
+def serialize_experience(exp):
+    """Serialisiert eine Erfahrung als JSON-kompatibles Dict"""
+    return {
+        'id': exp.id,
+        'user_id': exp.user_id,
+        'start_year': exp.start_year,
+        'end_year': exp.end_year,
+        'team': exp.team,
+        'position': exp.position,
+        'created_date': _isoformat(exp.created_date),
+        'updated_date': _isoformat(exp.updated_date)
+    }
+
+def serialize_training_plan(plan):
+    """Serialisiert einen Trainingsplan als JSON-kompatibles Dict"""
+    return {
+        'id': plan.id,
+        'title': plan.title,
+        'team_name': plan.team_name,
+        'start_date': _isoformat(plan.start_date),
+        'end_date': _isoformat(plan.end_date),
+        'weekday': plan.weekday,
+        'start_time': _isoformat(plan.start_time),
+        'dresscode': plan.dresscode,
+        'focus': plan.focus,
+        'goals': plan.goals,
+        'sort_order': plan.sort_order,
+        'created_date': _isoformat(plan.created_date),
+        'updated_date': _isoformat(plan.updated_date)
+    }
+
+def serialize_training_activity(activity):
+    """Serialisiert eine Trainingsaktivität als JSON-kompatibles Dict"""
+    return {
+        'id': activity.id,
+        'plan_id': activity.plan_id,
+        'time_from': _isoformat(activity.time_from),
+        'time_to': _isoformat(activity.time_to),
+        'duration_minutes': activity.duration_minutes,
+        'activity_name': activity.activity_name,
+        'activity_type': activity.activity_type,
+        'group_activities': activity.group_activities,
+        'groups': activity.groups,
+        'notes': activity.notes,
+        'order': activity.order,
+        'created_date': _isoformat(activity.created_date),
+        'updated_date': _isoformat(activity.updated_date)
+    }
+
+# Tabellen in Export-Reihenfolge: (JSON-Schlüssel, Model, Serializer)
+# Die Reihenfolge ist wichtig, da der Import Benutzer vor abhängigen Daten erwartet
+BACKUP_TABLES = [
+    ('users', User, serialize_user),
+    ('certificates', Certificate, serialize_certificate),
+    ('experiences', Experience, serialize_experience),
+    ('training_plans', TrainingPlan, serialize_training_plan),
+    ('training_activities', TrainingActivity, serialize_training_activity)
+]
+
+def write_backup_json(stream, progress=None, since=None):
+    """
+    Schreibt alle Daten als JSON in einen Text-Stream.
+    
+    Die Tabellen werden batchweise gelesen und jede Zeile wird sofort
+    geschrieben, dadurch bleibt der Speicherbedarf konstant. Die Ausgabe ist
+    identisch mit json.dumps(..., indent=2, ensure_ascii=False).
+    
+    Args:
+        stream: Text-Stream, in den geschrieben wird
+        progress: Optionales BackupProgress-Objekt
+        since: Optionaler Zeitpunkt (UTC); nur seither geänderte Zeilen werden exportiert
     
-    # Exportiere alle Benutzer
-    users = User.query.all()
-    for user in users:
-        user_data = {
-            'id': user.id,
-            'email': user.email,
-            'password_hash': user.password_hash,  # Wichtig: Passwörter werden mit exportiert
-            'full_name': user.full_name,
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'license_number': user.license_number,
-            'mobile_phone': user.mobile_phone,
-            'address': user.address,
-            'zip_code': user.zip_code,
-            'city': user.city,
-            'birth_date': user.birth_date.isoformat() if user.birth_date else None,
-            'team': user.team,
-            'is_admin': user.is_admin,
-            'created_date': user.created_date.isoformat() if user.created_date else None,
-            'updated_date': user.updated_date.isoformat() if user.updated_date else None
-        }
-        backup_data['users'].append(user_data)
-    
-    # Exportiere alle Zertifikate
-    certificates = Certificate.query.all()
-    for cert in certificates:
-        cert_data = {
-            'id': cert.id,
-            'user_id': cert.user_id,
-            'title': cert.title,
-            'organization': cert.organization,
-            'acquisition_date': cert.acquisition_date.isoformat() if cert.acquisition_date else None,
-            'valid_until': cert.valid_until.isoformat() if cert.valid_until else None,
-            'file_url': cert.file_url,
-            'created_date': cert.created_date.isoformat() if cert.created_date else None,
-            'updated_date': cert.updated_date.isoformat() if cert.updated_date else None
-        }
-        backup_data['certificates'].append(cert_data)
-    
-    # Exportiere alle Erfahrungen
-    experiences = Experience.query.all()
-    for exp in experiences:
-        exp_data = {
-            'id': exp.id,
-            'user_id': exp.user_id,
-            'start_year': exp.start_year,
-            'end_year': exp.end_year,
-            'team': exp.team,
-            'position': exp.position,
-            'created_date': exp.created_date.isoformat() if exp.created_date else None,
-            'updated_date': exp.updated_date.isoformat() if exp.updated_date else None
-        }
-        backup_data['experiences'].append(exp_data)
-    
-    # Exportiere alle Trainingspläne
-    training_plans = TrainingPlan.query.all()
-    for plan in training_plans:
-        plan_data = {
-            'id': plan.id,
-            'title': plan.title,
-            'team_name': plan.team_name,
-            'start_date': plan.start_date.isoformat() if plan.start_date else None,
-            'end_date': plan.end_date.isoformat() if plan.end_date else None,
-            'weekday': plan.weekday,
-            'start_time': plan.start_time.isoformat() if plan.start_time else None,
-            'dresscode': plan.dresscode,
-            'focus': plan.focus,
-            'goals': plan.goals,
-            'sort_order': plan.sort_order,
-            'created_date': plan.created_date.isoformat() if plan.created_date else None,
-            'updated_date': plan.updated_date.isoformat() if plan.updated_date else None
-        }
-        backup_data['training_plans'].append(plan_data)
-    
-    # Exportiere alle Trainingsaktivitäten
-    activities = TrainingActivity.query.all()
-    for activity in activities:
-        activity_data = {
-            'id': activity.id,
-            'plan_id': activity.plan_id,
-            'time_from': activity.time_from.isoformat() if activity.time_from else None,
-            'time_to': activity.time_to.isoformat() if activity.time_to else None,
-            'duration_minutes': activity.duration_minutes,
-            'activity_name': activity.activity_name,
-            'activity_type': activity.activity_type,
-            'group_activities': activity.group_activities,
-            'groups': activity.groups,
-            'notes': activity.notes,
-            'order': activity.order,
-            'created_date': activity.created_date.isoformat() if activity.created_date else None,
-            'updated_date': activity.updated_date.isoformat() if activity.updated_date else None
-        }
-        backup_data['training_activities'].append(activity_data)
-    
-    return json.dumps(backup_data, indent=2, ensure_ascii=False)
-
-def create_backup_zip():
+    Returns:
+        Dict mit der Anzahl exportierter Zeilen pro Tabelle
+    """
+    progress = progress or BackupProgress()
+    stats = {}
+    stream.write('{\n')
+    stream.write('  "version": "1.0",\n')
+    stream.write(f'  "export_date": {json.dumps(datetime.now().isoformat())}')
+    
+    for key, model, serialize in BACKUP_TABLES:
+        stream.write(f',\n  "{key}": [')
+        count = 0
+        query = model.query
+        if since is not None:
+            # >= statt >: Zeilen, die während des Basis-Backups geändert wurden, nicht verpassen
+            query = query.filter(or_(model.updated_date >= since, model.updated_date.is_(None)))
+        for row in query.order_by(model.id).yield_per(EXPORT_BATCH_SIZE):
+            row_json = json.dumps(serialize(row), indent=2, ensure_ascii=False)
+            stream.write(',\n    ' if count else '\n    ')
+            stream.write(row_json.replace('\n', '\n    '))
+            count += 1
+            if count % EXPORT_BATCH_SIZE == 0:
+                progress.rows(key, EXPORT_BATCH_SIZE)
+        progress.rows(key, count % EXPORT_BATCH_SIZE)
+        stream.write('\n  ]' if count else ']')
+        stats[key] = count
+    
+    stream.write('\n}')
+    return stats
+
+def export_backup():
+    """
+    Exportiert alle Daten aus der Datenbank als JSON
+    """
+    output = io.StringIO()
+    write_backup_json(output)
+    return output.getvalue()
+
+def _manifest_folder():
+    folder = current_app.config['BACKUP_MANIFEST_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def save_backup_manifest(manifest):
+    """Speichert das Manifest eines erstellten Backups als Basis für inkrementelle Backups"""
+    folder = _manifest_folder()
+    for name in (f"{manifest['backup_id']}.json", 'latest.json'):
+        path = os.path.join(folder, name)
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(f'{path}.tmp', path)
+
+def load_backup_manifest(backup_id=None):
+    """
+    Lädt das Manifest eines früheren Backups (Standard: das zuletzt erstellte).
+    Gibt None zurück, wenn kein passendes Manifest vorhanden ist.
+    """
+    if backup_id is not None and not re.fullmatch(r'[0-9a-f]{32}', backup_id):
+        return None
+    path = os.path.join(_manifest_folder(), f'{backup_id}.json' if backup_id else 'latest.json')
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def forget_latest_backup_manifest():
+    """
+    Nach einem Restore stimmen die IDs in der Datenbank nicht mehr mit den
+    Manifesten überein - das nächste Backup muss wieder ein vollständiges sein.
+    """
+    try:
+        os.remove(os.path.join(_manifest_folder(), 'latest.json'))
+    except OSError:
+        pass
+
+def _file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def backup_filename(incremental=False):
+    """Download-Name eines Backups (inkrementelle Backups sind am Namen erkennbar)"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    kind = 'incremental_' if incremental else ''
+    return f'coaches_backup_{kind}{timestamp}.zip'
+
+def create_backup_zip(fileobj=None, progress=None, incremental=False, base_id=None):
     """
     Erstellt ein ZIP-Archiv mit JSON-Daten und allen hochgeladenen Dateien
+    
+    Ohne fileobj wird das Archiv in eine SpooledTemporaryFile geschrieben:
+    kleine Backups bleiben im Speicher, größere werden ab BACKUP_SPOOL_MAX_SIZE
+    auf die Festplatte ausgelagert. Die JSON-Daten werden direkt in das ZIP
+    gestreamt.
+    
+    Jedes Backup enthält ein manifest.json mit den IDs aller vorhandenen
+    Zeilen und den SHA-256-Hashes aller Upload-Dateien. Ein inkrementelles
+    Backup enthält nur Zeilen, die seit dem Basis-Backup geändert wurden, und
+    nur neue oder geänderte Dateien; gelöschte Einträge ergeben sich beim
+    Restore aus den ID-Listen.
+    
+    Args:
+        fileobj: Optionales, beschreibbares Binär-Dateiobjekt als Ziel
+        progress: Optionales BackupProgress-Objekt
+        incremental: Wenn True, nur Änderungen seit dem Basis-Backup sichern
+        base_id: ID des Basis-Backups (Standard: das zuletzt erstellte Backup)
+    
+    Returns:
+        Dateiobjekt (auf Position 0), das vom Aufrufer geschlossen wird
     """
-    backup_json = export_backup()
+    progress = progress or BackupProgress()
+    base_manifest = None
+    if incremental:
+        base_manifest = load_backup_manifest(base_id)
+        if base_manifest is None:
+            raise ValueError('Kein Basis-Backup gefunden - bitte zuerst ein vollständiges Backup erstellen.')
+    
+    # Zeitpunkt vor dem Export: spätere Änderungen landen im nächsten inkrementellen Backup
+    started = datetime.utcnow()
+    since = datetime.fromisoformat(base_manifest['created']) if base_manifest else None
+    base_files = base_manifest['files'] if base_manifest else {}
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'backup_id': uuid.uuid4().hex,
+        'type': BACKUP_TYPE_INCREMENTAL if base_manifest else BACKUP_TYPE_FULL,
+        'base_id': base_manifest['backup_id'] if base_manifest else None,
+        'since': _isoformat(since),
+        'created': started.isoformat(),
+        'tables': {
+            key: [row_id for (row_id,) in db.session.query(model.id).order_by(model.id)]
+            for key, model, serialize in BACKUP_TABLES
+        },
+        'files': {}
+    }
     
-    # Erstelle ZIP im Speicher
-    zip_buffer = io.BytesIO()
+    zip_buffer = fileobj
+    if zip_buffer is None:
+        zip_buffer = tempfile.SpooledTemporaryFile(
+            max_size=current_app.config.get('BACKUP_SPOOL_MAX_SIZE', 16 * 1024 * 1024),
+            dir=current_app.config.get('BACKUP_TEMP_DIR') or None
+        )
     
     with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        # Füge JSON-Daten hinzu
-        zip_file.writestr('backup.json', backup_json)
+        # Füge JSON-Daten hinzu (gestreamt, ohne den ganzen String im Speicher)
+        with zip_file.open('backup.json', 'w', force_zip64=True) as raw_json:
+            with io.TextIOWrapper(raw_json, encoding='utf-8') as json_stream:
+                write_backup_json(json_stream, progress=progress, since=since)
         
         # Füge alle hochgeladenen Zertifikatsdateien hinzu
         upload_folder = current_app.config['UPLOAD_FOLDER']
@@ -147,6 +324,10 @@ def create_backup_zip():
                     for file in files:
                         file_path = os.path.join(root, file)
                         
+                        # Unvollständige Uploads und (jederzeit neu erzeugbare) Vorschaubilder überspringen
+                        if file.startswith(TEMP_PREFIX) or is_thumbnail(file):
+                            continue
+                        
                         # Prüfe ob Datei wirklich existiert und lesbar ist
                         if not os.path.isfile(file_path):
                             current_app.logger.warning(f"Backup: Überspringe {file_path} (keine Datei)")
@@ -159,14 +340,34 @@ def create_backup_zip():
                         #      arcname = certificates/file.pdf
                         try:
                             arcname = os.path.relpath(file_path, upload_base_dir)
-                            zip_file.write(file_path, arcname=f'uploads/{arcname}')
+                            stat = os.stat(file_path)
+                            
+                            # Inhaltsadressierte Dateien tragen den Hash im Namen; sonst den Hash nur
+                            # neu berechnen, wenn sich Größe oder Änderungszeit geändert haben
+                            base_entry = base_files.get(arcname)
+                            sha256 = content_hash(os.path.relpath(file_path, upload_folder))
+                            if sha256 is None:
+                                if base_entry and base_entry['size'] == stat.st_size and base_entry['mtime'] == stat.st_mtime:
+                                    sha256 = base_entry['sha256']
+                                else:
+                                    sha256 = _file_sha256(file_path)
+                            manifest['files'][arcname] = {'sha256': sha256, 'size': stat.st_size, 'mtime': stat.st_mtime}
+                            
+                            # Inkrementell: unveränderte Dateien sind bereits im Basis-Backup
+                            if base_entry and base_entry['sha256'] == sha256:
+                                continue
+                            
+                            ext = os.path.splitext(file)[1].lower()
+                            compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                            zip_file.write(file_path, arcname=f'uploads/{arcname}', compress_type=compress_type)
                             files_added += 1
+                            progress.file(stat.st_size)
                             current_app.logger.debug(f"Backup: Datei hinzugefügt: {file_path} -> uploads/{arcname}")
                         except Exception as e:
                             current_app.logger.error(f"Backup: Fehler beim Hinzufügen von {file_path}: {e}")
                             continue
                 
-                if files_added == 0:
+                if files_added == 0 and not base_manifest:
                     current_app.logger.warning(f"Backup: Keine Dateien im Upload-Ordner gefunden: {upload_folder}")
                 else:
                     current_app.logger.info(f"Backup: {files_added} Dateien zum ZIP hinzugefügt")
@@ -174,31 +375,192 @@ def create_backup_zip():
                 current_app.logger.error(f"Backup: Fehler beim Durchsuchen des Upload-Ordners: {e}")
         else:
             current_app.logger.warning(f"Backup: Upload-Ordner existiert nicht: {upload_folder}")
+        
+        zip_file.writestr('manifest.json', json.dumps(manifest))
     
+    save_backup_manifest(manifest)
     zip_buffer.seek(0)
     return zip_buffer
 
-def restore_backup_from_zip(zip_file, clear_existing=False):
+def read_backup_manifest(zip_ref):
+    """Liest manifest.json aus einem geöffneten ZIP (None bei älteren Backups ohne Manifest)"""
+    if 'manifest.json' not in zip_ref.namelist():
+        return None
+    with zip_ref.open('manifest.json') as f:
+        return json.load(f)
+
+def order_backup_chain(manifests):
+    """
+    Bringt die Manifeste einer Backup-Kette in Restore-Reihenfolge:
+    vollständiges Backup zuerst, danach jedes inkrementelle Backup nach seiner Basis.
+    
+    Returns:
+        Liste der Indizes in manifests
+    
+    Raises:
+        ValueError: Wenn die Backups keine lückenlose Kette bilden
+    """
+    if any(manifest is None for manifest in manifests):
+        raise ValueError('Ältere Backups ohne manifest.json können nur einzeln wiederhergestellt werden.')
+    
+    full = [i for i, manifest in enumerate(manifests) if manifest['type'] == BACKUP_TYPE_FULL]
+    if len(full) != 1:
+        raise ValueError('Die Backup-Kette muss genau ein vollständiges Backup enthalten.')
+    
+    by_base = {}
+    for i, manifest in enumerate(manifests):
+        if manifest['type'] == BACKUP_TYPE_INCREMENTAL:
+            if manifest['base_id'] in by_base:
+                raise ValueError('Die Backup-Kette enthält mehrere Backups mit derselben Basis.')
+            by_base[manifest['base_id']] = i
+    
+    chain = full
+    while manifests[chain[-1]]['backup_id'] in by_base:
+        chain.append(by_base.pop(manifests[chain[-1]]['backup_id']))
+    if by_base:
+        raise ValueError('Die Backup-Kette ist unvollständig: Zu mindestens einem inkrementellen Backup fehlt die Basis.')
+    return chain
+
+def _merge_chain_rows(base_rows, newer_rows, live_ids):
+    """
+    Liefert die Zeilen einer Tabelle im Stand des letzten Backups der Kette:
+    Zeilen des Basis-Backups, ersetzt durch neuere Versionen, ohne gelöschte Zeilen.
+    """
+    for row in base_rows:
+        if row['id'] in live_ids and row['id'] not in newer_rows:
+            yield row
+    for row_id in sorted(newer_rows):
+        if row_id in live_ids:
+            yield newer_rows[row_id]
+
+def restore_backup_chain(zip_files, clear_existing=False, progress=None):
+    """
+    Stellt eine Kette aus einem vollständigen und beliebig vielen
+    inkrementellen Backups wieder her (Reihenfolge der Dateien egal).
+    
+    Die Zeilen werden über (Tabelle, ursprüngliche ID) zusammengeführt; die
+    jeweils neueste Version gewinnt, gelöschte Zeilen werden anhand der
+    ID-Listen im letzten Manifest weggelassen. Das Basis-Backup wird
+    gestreamt, nur die (kleinen) inkrementellen Backups werden im Speicher
+    zusammengeführt.
+    
+    Args:
+        zip_files: Liste von ZIP-Dateien (Dateiobjekte oder Pfade)
+        clear_existing: Wenn True, werden alle bestehenden Daten gelöscht
+        progress: Optionales BackupProgress-Objekt
+    
+    Returns:
+        Tuple (success: bool, message: str, stats: dict)
+    """
+    progress = progress or BackupProgress()
+    if len(zip_files) == 1:
+        return restore_backup_from_zip(zip_files[0], clear_existing=clear_existing, progress=progress)
+    
+    table_keys = {key for key, model, serialize in BACKUP_TABLES}
+    try:
+        with contextlib.ExitStack() as stack:
+            zip_refs = [stack.enter_context(zipfile.ZipFile(zip_file, 'r')) for zip_file in zip_files]
+            manifests = [read_backup_manifest(zip_ref) for zip_ref in zip_refs]
+            try:
+                chain = order_backup_chain(manifests)
+            except ValueError as e:
+                return False, str(e), {}
+            
+            final_manifest = manifests[chain[-1]]
+            live_ids = {key: set(final_manifest['tables'].get(key, [])) for key in table_keys}
+            
+            # Neuere Versionen aus den inkrementellen Backups (spätere überschreiben frühere)
+            newer_rows = {key: {} for key in table_keys}
+            for index in chain[1:]:
+                with zip_refs[index].open('backup.json') as raw_json:
+                    reader = JSONStreamReader(io.TextIOWrapper(raw_json, encoding='utf-8'))
+                    for key, rows in reader.iter_members():
+                        if key in table_keys:
+                            for row in rows:
+                                newer_rows[key][row['id']] = row
+            
+            # Basis-Backup streamen und mit den neueren Versionen zusammenführen
+            importer = BackupImporter(clear_existing=clear_existing, progress=progress)
+            importer.start()
+            with zip_refs[chain[0]].open('backup.json') as raw_json:
+                reader = JSONStreamReader(io.TextIOWrapper(raw_json, encoding='utf-8'))
+                for key, rows in reader.iter_members():
+                    if key in table_keys:
+                        importer.import_rows(key, _merge_chain_rows(rows, newer_rows[key], live_ids[key]))
+            success, message, stats = importer.finish()
+            
+            # Dateien in Ketten-Reihenfolge extrahieren (neuere überschreiben ältere)
+            upload_folder = current_app.config['UPLOAD_FOLDER']
+            os.makedirs(upload_folder, exist_ok=True)
+            restored_files = set()
+            for index in chain:
+                for file_info in zip_refs[index].filelist:
+                    if not file_info.filename.startswith('uploads/') or file_info.is_dir():
+                        continue
+                    relative_path = file_info.filename[len('uploads/'):]
+                    # Dateien, die im letzten Backup nicht mehr vorhanden sind, wurden gelöscht
+                    if relative_path not in final_manifest['files']:
+                        continue
+                    target_path = _upload_target_path(upload_folder, relative_path)
+                    if target_path is None:
+                        current_app.logger.warning(f"Restore: Überspringe {file_info.filename} (ungültiger Pfad)")
+                        continue
+                    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                    with zip_refs[index].open(file_info.filename) as source:
+                        with open(target_path, 'wb') as target:
+                            shutil.copyfileobj(source, target)
+                    restored_files.add(relative_path)
+                    progress.file(file_info.file_size)
+        
+        create_missing_thumbnails()
+        message += f" {len(restored_files)} Dateien aus {len(chain)} Backups wiederhergestellt."
+        stats['files'] = len(restored_files)
+        return success, message, stats
+    
+    except Exception as e:
+        db.session.rollback()
+        return False, f"Fehler beim Wiederherstellen der Backup-Kette: {str(e)}", {}
+
+def _upload_target_path(upload_folder, relative_path):
+    """
+    Zielpfad einer Datei aus dem uploads/ Ordner eines Backups.
+    Die Pfade im ZIP sind relativ zum übergeordneten Ordner des UPLOAD_FOLDER
+    (z.B. certificates/file.pdf); Pfade ausserhalb davon werden abgelehnt (None).
+    """
+    upload_base_dir = os.path.abspath(os.path.dirname(upload_folder))
+    target_path = os.path.abspath(os.path.join(upload_base_dir, relative_path))
+    if not target_path.startswith(upload_base_dir + os.sep):
+        return None
+    return target_path
+
+def restore_backup_from_zip(zip_file, clear_existing=False, progress=None):
     """
     Stellt Daten aus einem ZIP-Backup wieder her
     
     Args:
-        zip_file: Geöffnete ZIP-Datei
+        zip_file: Geöffnete ZIP-Datei (oder Pfad)
         clear_existing: Wenn True, werden alle bestehenden Daten gelöscht
+        progress: Optionales BackupProgress-Objekt
     
     Returns:
         Tuple (success: bool, message: str, stats: dict)
     """
+    progress = progress or BackupProgress()
     try:
         with zipfile.ZipFile(zip_file, 'r') as zip_ref:
             # Extrahiere JSON-Daten
             if 'backup.json' not in zip_ref.namelist():
                 return False, "Keine backup.json im ZIP-Archiv gefunden.", {}
             
-            backup_json = zip_ref.read('backup.json').decode('utf-8')
+            manifest = read_backup_manifest(zip_ref)
+            if manifest and manifest['type'] == BACKUP_TYPE_INCREMENTAL:
+                return False, "Inkrementelle Backups können nur zusammen mit ihrem Basis-Backup wiederhergestellt werden.", {}
             
-            # Importiere Daten
-            success, message, stats = import_backup(backup_json, clear_existing=clear_existing)
+            # Importiere Daten (inkrementell direkt aus dem ZIP-Eintrag gelesen)
+            with zip_ref.open('backup.json') as raw_json:
+                json_stream = io.TextIOWrapper(raw_json, encoding='utf-8')
+                success, message, stats = import_backup_stream(json_stream, clear_existing=clear_existing,
+                                                               progress=progress)
             
             if not success:
                 return False, message, stats
@@ -213,7 +575,10 @@ def restore_backup_from_zip(zip_file, clear_existing=False):
                 if file_info.filename.startswith('uploads/') and not file_info.is_dir():
                     # Entferne 'uploads/' Präfix
                     relative_path = file_info.filename[len('uploads/'):]
-                    target_path = os.path.join(upload_folder, relative_path)
+                    target_path = _upload_target_path(upload_folder, relative_path)
+                    if target_path is None:
+                        current_app.logger.warning(f"Restore: Überspringe {file_info.filename} (ungültiger Pfad)")
+                        continue
                     
                     # Stelle sicher, dass das Verzeichnis existiert
                     os.makedirs(os.path.dirname(target_path), exist_ok=True)
@@ -223,7 +588,9 @@ def restore_backup_from_zip(zip_file, clear_existing=False):
                         with open(target_path, 'wb') as target:
                             shutil.copyfileobj(source, target)
                     files_restored += 1
+                    progress.file(file_info.file_size)
             
+            create_missing_thumbnails()
             message += f" {files_restored} Dateien wiederhergestellt."
             stats['files'] = files_restored
             
@@ -233,67 +600,85 @@ def restore_backup_from_zip(zip_file, clear_existing=False):
         db.session.rollback()
         return False, f"Fehler beim Wiederherstellen aus ZIP: {str(e)}", {}
 
-def import_backup(backup_json, clear_existing=False):
+def _parse_date(date_str):
+    """Konvertiert einen String zu einem date-Objekt"""
+    if not date_str:
+        return None
+    try:
+        if isinstance(date_str, str):
+            if len(date_str) == 10:  # YYYY-MM-DD Format
+                return date.fromisoformat(date_str)
+            else:
+                # Falls datetime String, extrahiere nur das Datum
+                return datetime.fromisoformat(date_str).date()
+        return date_str
+    except (ValueError, AttributeError):
+        try:
+            return datetime.fromisoformat(date_str).date()
+        except:
+            return None
+
+def _parse_time(time_str):
+    """Konvertiert einen String zu einem time-Objekt"""
+    if not time_str:
+        return None
+    try:
+        if isinstance(time_str, str):
+            # Versuche zuerst time.fromisoformat (für reine Zeitstrings wie HH:MM:SS)
+            if 'T' not in time_str and len(time_str) <= 8:
+                return time.fromisoformat(time_str)
+            else:
+                # Falls datetime String, extrahiere nur die Zeit
+                return datetime.fromisoformat(time_str).time()
+        return time_str
+    except (ValueError, AttributeError):
+        try:
+            return datetime.fromisoformat(time_str).time()
+        except:
+            return None
+
+def _chunked(rows, size):
+    """Teilt ein Iterable in Listen mit höchstens size Elementen"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class BackupImporter:
     """
-    Importiert Daten aus einem Backup-JSON
+    Importiert Backup-Daten tabellenweise mit Bulk-Inserts.
     
-    Args:
-        backup_json: JSON-String mit den Backup-Daten
-        clear_existing: Wenn True, werden alle bestehenden Daten gelöscht
+    Die Zeilen werden in Chunks von batch_size Zeilen per executemany
+    eingefügt. Bestehende E-Mail-Adressen werden einmalig vorab geladen, die
+    neuen Benutzer-IDs über eine einzige Abfrage nach dem Einfügen ermittelt
+    und neue Plan-IDs direkt per RETURNING übernommen.
     
-    Returns:
-        Tuple (success: bool, message: str, stats: dict)
+    Verwendung:
+        importer = BackupImporter(clear_existing=True)
+        importer.start()
+        importer.import_rows('users', rows)
+        ...
+        success, message, stats = importer.finish()
     """
-    try:
-        backup_data = json.loads(backup_json)
-        
-        # Helper-Funktionen für Datum/Zeit-Konvertierung
-        def parse_date(date_str):
-            """Konvertiert einen String zu einem date-Objekt"""
-            if not date_str:
-                return None
-            try:
-                if isinstance(date_str, str):
-                    if len(date_str) == 10:  # YYYY-MM-DD Format
-                        return date.fromisoformat(date_str)
-                    else:
-                        # Falls datetime String, extrahiere nur das Datum
-                        return datetime.fromisoformat(date_str).date()
-                return date_str
-            except (ValueError, AttributeError):
-                try:
-                    return datetime.fromisoformat(date_str).date()
-                except:
-                    return None
-        
-        def parse_time(time_str):
-            """Konvertiert einen String zu einem time-Objekt"""
-            if not time_str:
-                return None
-            try:
-                if isinstance(time_str, str):
-                    # Versuche zuerst time.fromisoformat (für reine Zeitstrings wie HH:MM:SS)
-                    if 'T' not in time_str and len(time_str) <= 8:
-                        return time.fromisoformat(time_str)
-                    else:
-                        # Falls datetime String, extrahiere nur die Zeit
-                        return datetime.fromisoformat(time_str).time()
-                return time_str
-            except (ValueError, AttributeError):
-                try:
-                    return datetime.fromisoformat(time_str).time()
-                except:
-                    return None
-        
-        stats = {
-            'users': 0,
-            'certificates': 0,
-            'experiences': 0,
-            'training_plans': 0,
-            'training_activities': 0
-        }
-        
-        if clear_existing:
+    
+    def __init__(self, clear_existing=False, batch_size=None, progress=None):
+        self.clear_existing = clear_existing
+        self.progress = progress or BackupProgress()
+        self.batch_size = batch_size or current_app.config.get('RESTORE_BATCH_SIZE', 500)
+        self.stats = {key: 0 for key, model, serialize in BACKUP_TABLES}
+        self.existing_emails = set()
+        self.backup_user_emails = {}  # Benutzer-ID im Backup -> E-Mail
+        self.email_to_user_id = None  # E-Mail -> Benutzer-ID in der Datenbank (lazy)
+        self.plan_id_mapping = {}  # Plan-ID im Backup -> neue Plan-ID
+        self.backup_user_position = 0
+    
+    def start(self):
+        """Bereitet den Import vor (löscht ggf. bestehende Daten)"""
+        if self.clear_existing:
             # Lösche alle bestehenden Daten (in umgekehrter Reihenfolge wegen Foreign Keys)
             TrainingActivity.query.delete()
             TrainingPlan.query.delete()
@@ -301,137 +686,330 @@ def import_backup(backup_json, clear_existing=False):
             Certificate.query.delete()
             User.query.delete()
             db.session.commit()
+        else:
+            # Alle bestehenden E-Mail-Adressen mit einer einzigen Abfrage laden
+            self.existing_emails = {email for (email,) in db.session.query(User.email)}
+    
+    def import_rows(self, table, rows):
+        """Importiert die Zeilen einer Tabelle (Iterable von Dicts) in Chunks"""
+        handler = getattr(self, f'_import_{table}', None)
+        if handler is None:
+            return
+        for chunk in _chunked(rows, self.batch_size):
+            handler(chunk)
+            self.progress.rows(table, len(chunk))
+    
+    def finish(self):
+        """Schließt den Import ab und gibt (success, message, stats) zurück"""
+        db.session.commit()
+        forget_latest_backup_manifest()
+        clear_user_cache()  # Benutzer wurden per Bulk-Delete/Insert ohne ORM-Events geändert
+        rebuild_search_index()  # dito für den Suchindex
+        stats = self.stats
+        message = f"Backup erfolgreich importiert: {stats['users']} Benutzer, {stats['certificates']} Zertifikate, {stats['experiences']} Erfahrungen, {stats['training_plans']} Trainingspläne, {stats['training_activities']} Aktivitäten"
+        return True, message, stats
+    
+    def _user_id_for(self, backup_user_id):
+        """Ermittelt die Datenbank-ID zu einer Benutzer-ID aus dem Backup (über die E-Mail)"""
+        if self.email_to_user_id is None:
+            # Eine einzige Abfrage nach dem Einfügen aller Benutzer
+            self.email_to_user_id = dict(db.session.query(User.email, User.id))
+        user_email = self.backup_user_emails.get(backup_user_id)
+        if not user_email:
+            return None
+        return self.email_to_user_id.get(user_email)
+    
+    def _import_users(self, rows):
+        mappings = []
+        for user_data in rows:
+            self.backup_user_position += 1
+            # Ältere Backups ohne ID: Position in der Liste entspricht der ID
+            self.backup_user_emails[user_data.get('id', self.backup_user_position)] = user_data['email']
+            
+            # Überspringe existierende (und doppelte) Benutzer
+            if user_data['email'] in self.existing_emails:
+                continue
+            self.existing_emails.add(user_data['email'])
+            
+            mappings.append({
+                'email': user_data['email'],
+                'password_hash': user_data.get('password_hash', ''),
+                'full_name': user_data.get('full_name'),
+                'first_name': user_data.get('first_name'),
+                'last_name': user_data.get('last_name'),
+                'license_number': user_data.get('license_number'),
+                'mobile_phone': user_data.get('mobile_phone'),
+                'address': user_data.get('address'),
+                'zip_code': user_data.get('zip_code'),
+                'city': user_data.get('city'),
+                'birth_date': _parse_date(user_data.get('birth_date')),
+                'team': user_data.get('team'),
+                'is_admin': user_data.get('is_admin', False)
+            })
         
-        # Importiere Benutzer
-        if 'users' in backup_data:
-            for user_data in backup_data['users']:
-                # Prüfe ob Benutzer bereits existiert
-                existing_user = User.query.filter_by(email=user_data['email']).first()
-                if existing_user and not clear_existing:
-                    continue  # Überspringe existierende Benutzer
-                
-                user = User(
-                    email=user_data['email'],
-                    password_hash=user_data.get('password_hash', ''),
-                    full_name=user_data.get('full_name'),
-                    first_name=user_data.get('first_name'),
-                    last_name=user_data.get('last_name'),
-                    license_number=user_data.get('license_number'),
-                    mobile_phone=user_data.get('mobile_phone'),
-                    address=user_data.get('address'),
-                    zip_code=user_data.get('zip_code'),
-                    city=user_data.get('city'),
-                    birth_date=parse_date(user_data.get('birth_date')),
-                    team=user_data.get('team'),
-                    is_admin=user_data.get('is_admin', False)
-                )
-                db.session.add(user)
-                stats['users'] += 1
-        
-        db.session.flush()  # Um IDs zu erhalten
+        if mappings:
+            db.session.execute(insert(User), mappings)
+            self.stats['users'] += len(mappings)
+        # Neue Benutzer sind im E-Mail-Mapping noch nicht enthalten
+        self.email_to_user_id = None
+    
+    def _import_certificates(self, rows):
+        mappings = []
+        for cert_data in rows:
+            user_id = self._user_id_for(cert_data['user_id'])
+            if not user_id:
+                continue
+            mappings.append({
+                'user_id': user_id,
+                'title': cert_data['title'],
+                'organization': cert_data['organization'],
+                'acquisition_date': _parse_date(cert_data.get('acquisition_date')),
+                'valid_until': _parse_date(cert_data.get('valid_until')),
+                'file_url': cert_data.get('file_url')
+            })
         
-        # Erstelle Mapping von alter E-Mail zu neuer User-ID
-        email_to_user_id = {}
-        for user in User.query.all():
-            email_to_user_id[user.email] = user.id
+        if mappings:
+            db.session.execute(insert(Certificate), mappings)
+            self.stats['certificates'] += len(mappings)
+    
+    def _import_experiences(self, rows):
+        mappings = []
+        for exp_data in rows:
+            user_id = self._user_id_for(exp_data['user_id'])
+            if not user_id:
+                continue
+            mappings.append({
+                'user_id': user_id,
+                'start_year': exp_data['start_year'],
+                'end_year': exp_data.get('end_year'),
+                'team': exp_data['team'],
+                'position': exp_data['position']
+            })
         
-        # Importiere Zertifikate
-        if 'certificates' in backup_data:
-            for cert_data in backup_data['certificates']:
-                # Finde Benutzer per E-Mail aus dem Backup
-                user_email = None
-                if 'users' in backup_data and cert_data['user_id'] <= len(backup_data['users']):
-                    user_email = backup_data['users'][cert_data['user_id']-1]['email']
-                
-                if not user_email or user_email not in email_to_user_id:
-                    continue
-                
-                user_id = email_to_user_id[user_email]
-                
-                cert = Certificate(
-                    user_id=user_id,
-                    title=cert_data['title'],
-                    organization=cert_data['organization'],
-                    acquisition_date=parse_date(cert_data.get('acquisition_date')),
-                    valid_until=parse_date(cert_data.get('valid_until')),
-                    file_url=cert_data.get('file_url')
-                )
-                db.session.add(cert)
-                stats['certificates'] += 1
+        if mappings:
+            db.session.execute(insert(Experience), mappings)
+            self.stats['experiences'] += len(mappings)
+    
+    def _import_training_plans(self, rows):
+        old_ids = []
+        mappings = []
+        for plan_data in rows:
+            old_ids.append(plan_data['id'])
+            mappings.append({
+                'title': plan_data['title'],
+                'team_name': plan_data['team_name'],
+                'start_date': _parse_date(plan_data.get('start_date')),
+                'end_date': _parse_date(plan_data.get('end_date')),
+                'weekday': plan_data['weekday'],
+                'start_time': _parse_time(plan_data.get('start_time')),
+                'dresscode': plan_data.get('dresscode'),
+                'focus': plan_data.get('focus'),
+                'goals': plan_data.get('goals'),
+                'sort_order': plan_data.get('sort_order', 0)
+            })
         
-        # Importiere Erfahrungen
-        if 'experiences' in backup_data:
-            for exp_data in backup_data['experiences']:
-                # Finde Benutzer per E-Mail aus dem Backup
-                user_email = None
-                if 'users' in backup_data and exp_data['user_id'] <= len(backup_data['users']):
-                    user_email = backup_data['users'][exp_data['user_id']-1]['email']
-                
-                if not user_email or user_email not in email_to_user_id:
-                    continue
-                
-                user_id = email_to_user_id[user_email]
-                
-                exp = Experience(
-                    user_id=user_id,
-                    start_year=exp_data['start_year'],
-                    end_year=exp_data.get('end_year'),
-                    team=exp_data['team'],
-                    position=exp_data['position']
-                )
-                db.session.add(exp)
-                stats['experiences'] += 1
+        if db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+            # Neue IDs in derselben Reihenfolge wie die Parameter zurückgeben lassen
+            result = db.session.execute(
+                insert(TrainingPlan).returning(TrainingPlan.id, sort_by_parameter_order=True),
+                mappings
+            )
+            new_ids = result.scalars().all()
+        else:
+            # Fallback für Datenbanken ohne executemany + RETURNING
+            new_ids = [
+                db.session.execute(insert(TrainingPlan).values(**mapping)).inserted_primary_key[0]
+                for mapping in mappings
+            ]
         
-        # Importiere Trainingspläne
-        plan_id_mapping = {}  # Alte ID -> Neue ID
-        if 'training_plans' in backup_data:
-            for plan_data in backup_data['training_plans']:
-                old_id = plan_data['id']
-                plan = TrainingPlan(
-                    title=plan_data['title'],
-                    team_name=plan_data['team_name'],
-                    start_date=parse_date(plan_data.get('start_date')),
-                    end_date=parse_date(plan_data.get('end_date')),
-                    weekday=plan_data['weekday'],
-                    start_time=parse_time(plan_data.get('start_time')),
-                    dresscode=plan_data.get('dresscode'),
-                    focus=plan_data.get('focus'),
-                    goals=plan_data.get('goals'),
-                    sort_order=plan_data.get('sort_order', 0)
-                )
-                db.session.add(plan)
-                db.session.flush()
-                plan_id_mapping[old_id] = plan.id
-                stats['training_plans'] += 1
+        self.plan_id_mapping.update(zip(old_ids, new_ids))
+        self.stats['training_plans'] += len(new_ids)
+    
+    def _import_training_activities(self, rows):
+        mappings = []
+        for activity_data in rows:
+            new_plan_id = self.plan_id_mapping.get(activity_data['plan_id'])
+            if not new_plan_id:
+                continue
+            mappings.append({
+                'plan_id': new_plan_id,
+                'time_from': _parse_time(activity_data.get('time_from')),
+                'time_to': _parse_time(activity_data.get('time_to')),
+                'duration_minutes': activity_data['duration_minutes'],
+                'activity_name': activity_data['activity_name'],
+                'activity_type': activity_data['activity_type'],
+                'group_activities': activity_data.get('group_activities'),
+                'groups': activity_data.get('groups'),
+                'notes': activity_data.get('notes'),
+                'order': activity_data.get('order', 0),
+                # Bulk-Insert löst keine ORM-Events aus - Zellen hier berechnen
+                'group_cells': build_group_cells(activity_data['activity_type'], activity_data['activity_name'],
+                                                 activity_data.get('groups'), activity_data.get('group_activities'))
+            })
         
-        # Importiere Trainingsaktivitäten
-        if 'training_activities' in backup_data:
-            for activity_data in backup_data['training_activities']:
-                new_plan_id = plan_id_mapping.get(activity_data['plan_id'])
-                if not new_plan_id:
+        if mappings:
+            db.session.execute(insert(TrainingActivity), mappings)
+            self.stats['training_activities'] += len(mappings)
+
+class JSONStreamReader:
+    """
+    Inkrementeller Leser für ein JSON-Objekt auf oberster Ebene.
+    
+    Liest den Text-Stream in Blöcken und dekodiert einzelne Werte mit
+    json.JSONDecoder.raw_decode. Arrays werden nicht als Ganzes geladen,
+    sondern als Iterator über ihre Elemente geliefert - der Speicherbedarf
+    hängt damit nur von der Blockgröße und dem größten Einzelwert ab.
+    
+    Ein Einzelwert darf höchstens max_value_size Zeichen lang sein; bei
+    beschädigten Dateien (z.B. fehlendes Anführungszeichen) wächst der Puffer
+    so nicht bis zur ganzen Datei an, sondern es wird ein ValueError ausgelöst.
+    """
+    
+    WHITESPACE = ' \t\r\n'
+    NUMBER_CHARS = '0123456789.eE+-'
+    
+    def __init__(self, stream, chunk_size=64 * 1024, max_value_size=MAX_JSON_VALUE_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.max_value_size = max_value_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.offset = 0  # Position von buffer[0] im Stream
+        self.eof = False
+    
+    def _fill(self):
+        """Liest den nächsten Block; gibt False zurück, wenn der Stream zu Ende ist"""
+        if self.eof:
+            return False
+        if len(self.buffer) - self.pos > self.max_value_size:
+            raise ValueError(f"Ungültiges Backup-JSON: Wert ab Zeichen {self.offset + self.pos} ist länger als "
+                             f"{self.max_value_size} Zeichen (Datei beschädigt?)")
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Bereits verarbeiteten Teil verwerfen
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+    
+    def _peek(self):
+        """Überspringt Whitespace und gibt das nächste Zeichen zurück ('' am Ende)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in self.WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+    
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Ungültiges Backup-JSON: '{char}' erwartet, '{found}' gefunden")
+        self.pos += 1
+    
+    def _value(self):
+        """Dekodiert den nächsten vollständigen JSON-Wert"""
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                # Wert ist im Puffer noch unvollständig
+                if not self._fill():
+                    raise ValueError(f"Ungültiges Backup-JSON: {e.msg} bei Zeichen {self.offset + e.pos} "
+                                     f"(Datei unvollständig oder beschädigt)") from e
+                continue
+            # Eine Zahl am Pufferende (z.B. "2." von "2.5") könnte im nächsten Block weitergehen
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if (end == len(self.buffer) or self.buffer[end] in self.NUMBER_CHARS) and self._fill():
                     continue
-                
-                activity = TrainingActivity(
-                    plan_id=new_plan_id,
-                    time_from=parse_time(activity_data.get('time_from')),
-                    time_to=parse_time(activity_data.get('time_to')),
-                    duration_minutes=activity_data['duration_minutes'],
-                    activity_name=activity_data['activity_name'],
-                    activity_type=activity_data['activity_type'],
-                    group_activities=activity_data.get('group_activities'),
-                    groups=activity_data.get('groups'),
-                    notes=activity_data.get('notes'),
-                    order=activity_data.get('order', 0)
-                )
-                db.session.add(activity)
-                stats['training_activities'] += 1
-        
-        db.session.commit()
-        
-        message = f"Backup erfolgreich importiert: {stats['users']} Benutzer, {stats['certificates']} Zertifikate, {stats['experiences']} Erfahrungen, {stats['training_plans']} Trainingspläne, {stats['training_activities']} Aktivitäten"
-        return True, message, stats
+            self.pos = end
+            return value
+    
+    def _iter_array(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self._value()
+            separator = self._peek()
+            self.pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f"Ungültiges Backup-JSON: ',' oder ']' erwartet, '{separator}' gefunden")
+    
+    def iter_members(self):
+        """
+        Liefert (Schlüssel, Wert) für jedes Feld des obersten Objekts.
+        Bei Arrays ist der Wert ein Iterator, der vor dem nächsten Feld
+        konsumiert wird (nicht gelesene Elemente werden übersprungen).
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if self._peek() == '[':
+                items = self._iter_array()
+                yield key, items
+                for _ in items:
+                    pass
+            else:
+                yield key, self._value()
+            separator = self._peek()
+            self.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"Ungültiges Backup-JSON: ',' oder '}}' erwartet, '{separator}' gefunden")
+
+def import_backup_stream(stream, clear_existing=False, progress=None):
+    """
+    Importiert Daten aus einem Backup-JSON, das inkrementell aus einem
+    Text-Stream gelesen wird. Die Tabellen werden Abschnitt für Abschnitt
+    in Batches an den BackupImporter übergeben.
+    
+    Hinweis: Die Abschnitte müssen in der Export-Reihenfolge stehen
+    (Benutzer vor Zertifikaten/Erfahrungen, Pläne vor Aktivitäten).
+    
+    Args:
+        stream: Text-Stream (z.B. io.TextIOWrapper) mit den Backup-Daten
+        clear_existing: Wenn True, werden alle bestehenden Daten gelöscht
+        progress: Optionales BackupProgress-Objekt
+    
+    Returns:
+        Tuple (success: bool, message: str, stats: dict)
+    """
+    table_keys = {key for key, model, serialize in BACKUP_TABLES}
+    try:
+        importer = BackupImporter(clear_existing=clear_existing, progress=progress)
+        importer.start()
+        for key, value in JSONStreamReader(stream).iter_members():
+            if key in table_keys:
+                importer.import_rows(key, value)
+        return importer.finish()
         
     except Exception as e:
         db.session.rollback()
         return False, f"Fehler beim Importieren: {str(e)}", {}
 
+def import_backup(backup_json, clear_existing=False):
+    """
+    Importiert Daten aus einem Backup-JSON
+    
+    Args:
+        backup_json: JSON-String mit den Backup-Daten
+        clear_existing: Wenn True, werden alle bestehenden Daten gelöscht
+    
+    Returns:
+        Tuple (success: bool, message: str, stats: dict)
+    """
+    return import_backup_stream(io.StringIO(backup_json), clear_existing=clear_existing)
@@ -0,0 +1,115 @@
+"""
+CLI-Befehle (flask <gruppe> <befehl>)
+"""
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import update
+from app import db
+from app.models import TrainingActivity, build_group_cells
+from app.query_plans import check_query_plans
+from app.search import rebuild_search_index
+from app.sqlite_pragmas import get_sqlite_pragmas, run_benchmark
+from app.storage import collect_garbage, migrate_legacy_files, create_missing_thumbnails
+
+uploads_cli = AppGroup('uploads', help='Verwaltung der hochgeladenen Zertifikatsdateien')
+
+@uploads_cli.command('gc')
+@click.option('--dry-run', is_flag=True, help='Nur anzeigen, nichts löschen')
+def uploads_gc(dry_run):
+    """Löscht Dateien, auf die kein Zertifikat mehr verweist"""
+    stats = collect_garbage(dry_run=dry_run)
+    action = 'Würde löschen' if dry_run else 'Gelöscht'
+    click.echo(f"{action}: {stats['files']} Dateien ({stats['bytes'] / (1024 * 1024):.1f} MB)")
+
+@uploads_cli.command('migrate')
+def uploads_migrate():
+    """Überführt alte Uploads (Zeitstempel im Namen) in die inhaltsadressierte Ablage"""
+    stats = migrate_legacy_files()
+    click.echo(f"{stats['certificates']} Zertifikate angepasst, {stats['missing']} Dateien fehlen")
+    click.echo("Alte Dateien anschließend mit 'flask uploads gc' entfernen.")
+
+@uploads_cli.command('thumbnails')
+def uploads_thumbnails():
+    """Erzeugt fehlende Vorschaubilder für alle Zertifikatsbilder"""
+    click.echo(f"{create_missing_thumbnails()} Vorschaubilder erzeugt")
+
+activities_cli = AppGroup('activities', help='Wartung der Trainingsaktivitäten')
+
+@activities_cli.command('backfill-cells')
+@click.option('--all', 'recompute_all', is_flag=True, help='Auch bereits berechnete Zellen neu berechnen')
+@click.option('--batch-size', default=500, show_default=True, help='Aktivitäten pro Commit')
+def activities_backfill_cells(recompute_all, batch_size):
+    """Berechnet die Zellen der Gruppen-Spalten für bestehende Aktivitäten"""
+    query = db.session.query(
+        TrainingActivity.id, TrainingActivity.activity_type, TrainingActivity.activity_name,
+        TrainingActivity.groups, TrainingActivity.group_activities, TrainingActivity.updated_date
+    ).order_by(TrainingActivity.id)
+    if not recompute_all:
+        query = query.filter(TrainingActivity.group_cells.is_(None))
+    
+    rows = query.all()
+    for start in range(0, len(rows), batch_size):
+        # Bulk-Update nach Primärschlüssel; updated_date bleibt erhalten (keine inhaltliche Änderung)
+        db.session.execute(update(TrainingActivity), [
+            {
+                'id': row.id,
+                'group_cells': build_group_cells(row.activity_type, row.activity_name, row.groups, row.group_activities),
+                'updated_date': row.updated_date
+            }
+            for row in rows[start:start + batch_size]
+        ])
+        db.session.commit()
+    click.echo(f"{len(rows)} Aktivitäten aktualisiert")
+
+coaches_cli = AppGroup('coaches', help='Verwaltung der Coaches')
+
+@coaches_cli.command('rebuild-search-index')
+def coaches_rebuild_search_index():
+    """Baut den Volltext-Suchindex der Coaches neu auf"""
+    count = rebuild_search_index()
+    if count is None:
+        click.echo("Kein SQLite - die Suche verwendet LIKE (unter PostgreSQL mit pg_trgm-Indizes)")
+    else:
+        click.echo(f"{count} Coaches indexiert")
+
+sqlite_cli = AppGroup('sqlite', help='SQLite-Engine-Profil')
+
+@sqlite_cli.command('benchmark')
+@click.option('--workers', default=4, show_default=True, help='Gleichzeitige Prozesse (wie Gunicorn-Worker)')
+@click.option('--seconds', default=5, show_default=True, help='Dauer pro Durchlauf')
+@click.option('--write-ratio', default=0.2, show_default=True, help='Anteil der Schreibzugriffe')
+def sqlite_benchmark(workers, seconds, write_ratio):
+    """Vergleicht den Durchsatz ohne und mit dem konfigurierten Pragma-Profil"""
+    pragmas = get_sqlite_pragmas(current_app.config)
+    if not pragmas:
+        click.echo("SQLITE_ENGINE_PROFILE ist nicht 'production' - Vergleich mit dem Produktionsprofil")
+        pragmas = get_sqlite_pragmas({'SQLITE_ENGINE_PROFILE': 'production'})
+    click.echo(f"{workers} Worker, {seconds}s pro Durchlauf, {write_ratio:.0%} Schreibzugriffe")
+    for label, profile_pragmas in (('default', []), ('production', pragmas)):
+        result = run_benchmark(profile_pragmas, workers=workers, seconds=seconds, write_ratio=write_ratio)
+        click.echo(f"{label:<12} {result['reads_per_second']:>10.0f} reads/s {result['writes_per_second']:>8.0f} writes/s "
+                   f"{result['locked']:>6} locked")
+
+@sqlite_cli.command('explain')
+@click.option('--verbose', '-v', is_flag=True, help='Vollständige Abfragepläne ausgeben')
+def sqlite_explain(verbose):
+    """Prüft die Abfragepläne der häufigsten Abfragen auf Full Table Scans"""
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException("Nur für SQLite verfügbar")
+    results = check_query_plans()
+    for result in results:
+        status = 'FULL SCAN: ' + ', '.join(result['regressions']) if result['regressions'] else 'ok'
+        click.echo(f"{result['name']:<45} {status}")
+        if verbose or result['regressions']:
+            for detail in result['plan']:
+                click.echo(f"    {detail}")
+    if any(result['regressions'] for result in results):
+        raise SystemExit(1)
+
+def register_commands(app):
+    """Registriert alle CLI-Befehle an der App"""
+    app.cli.add_command(uploads_cli)
+    app.cli.add_command(activities_cli)
+    app.cli.add_command(coaches_cli)
+    app.cli.add_command(sqlite_cli)
@@ -0,0 +1,37 @@
+"""
+Cache für gerenderte Seitenfragmente
+
+Die Aktivitäten-Tabelle eines Trainingsplans ist die teuerste Stelle der
+Plan-Ansicht (get_group_cells() pro Aktivität) und ändert sich nur, wenn der
+Plan oder seine Aktivitäten bearbeitet werden. Sie wird pro Prozess mit dem
+Plan-Stand (siehe get_plan_version) als Schlüssel gecacht; jede Änderung
+über die CRUD-Routen ändert den Stand und damit den Schlüssel.
+"""
+from flask import render_template
+from markupsafe import Markup
+from app.queries import plan_activities_query
+import threading
+
+_fragments = {}  # (plan_id, is_admin) -> (version, html)
+_lock = threading.Lock()
+
+def render_plan_activities(plan, version, is_admin):
+    """
+    Gibt die gerenderte Aktivitäten-Tabelle eines Plans zurück (leer ohne Aktivitäten).
+    
+    Args:
+        plan: TrainingPlan
+        version: Stand des Plans aus get_plan_version()
+        is_admin: Ob die Admin-Aktionen angezeigt werden
+    """
+    key = (plan.id, is_admin)
+    entry = _fragments.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    
+    activities = plan_activities_query(plan.id).all()
+    html = Markup(render_template('training_plan_activities.html',
+                                  plan=plan, activities=activities, is_admin=is_admin)) if activities else Markup('')
+    with _lock:
+        _fragments[key] = (version, html)
+    return html
@@ -0,0 +1,288 @@
+"""
+Hintergrund-Jobs für Backup und Restore
+
+Jobs laufen in einem Thread-Pool des jeweiligen Gunicorn-Workers. Status und
+Fortschritt werden als JSON-Datei im JOBS_FOLDER gespeichert, damit jeder
+Worker den Fortschritt abfragen und das fertige Backup ausliefern kann.
+Solange ein Job läuft, aktualisiert ein Heartbeat-Thread die Änderungszeit
+der Datei - auch während langer Schritte ohne Fortschritt (z.B. ein grosser
+Commit). Bleibt sie länger als JOBS_STALE_AFTER stehen, ist der Worker weg.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app import db
+from app.backup_restore import BackupProgress, backup_filename, create_backup_zip, restore_backup_chain, import_backup_stream
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+JOB_STATUS_QUEUED = 'queued'
+JOB_STATUS_RUNNING = 'running'
+JOB_STATUS_DONE = 'done'
+JOB_STATUS_FAILED = 'failed'
+
+ACTIVE_STATUSES = (JOB_STATUS_QUEUED, JOB_STATUS_RUNNING)
+
+_JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+_LOCK_FILE = '.lock'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    """Gibt den Thread-Pool dieses Prozesses zurück (wird bei Bedarf erstellt)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('JOBS_MAX_WORKERS', 1),
+                thread_name_prefix='backup-job'
+            )
+        return _executor
+
+def _jobs_folder():
+    folder = current_app.config['JOBS_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def _job_file(job_id):
+    return os.path.join(_jobs_folder(), f'{job_id}.json')
+
+@contextmanager
+def _jobs_lock():
+    """Exklusive Sperre über alle Gunicorn-Worker (flock auf JOBS_FOLDER/.lock)"""
+    with open(os.path.join(_jobs_folder(), _LOCK_FILE), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def artifact_path(job_id, extension):
+    """Pfad einer zum Job gehörenden Datei (Backup-ZIP, hochgeladenes Backup)"""
+    return os.path.join(_jobs_folder(), f'{job_id}.{extension}')
+
+def _save_job(job):
+    """Speichert den Job atomar (schreiben + umbenennen)"""
+    job['updated'] = datetime.now().isoformat()
+    path = _job_file(job['id'])
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def _heartbeat(path, stop, interval):
+    """Aktualisiert die Änderungszeit des Job-Files, bis stop gesetzt wird"""
+    while not stop.wait(interval):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+def get_job(job_id):
+    """
+    Lädt einen Job anhand seiner ID.
+    Aktive Jobs ohne Lebenszeichen (Heartbeat) seit JOBS_STALE_AFTER werden
+    als fehlgeschlagen gemeldet - ihr Worker ist abgestürzt.
+    """
+    if not job_id or not _JOB_ID_PATTERN.match(job_id):
+        return None
+    path = _job_file(job_id)
+    try:
+        with open(path, encoding='utf-8') as f:
+            job = json.load(f)
+        last_seen = os.path.getmtime(path)
+    except (OSError, ValueError):
+        return None
+    
+    if job['status'] in ACTIVE_STATUSES:
+        stale_after = current_app.config.get('JOBS_STALE_AFTER', 600)
+        if time.time() - last_seen > stale_after:
+            job['status'] = JOB_STATUS_FAILED
+            job['message'] = 'Job wurde abgebrochen (keine Rückmeldung vom Worker).'
+    return job
+
+def list_jobs():
+    """Gibt alle gespeicherten Jobs zurück (neueste zuerst)"""
+    jobs = []
+    for filename in os.listdir(_jobs_folder()):
+        if filename.endswith('.json'):
+            job = get_job(filename[:-len('.json')])
+            if job:
+                jobs.append(job)
+    jobs.sort(key=lambda job: job['created'], reverse=True)
+    return jobs
+
+def _cleanup_old_jobs():
+    """Löscht Jobs und ihre Dateien, die älter als JOBS_RETENTION sind"""
+    retention = timedelta(seconds=current_app.config.get('JOBS_RETENTION', 7 * 24 * 3600))
+    threshold = time.time() - retention.total_seconds()
+    folder = _jobs_folder()
+    for filename in os.listdir(folder):
+        if filename == _LOCK_FILE:
+            continue
+        path = os.path.join(folder, filename)
+        try:
+            if os.path.getmtime(path) < threshold:
+                os.remove(path)
+        except OSError as e:
+            current_app.logger.warning(f"Jobs: Konnte {path} nicht löschen: {e}")
+
+class JobProgress(BackupProgress):
+    """Zählt den Fortschritt eines Jobs und speichert ihn gedrosselt im Job-File"""
+    
+    SAVE_INTERVAL = 0.5  # Sekunden
+    
+    def __init__(self, job):
+        self.job = job
+        self.last_save = 0
+    
+    def rows(self, table, count):
+        rows = self.job['progress']['rows']
+        rows[table] = rows.get(table, 0) + count
+        self._save()
+    
+    def file(self, size):
+        self.job['progress']['files'] += 1
+        self.job['progress']['bytes'] += size
+        self._save()
+    
+    def _save(self, force=False):
+        now = time.monotonic()
+        if force or now - self.last_save >= self.SAVE_INTERVAL:
+            _save_job(self.job)
+            self.last_save = now
+
+def _run_job(app, job, work):
+    """Führt einen Job im Thread-Pool aus (mit eigenem App-Kontext)"""
+    with app.app_context():
+        progress = JobProgress(job)
+        job['status'] = JOB_STATUS_RUNNING
+        job['started'] = datetime.now().isoformat()
+        _save_job(job)
+        stop_heartbeat = threading.Event()
+        threading.Thread(
+            target=_heartbeat,
+            args=(_job_file(job['id']), stop_heartbeat, app.config.get('JOBS_HEARTBEAT_INTERVAL', 30)),
+            name=f"job-heartbeat-{job['id'][:8]}",
+            daemon=True
+        ).start()
+        try:
+            success, message, stats = work(job, progress)
+            job['status'] = JOB_STATUS_DONE if success else JOB_STATUS_FAILED
+            job['message'] = message
+            job['stats'] = stats
+        except Exception as e:
+            app.logger.error(f"Job {job['id']} ({job['type']}) fehlgeschlagen: {e}", exc_info=True)
+            job['status'] = JOB_STATUS_FAILED
+            job['message'] = f"Fehler: {str(e)}"
+        finally:
+            stop_heartbeat.set()
+            db.session.remove()
+        job['finished'] = datetime.now().isoformat()
+        progress._save(force=True)
+        app.logger.info(f"Job {job['id']} ({job['type']}) beendet: {job['status']}")
+
+def _create_job(job_type, **extra):
+    """
+    Legt einen neuen Job an (noch nicht gestartet).
+    
+    Returns:
+        Tuple (job: dict oder None, error_message: str oder None)
+    """
+    # Prüfen und Anlegen unter einer Sperre, sonst können zwei Worker gleichzeitig einen Job starten
+    with _jobs_lock():
+        if any(job['status'] in ACTIVE_STATUSES for job in list_jobs()):
+            return None, 'Es läuft bereits ein Backup- oder Restore-Job. Bitte warte, bis er beendet ist.'
+        
+        _cleanup_old_jobs()
+        job = {
+            'id': uuid.uuid4().hex,
+            'type': job_type,
+            'status': JOB_STATUS_QUEUED,
+            'created': datetime.now().isoformat(),
+            'started': None,
+            'finished': None,
+            'message': None,
+            'stats': {},
+            'artifact': None,
+            'progress': {'rows': {}, 'files': 0, 'bytes': 0}
+        }
+        job.update(extra)
+        _save_job(job)
+    return job, None
+
+def _submit_job(job, work):
+    """Übergibt einen angelegten Job dem Thread-Pool"""
+    app = current_app._get_current_object()
+    _get_executor().submit(_run_job, app, job, work)
+
+def start_backup_job(incremental=False):
+    """
+    Startet ein Backup im Hintergrund; das ZIP wird im JOBS_FOLDER abgelegt.
+    
+    Args:
+        incremental: Wenn True, nur Änderungen seit dem letzten Backup sichern
+    
+    Returns:
+        Tuple (job: dict oder None, error_message: str oder None)
+    """
+    job, error = _create_job('backup', incremental=incremental)
+    if error:
+        return None, error
+    
+    def work(job, progress):
+        zip_path = artifact_path(job['id'], 'zip')
+        with open(zip_path, 'wb') as zip_file:
+            create_backup_zip(fileobj=zip_file, progress=progress, incremental=incremental)
+        job['artifact'] = backup_filename(incremental)
+        job['progress']['bytes_written'] = os.path.getsize(zip_path)
+        return True, 'Backup erfolgreich erstellt.', dict(job['progress']['rows'])
+    
+    _submit_job(job, work)
+    return job, None
+
+def start_restore_job(uploaded_files, clear_existing=False):
+    """
+    Speichert die hochgeladenen Backups im JOBS_FOLDER und stellt sie im
+    Hintergrund wieder her.
+    
+    Args:
+        uploaded_files: Liste von werkzeug FileStorage - ein ZIP oder JSON,
+            oder mehrere ZIPs einer Backup-Kette (vollständig + inkrementell)
+        clear_existing: Wenn True, werden alle bestehenden Daten gelöscht
+    
+    Returns:
+        Tuple (job: dict oder None, error_message: str oder None)
+    """
+    job, error = _create_job('restore', clear_existing=clear_existing,
+                             source=', '.join(uploaded_file.filename for uploaded_file in uploaded_files))
+    if error:
+        return None, error
+    
+    # Uploads vollständig speichern - der Request ist danach beendet
+    is_zip = uploaded_files[0].filename.lower().endswith('.zip')
+    upload_paths = []
+    for index, uploaded_file in enumerate(uploaded_files):
+        upload_path = artifact_path(job['id'], f'{index}.upload')
+        uploaded_file.save(upload_path)
+        upload_paths.append(upload_path)
+    
+    def work(job, progress):
+        try:
+            if is_zip:
+                return restore_backup_chain(upload_paths, clear_existing=clear_existing, progress=progress)
+            with open(upload_paths[0], encoding='utf-8') as json_stream:
+                return import_backup_stream(json_stream, clear_existing=clear_existing, progress=progress)
+        finally:
+            for upload_path in upload_paths:
+                os.remove(upload_path)
+    
+    _submit_job(job, work)
+    return job, None
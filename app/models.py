@@ -1,8 +1,101 @@
 from datetime import datetime, timedelta
 from app import db
+from sqlalchemy import event
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
+def experience_days_to_years(total_days):
+    """Rechnet summierte Erfahrungstage in (gerundete) Jahre um"""
+    return int(round((total_days or 0) / 365.25))
+
+# Reihenfolge der Positionsgruppen in den Spalten der Trainingsplan-Tabelle
+GROUPS_ORDER = ['OL', 'DL', 'LB', 'RB', 'TE', 'WR', 'DB', 'QB']
+GROUP_POSITIONS = {group: position for position, group in enumerate(GROUPS_ORDER)}
+
+def _combination_cells(group_activities):
+    """
+    Zellen für Gruppenkombinationen ({"OL,DL": "OL/DL ST Line", ...}) bei
+    group_specific und special_teams: benachbarte Gruppen mit derselben
+    Aktivität werden zu einer Zelle zusammengefasst (merged cells).
+    """
+    # Erstelle Mapping von Gruppe zu Aktivitätsname
+    group_to_activity = {}
+    for key, combination_name in group_activities.items():
+        for group in key.split(','):
+            group = group.strip()
+            if group in GROUP_POSITIONS:
+                group_to_activity[group] = combination_name
+    
+    cells = []
+    i = 0
+    while i < len(GROUPS_ORDER):
+        group = GROUPS_ORDER[i]
+        if group in group_to_activity:
+            # Finde alle aufeinanderfolgenden Gruppen mit demselben Text
+            activity_text = group_to_activity[group]
+            span_groups = [group]
+            j = i + 1
+            while j < len(GROUPS_ORDER) and GROUPS_ORDER[j] in group_to_activity and group_to_activity[GROUPS_ORDER[j]] == activity_text:
+                span_groups.append(GROUPS_ORDER[j])
+                j += 1
+            
+            cells.append({
+                'colspan': len(span_groups),
+                'text': activity_text,
+                'groups': span_groups
+            })
+            i = j
+        else:
+            # Keine Aktivität für diese Gruppe
+            cells.append({
+                'colspan': 1,
+                'text': '-',
+                'groups': [group]
+            })
+            i += 1
+    
+    return cells
+
+def build_group_cells(activity_type, activity_name, groups, group_activities):
+    """
+    Berechnet die Zellen für die Gruppen-Spalten einer Aktivität.
+    Jede Zelle ist ein Dict mit 'colspan', 'text', 'groups'
+    
+    Wird beim Speichern einer Aktivität in TrainingActivity.group_cells abgelegt.
+    """
+    # Special Teams kann Gruppenkombinationen haben (wie Group-Specific)
+    # Wenn keine group_activities vorhanden, dann wie Team-Wide behandeln
+    if (activity_type == 'group_specific' or activity_type == 'special_teams') and group_activities:
+        return _combination_cells(group_activities)
+    
+    if activity_type == 'team_wide' or activity_type == 'prepractice' or activity_type == 'special_teams':
+        # Alle Gruppen zusammen (wenn keine group_activities bei special_teams)
+        return [{'colspan': 8, 'text': activity_name, 'groups': GROUPS_ORDER}]
+    
+    if activity_type == 'position_specific' and group_activities:
+        # Position spezifisch: Jede Gruppe hat ihren eigenen Aktivitätsnamen
+        # Format: {"OL": "OL Aktivität", "DL": "DL Aktivität", ...}
+        cells = []
+        for group in GROUPS_ORDER:
+            activity_text = group_activities.get(group, '')
+            cells.append({
+                'colspan': 1,
+                'text': activity_text if activity_text else '-',
+                'groups': [group]
+            })
+        return cells
+    
+    # Fallback: Einzelne Checkmarks
+    cells = []
+    for group in GROUPS_ORDER:
+        active = groups and groups.get(group, False)
+        cells.append({
+            'colspan': 1,
+            'text': '✓' if active else '-',
+            'groups': [group]
+        })
+    return cells
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
     
@@ -10,7 +103,7 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=True)  # Optional, da Zitadel Passwörter verwaltet
     zitadel_user_id = db.Column(db.String(255), unique=True, nullable=True, index=True)  # Zitadel User ID
-    full_name = db.Column(db.String(200))
+    full_name = db.Column(db.String(200), index=True)
     first_name = db.Column(db.String(100))
     last_name = db.Column(db.String(100))
     license_number = db.Column(db.String(50))
@@ -57,7 +150,7 @@ class User(UserMixin, db.Model):
             end = datetime(exp.end_year, 12, 31) if exp.end_year else datetime.now()
             total_days += (end - start).days
         
-        return int(round(total_days / 365.25))
+        return experience_days_to_years(total_days)
     
     def __repr__(self):
         return f'<User {self.email}>'
@@ -66,11 +159,11 @@ class Certificate(db.Model):
     __tablename__ = 'certificates'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     title = db.Column(db.String(200), nullable=False)
     organization = db.Column(db.String(200), nullable=False)
     acquisition_date = db.Column(db.Date, nullable=False)
-    valid_until = db.Column(db.Date)
+    valid_until = db.Column(db.Date, index=True)
     file_url = db.Column(db.String(500))
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
     updated_date = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -85,6 +178,11 @@ class Certificate(db.Model):
             return False
         return datetime.now().date() <= self.valid_until <= (datetime.now().date() + timedelta(days=days))
     
+    def get_thumbnail_url(self):
+        """URL des Vorschaubilds (nur für Bilder, None für PDFs)"""
+        from app.storage import thumbnail_url
+        return thumbnail_url(self.file_url)
+    
     def __repr__(self):
         return f'<Certificate {self.title}>'
 
@@ -92,7 +190,7 @@ class Experience(db.Model):
     __tablename__ = 'experiences'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     start_year = db.Column(db.Integer, nullable=False)
     end_year = db.Column(db.Integer)
     team = db.Column(db.String(100), nullable=False)
@@ -108,6 +206,10 @@ class Experience(db.Model):
 
 class TrainingPlan(db.Model):
     __tablename__ = 'training_plans'
+    __table_args__ = (
+        # Heutiger Plan im Dashboard (Team, Wochentag, Gültigkeitszeitraum)
+        db.Index('ix_training_plans_team_schedule', 'team_name', 'weekday', 'start_date', 'end_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -132,9 +234,11 @@ class TrainingPlan(db.Model):
         return weekdays[self.weekday]
     
     def is_active_today(self):
-        today = datetime.now().date()
-        weekday = today.weekday()  # 0=Montag
-        return (self.start_date <= today <= self.end_date) and (self.weekday == weekday)
+        return self.is_active_on(datetime.now().date())
+    
+    def is_active_on(self, day):
+        weekday = day.weekday()  # 0=Montag
+        return (self.start_date <= day <= self.end_date) and (self.weekday == weekday)
     
     def get_weekday_color(self):
         colors = {
@@ -155,7 +259,7 @@ class TrainingActivity(db.Model):
     __tablename__ = 'training_activities'
     
     id = db.Column(db.Integer, primary_key=True)
-    plan_id = db.Column(db.Integer, db.ForeignKey('training_plans.id'), nullable=False)
+    plan_id = db.Column(db.Integer, db.ForeignKey('training_plans.id'), nullable=False, index=True)
     time_from = db.Column(db.Time, nullable=False)
     time_to = db.Column(db.Time, nullable=False)
     duration_minutes = db.Column(db.Integer, nullable=False)
@@ -163,6 +267,7 @@ class TrainingActivity(db.Model):
     activity_type = db.Column(db.String(50), nullable=False)  # prepractice, team_wide, group_specific, special_teams
     groups = db.Column(db.JSON)  # {OL: true, DL: false, ...} - welche Gruppen aktiv sind
     group_activities = db.Column(db.JSON)  # {"OL,DL": "OL/DL ST Line", "LB,RB": "LB & RB"} - Aktivitätsnamen pro Gruppenkombination
+    group_cells = db.Column(db.JSON)  # Vorberechnete Zellen der Gruppen-Spalten (siehe build_group_cells), beim Speichern gesetzt
     notes = db.Column(db.Text)
     order = db.Column(db.Integer, nullable=False)
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
@@ -181,18 +286,16 @@ class TrainingActivity(db.Model):
         if self.activity_type != 'group_specific' or not self.group_activities:
             return []
         
-        GROUPS_ORDER = ['OL', 'DL', 'LB', 'RB', 'TE', 'WR', 'DB', 'QB']
-        
         # Konvertiere group_activities dict in Liste von Tupeln
         combinations = []
         for key, activity_name in self.group_activities.items():
             groups = [g.strip() for g in key.split(',')]
             # Sortiere Gruppen nach GROUPS_ORDER
-            groups.sort(key=lambda g: GROUPS_ORDER.index(g) if g in GROUPS_ORDER else 999)
+            groups.sort(key=lambda g: GROUP_POSITIONS.get(g, 999))
             combinations.append((groups, activity_name))
         
         # Sortiere Kombinationen nach der ersten Gruppe
-        combinations.sort(key=lambda x: GROUPS_ORDER.index(x[0][0]) if x[0] and x[0][0] in GROUPS_ORDER else 999)
+        combinations.sort(key=lambda x: GROUP_POSITIONS.get(x[0][0], 999) if x[0] else 999)
         
         return combinations
     
@@ -201,117 +304,10 @@ class TrainingActivity(db.Model):
         Gibt eine Liste von Zellen für die Gruppen-Spalten zurück.
         Jede Zelle ist ein Dict mit 'colspan', 'text', 'groups'
         """
-        GROUPS_ORDER = ['OL', 'DL', 'LB', 'RB', 'TE', 'WR', 'DB', 'QB']
-        
-        # Special Teams kann Gruppenkombinationen haben (wie Group-Specific)
-        # Wenn keine group_activities vorhanden, dann wie Team-Wide behandeln
-        if self.activity_type == 'special_teams' and self.group_activities:
-            # Erstelle Mapping von Gruppe zu Aktivitätsname (wie bei group_specific)
-            group_to_activity = {}
-            for key, activity_name in self.group_activities.items():
-                groups = [g.strip() for g in key.split(',')]
-                for group in groups:
-                    if group in GROUPS_ORDER:
-                        group_to_activity[group] = activity_name
-            
-            # Erstelle Zellen mit merged cells
-            cells = []
-            i = 0
-            while i < len(GROUPS_ORDER):
-                group = GROUPS_ORDER[i]
-                if group in group_to_activity:
-                    # Finde alle aufeinanderfolgenden Gruppen mit demselben Text
-                    activity_text = group_to_activity[group]
-                    span_groups = [group]
-                    j = i + 1
-                    while j < len(GROUPS_ORDER) and GROUPS_ORDER[j] in group_to_activity and group_to_activity[GROUPS_ORDER[j]] == activity_text:
-                        span_groups.append(GROUPS_ORDER[j])
-                        j += 1
-                    
-                    cells.append({
-                        'colspan': len(span_groups),
-                        'text': activity_text,
-                        'groups': span_groups
-                    })
-                    i = j
-                else:
-                    # Keine Aktivität für diese Gruppe
-                    cells.append({
-                        'colspan': 1,
-                        'text': '-',
-                        'groups': [group]
-                    })
-                    i += 1
-            
-            return cells
-        
-        if self.activity_type == 'team_wide' or self.activity_type == 'prepractice' or self.activity_type == 'special_teams':
-            # Alle Gruppen zusammen (wenn keine group_activities bei special_teams)
-            return [{'colspan': 8, 'text': self.activity_name, 'groups': GROUPS_ORDER}]
-        
-        if self.activity_type == 'position_specific' and self.group_activities:
-            # Position spezifisch: Jede Gruppe hat ihren eigenen Aktivitätsnamen
-            # Format: {"OL": "OL Aktivität", "DL": "DL Aktivität", ...}
-            cells = []
-            for group in GROUPS_ORDER:
-                activity_text = self.group_activities.get(group, '')
-                cells.append({
-                    'colspan': 1,
-                    'text': activity_text if activity_text else '-',
-                    'groups': [group]
-                })
-            return cells
-        
-        if self.activity_type == 'group_specific' and self.group_activities:
-            # Erstelle Mapping von Gruppe zu Aktivitätsname
-            group_to_activity = {}
-            for key, activity_name in self.group_activities.items():
-                groups = [g.strip() for g in key.split(',')]
-                for group in groups:
-                    if group in GROUPS_ORDER:
-                        group_to_activity[group] = activity_name
-            
-            # Erstelle Zellen mit merged cells
-            cells = []
-            i = 0
-            while i < len(GROUPS_ORDER):
-                group = GROUPS_ORDER[i]
-                if group in group_to_activity:
-                    # Finde alle aufeinanderfolgenden Gruppen mit demselben Text
-                    activity_text = group_to_activity[group]
-                    span_groups = [group]
-                    j = i + 1
-                    while j < len(GROUPS_ORDER) and GROUPS_ORDER[j] in group_to_activity and group_to_activity[GROUPS_ORDER[j]] == activity_text:
-                        span_groups.append(GROUPS_ORDER[j])
-                        j += 1
-                    
-                    cells.append({
-                        'colspan': len(span_groups),
-                        'text': activity_text,
-                        'groups': span_groups
-                    })
-                    i = j
-                else:
-                    # Keine Aktivität für diese Gruppe
-                    cells.append({
-                        'colspan': 1,
-                        'text': '-',
-                        'groups': [group]
-                    })
-                    i += 1
-            
-            return cells
-        
-        # Fallback: Einzelne Checkmarks
-        cells = []
-        for group in GROUPS_ORDER:
-            active = self.groups and self.groups.get(group, False)
-            cells.append({
-                'colspan': 1,
-                'text': '✓' if active else '-',
-                'groups': [group]
-            })
-        return cells
+        if self.group_cells is not None:
+            return self.group_cells
+        # Noch nicht vorberechnet (vor 'flask activities backfill-cells')
+        return build_group_cells(self.activity_type, self.activity_name, self.groups, self.group_activities)
     
     def get_activity_type_color(self):
         colors = {
@@ -326,3 +322,8 @@ class TrainingActivity(db.Model):
     def __repr__(self):
         return f'<TrainingActivity {self.activity_name}>'
 
+@event.listens_for(TrainingActivity, 'before_insert')
+@event.listens_for(TrainingActivity, 'before_update')
+def _store_group_cells(mapper, connection, target):
+    """Berechnet die Zellen der Gruppen-Spalten beim Speichern (auch beim Kopieren eines Plans)"""
+    target.group_cells = build_group_cells(target.activity_type, target.activity_name, target.groups, target.group_activities)
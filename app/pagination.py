@@ -0,0 +1,151 @@
+"""
+Keyset-Pagination (Cursor) für Listen
+
+Statt OFFSET (wird mit jeder Seite langsamer) merkt sich der Cursor die
+Sortierwerte der letzten Zeile einer Seite; die nächste Seite beginnt mit
+einer WHERE-Bedingung direkt danach und kann den Index der Sortierung
+nutzen. Als letzter Sortierschlüssel dient immer die ID, damit die
+Reihenfolge bei gleichen Werten stabil ist.
+
+NULL-Werte werden wie von SQLite sortiert behandelt (aufsteigend zuerst,
+absteigend zuletzt).
+"""
+from flask import current_app, request, url_for
+from sqlalchemy import and_, or_, false
+from datetime import date, time
+import base64
+import binascii
+import json
+
+class KeysetPage:
+    """Eine Seite einer Liste mit Cursor für die nächste Seite"""
+    
+    def __init__(self, items, next_cursor, is_first):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.is_first = is_first
+    
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+    
+    @property
+    def next_url(self):
+        """URL der nächsten Seite (aktuelle Parameter, neuer Cursor)"""
+        if self.next_cursor is None:
+            return None
+        args = request.args.to_dict()
+        args['cursor'] = self.next_cursor
+        return url_for(request.endpoint, **request.view_args, **args)
+    
+    @property
+    def first_url(self):
+        """URL der ersten Seite (aktuelle Parameter ohne Cursor)"""
+        args = request.args.to_dict()
+        args.pop('cursor', None)
+        return url_for(request.endpoint, **request.view_args, **args)
+    
+    def to_dict(self, serialize):
+        """JSON-Darstellung: Einträge (mit serialize umgewandelt) und Cursor"""
+        return {
+            'items': [serialize(item) for item in self.items],
+            'next_cursor': self.next_cursor,
+            'has_next': self.has_next
+        }
+
+def encode_cursor(values):
+    """Kodiert Sortierwerte als URL-tauglichen Cursor"""
+    data = [value.isoformat() if isinstance(value, (date, time)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, sort_keys):
+    """
+    Liest die Sortierwerte aus einem Cursor. Gibt None zurück, wenn der
+    Cursor fehlt oder ungültig ist (dann beginnt die Liste von vorne).
+    """
+    if not cursor:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(data, list) or len(data) != len(sort_keys):
+            return None
+        values = []
+        for value, (column, descending) in zip(data, sort_keys):
+            python_type = column.type.python_type
+            if value is None:
+                values.append(None)
+            elif python_type in (date, time):
+                values.append(python_type.fromisoformat(value))
+            else:
+                values.append(python_type(value))
+        return values
+    except (ValueError, TypeError, binascii.Error, NotImplementedError):
+        return None
+
+def _after(sort_keys, values):
+    """WHERE-Bedingung für alle Zeilen, die nach den Sortierwerten values kommen"""
+    column, descending = sort_keys[0]
+    value = values[0]
+    if len(sort_keys) == 1:
+        rest = None
+    else:
+        rest = _after(sort_keys[1:], values[1:])
+    
+    equal = column.is_(None) if value is None else column == value
+    tie = and_(equal, rest) if rest is not None else None
+    if value is None:
+        # NULL steht aufsteigend am Anfang, absteigend am Ende
+        beyond = None if descending else column.isnot(None)
+    elif descending:
+        beyond = or_(column < value, column.is_(None))
+    else:
+        beyond = column > value
+    
+    conditions = [condition for condition in (beyond, tie) if condition is not None]
+    return or_(*conditions) if conditions else false()
+
+def _sort_values(row, sort_keys, key_of=None):
+    """Sortierwerte einer Zeile (Attribute von key_of(row), sonst Spalten der Zeile)"""
+    item = key_of(row) if key_of else row
+    return [
+        getattr(item, column.key) if hasattr(item, column.key) else getattr(row, column.key)
+        for column, descending in sort_keys
+    ]
+
+def get_per_page():
+    """Seitengröße aus ?per_page= (begrenzt) oder PAGE_SIZE"""
+    per_page = request.args.get('per_page', current_app.config.get('PAGE_SIZE', 50), type=int)
+    return max(1, min(per_page, current_app.config.get('PAGE_SIZE_MAX', 200)))
+
+def keyset_query(query, sort_keys, values=None):
+    """Sortiert eine Query nach sort_keys und beginnt (mit values) nach diesen Sortierwerten"""
+    if values is not None:
+        query = query.filter(_after(sort_keys, values))
+    return query.order_by(*[column.desc() if descending else column.asc() for column, descending in sort_keys])
+
+def paginate_keyset(query, sort_keys, cursor=None, per_page=None, key_of=None):
+    """
+    Lädt eine Seite einer Query.
+    
+    Args:
+        query: Query ohne ORDER BY/LIMIT
+        sort_keys: Liste von (Spalte, absteigend), die letzte Spalte muss eindeutig sein (ID)
+        cursor: Cursor der vorherigen Seite (None = erste Seite)
+        per_page: Einträge pro Seite (Standard: get_per_page())
+        key_of: Funktion, die aus einer Zeile das Objekt mit den Sortierwerten holt
+            (z.B. bei Tupel-Zeilen); Standard: die Zeile selbst. Sortierwerte, die das
+            Objekt nicht hat (z.B. die Relevanz einer Suche), werden aus der Zeile gelesen
+    
+    Returns:
+        KeysetPage
+    """
+    per_page = per_page or get_per_page()
+    values = decode_cursor(cursor, sort_keys)
+    
+    # Eine Zeile mehr laden, um zu wissen, ob es eine nächste Seite gibt
+    rows = keyset_query(query, sort_keys, values).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(_sort_values(rows[-1], sort_keys, key_of))
+    return KeysetPage(rows, next_cursor, is_first=values is None)
@@ -0,0 +1,182 @@
+"""
+Aggregierte Abfragen für Coach-Listen und Exporte
+
+Die Zertifikatsanzahl und die Erfahrungsjahre werden in SQL berechnet,
+damit Listen mit vielen Coaches nicht pro Zeile weitere Queries auslösen.
+
+Außerdem liegen hier die Abfragen der meistgenutzten Seiten, damit die
+Routen und die Prüfung der Abfragepläne (app/query_plans.py) dieselben
+Queries verwenden.
+"""
+from datetime import date
+from flask import request
+from sqlalchemy import func, case, select
+from app import db
+from app.models import User, Certificate, Experience, TrainingPlan, TrainingActivity, experience_days_to_years
+from app.pagination import paginate_keyset
+from app.search import search_coaches, coach_search
+
+# Sortierung der Listen (ID als eindeutiger letzter Schlüssel für die Pagination)
+COACH_SORT_KEYS = [(User.full_name, False), (User.id, False)]
+COACH_SEARCH_SORT_KEYS = [(coach_search.c.rank, False), (User.id, False)]  # Relevanz (bm25, kleiner = besser)
+CERTIFICATE_SORT_KEYS = [(Certificate.acquisition_date, True), (Certificate.id, True)]
+EXPERIENCE_SORT_KEYS = [(Experience.start_year, True), (Experience.id, True)]
+TRAINING_PLAN_SORT_KEYS = [(TrainingPlan.weekday, False), (TrainingPlan.start_time, False), (TrainingPlan.id, False)]
+
+# Anzahl der neuesten Zertifikate/Erfahrungen auf dem Dashboard
+RECENT_LIMIT = 5
+
+
+def visible_plans(query, user):
+    """Schränkt eine TrainingPlan-Query auf die Pläne ein, die user sehen darf (Admins: alle)"""
+    if user.is_admin:
+        return query
+    return query.filter(TrainingPlan.team_name == user.team)
+
+
+def today_plan_query(today, user):
+    """Trainingspläne, die am Tag today stattfinden und die user sehen darf"""
+    return visible_plans(TrainingPlan.query.filter(
+        TrainingPlan.start_date <= today,
+        TrainingPlan.end_date >= today,
+        TrainingPlan.weekday == today.weekday()
+    ), user)
+
+
+def training_plans_query(user):
+    """Trainingspläne für die Übersicht, die user sehen darf (ohne Sortierung)"""
+    return visible_plans(TrainingPlan.query, user)
+
+
+def plan_activities_query(plan_id):
+    """Aktivitäten eines Plans in ihrer Reihenfolge"""
+    return TrainingActivity.query.filter(TrainingActivity.plan_id == plan_id).order_by(TrainingActivity.order)
+
+
+def user_certificates_query(user_id):
+    """Zertifikate eines Benutzers, ohne Sortierung"""
+    return Certificate.query.filter(Certificate.user_id == user_id)
+
+
+def user_experiences_query(user_id):
+    """Erfahrungen eines Benutzers, ohne Sortierung"""
+    return Experience.query.filter(Experience.user_id == user_id)
+
+
+def recent_certificates_query(user_id):
+    """Die neuesten Zertifikate eines Benutzers (Dashboard)"""
+    return user_certificates_query(user_id).order_by(Certificate.acquisition_date.desc()).limit(RECENT_LIMIT)
+
+
+def recent_experiences_query(user_id):
+    """Die neuesten Erfahrungen eines Benutzers (Dashboard)"""
+    return user_experiences_query(user_id).order_by(Experience.start_year.desc()).limit(RECENT_LIMIT)
+
+
+def coaches_query():
+    """Coaches für die Coach-Übersicht (ohne Admins)"""
+    return User.query.filter(User.is_admin == False)
+
+
+def coaches_export_query():
+    """Alle Benutzer für den CSV-Export, nach Name sortiert"""
+    return User.query.order_by(User.full_name)
+
+
+def _ordinal_of_first_day(year):
+    """SQL-Ausdruck für date(year, 1, 1).toordinal() (nur Ganzzahl-Arithmetik, portabel)"""
+    previous = year - 1
+    return 365 * previous + previous // 4 - previous // 100 + previous // 400 + 1
+
+
+def _ordinal_of_last_day(year):
+    """SQL-Ausdruck für date(year, 12, 31).toordinal()"""
+    return 365 * year + year // 4 - year // 100 + year // 400
+
+
+def experience_days_expression(today=None):
+    """
+    SQL-Ausdruck für die Erfahrungstage einer Experience-Zeile.
+    Entspricht der Berechnung in User.get_total_experience_years(): laufende
+    Einträge zählen bis heute, abgeschlossene bis zum 31.12. des Endjahres.
+    """
+    today_ordinal = (today or date.today()).toordinal()
+    end_ordinal = case(
+        (Experience.end_year.is_(None), today_ordinal),
+        else_=_ordinal_of_last_day(Experience.end_year)
+    )
+    return end_ordinal - _ordinal_of_first_day(Experience.start_year)
+
+
+def with_coach_stats(query, today=None):
+    """
+    Ergänzt eine User-Query um Zertifikatsanzahl und Erfahrungstage.
+
+    Beide Werte sind korrelierte Subqueries über die user_id-Indizes: sie
+    werden nur für die tatsächlich gelesenen Zeilen berechnet (bei einer Seite
+    nach dem LIMIT), nicht für alle Zertifikate und Erfahrungen. Die Zeilen
+    haben die Form (User, certificate_count, experience_days).
+    """
+    certificate_count = (
+        select(func.count(Certificate.id))
+        .where(Certificate.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    experience_days = (
+        select(func.coalesce(func.sum(experience_days_expression(today)), 0))
+        .where(Experience.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    return query.add_columns(
+        certificate_count.label('certificate_count'),
+        experience_days.label('experience_days')
+    )
+
+
+def iter_coaches_with_stats(query, today=None):
+    """
+    Iteriert über eine User-Query und liefert Tupel
+    (coach, certificate_count, experience_years).
+    """
+    for coach, certificate_count, experience_days in with_coach_stats(query, today):
+        yield coach, certificate_count, experience_days_to_years(experience_days)
+
+
+def get_coaches_with_stats(query, today=None):
+    """Wie iter_coaches_with_stats(), aber als Liste (für Templates)"""
+    return list(iter_coaches_with_stats(query, today))
+
+
+def get_coaches_page(query, cursor=None, per_page=None, today=None, sort_keys=COACH_SORT_KEYS):
+    """
+    Eine Seite einer User-Query (Standard: nach Name sortiert) mit Statistiken,
+    als KeysetPage mit Tupeln (coach, certificate_count, experience_years).
+    Sortierspalten ausserhalb von User (Relevanz der Suche) werden mitgeladen.
+    """
+    rows = with_coach_stats(query, today).add_columns(
+        *[column for column, descending in sort_keys if column.table is not User.__table__]
+    )
+    page = paginate_keyset(rows, sort_keys, cursor, per_page, key_of=lambda row: row[0])
+    page.items = [
+        (coach, certificate_count, experience_days_to_years(experience_days))
+        for coach, certificate_count, experience_days, *sort_values in page.items
+    ]
+    return page
+
+
+def get_coaches_listing(query, search=None):
+    """
+    Coach-Liste für die Übersichten, seitenweise (Cursor aus ?cursor=):
+    ohne Suche nach Name, mit Suche nach Relevanz (bzw. nach Name, wenn
+    der Suchindex fehlt).
+
+    Returns:
+        KeysetPage
+    """
+    cursor = request.args.get('cursor')
+    if not search:
+        return get_coaches_page(query, cursor)
+    query, ranked = search_coaches(query, search)
+    return get_coaches_page(query, cursor, sort_keys=COACH_SEARCH_SORT_KEYS if ranked else COACH_SORT_KEYS)
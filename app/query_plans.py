@@ -0,0 +1,127 @@
+"""
+Prüfung der Abfragepläne der häufigsten Abfragen (SQLite)
+
+Für die Abfragen von Dashboard, Trainingsplänen, Plan-Detailseite,
+Coach-Listen und Zertifikatsbericht wird EXPLAIN QUERY PLAN ausgeführt. Liest eine Abfrage eine
+Tabelle vollständig ohne Index ("SCAN <tabelle>"), gilt das als Regression -
+außer die Abfrage liest diese Tabelle fachlich ohnehin ganz (z.B. die
+Plan-Übersicht für Admins). Innerhalb von MATERIALIZE-, CO-ROUTINE- oder
+Subquery-Schritten zählt auch ein Scan über einen Index ("SCAN <tabelle>
+USING COVERING INDEX ..."): er liest die ganze Tabelle, bevor die äussere
+Abfrage ihr LIMIT anwenden kann.
+
+Aufruf: flask sqlite explain
+"""
+from datetime import date, time
+from app import db
+from app.models import User
+from app.pagination import keyset_query
+from app.queries import (with_coach_stats, today_plan_query, training_plans_query, plan_activities_query,
+                         user_certificates_query, user_experiences_query, recent_certificates_query,
+                         recent_experiences_query, coaches_query, coaches_export_query,
+                         COACH_SORT_KEYS, CERTIFICATE_SORT_KEYS, EXPERIENCE_SORT_KEYS, TRAINING_PLAN_SORT_KEYS)
+from app.reports import expiring_certificates_query
+from app.timeline import plan_version_query, activity_times_query
+from sqlalchemy import func
+import re
+
+_SCAN_PATTERN = re.compile(r'^SCAN (\w+)(.*)$')
+_SUBQUERY_PATTERN = re.compile(r'^(MATERIALIZE|CO-ROUTINE)\b|SUBQUERY')
+
+def get_hot_queries(today=None):
+    """
+    Die zu prüfenden Abfragen als Liste von (name, query, erlaubte_scans).
+    Sie werden mit denselben Funktionen gebaut, die auch die Routen verwenden
+    (app/queries.py, app/timeline.py, app/reports.py).
+    """
+    today = today or date.today()
+    user_id = 1
+    plan_id = 1
+    # Ungespeicherte Benutzer als Beispiel für die Sichtbarkeit der Pläne
+    admin = User(is_admin=True)
+    coach = User(is_admin=False, team='U19 Tackle')
+    
+    return [
+        # Admins sehen die Pläne aller Teams - der Index beginnt mit team_name
+        ('dashboard: heutiger Plan (Admin)', today_plan_query(today, admin).limit(1), {'training_plans'}),
+        ('dashboard: heutiger Plan (Team)', today_plan_query(today, coach).limit(1), set()),
+        ('dashboard: Anzahl Zertifikate', user_certificates_query(user_id).with_entities(func.count()), set()),
+        ('dashboard: neueste Zertifikate', recent_certificates_query(user_id), set()),
+        ('dashboard: Erfahrungen', recent_experiences_query(user_id), set()),
+        ('certificates', keyset_query(user_certificates_query(user_id), CERTIFICATE_SORT_KEYS), set()),
+        ('experience', keyset_query(user_experiences_query(user_id), EXPERIENCE_SORT_KEYS), set()),
+        ('training_plans (Admin)', keyset_query(training_plans_query(admin), TRAINING_PLAN_SORT_KEYS), {'training_plans'}),
+        ('training_plans (Team)', keyset_query(training_plans_query(coach), TRAINING_PLAN_SORT_KEYS), set()),
+        ('training_plans (Team, Folgeseite)', keyset_query(training_plans_query(coach), TRAINING_PLAN_SORT_KEYS,
+                                                           [0, time(18, 0), plan_id]), set()),
+        ('training_plan_detail: Version', plan_version_query(plan_id), set()),
+        ('training_plan_detail: Aktivitäten', plan_activities_query(plan_id), set()),
+        ('training_plan_detail: Tagesablauf', activity_times_query(plan_id), set()),
+        ('coaches', keyset_query(with_coach_stats(coaches_query()), COACH_SORT_KEYS), set()),
+        ('coaches (Folgeseite)', keyset_query(with_coach_stats(coaches_query()), COACH_SORT_KEYS, ['M', user_id]), set()),
+        ('admin_coaches', keyset_query(with_coach_stats(User.query), COACH_SORT_KEYS), set()),
+        ('admin_coaches_export', with_coach_stats(coaches_export_query()), set()),
+        ('admin_certificate_expiry', expiring_certificates_query(today), set())
+    ]
+
+def explain_query_plan(query):
+    """Gibt die Zeilen von EXPLAIN QUERY PLAN als Liste von (id, parent, detail) zurück"""
+    statement = query.statement if hasattr(query, 'statement') else query
+    compiled = statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    rows = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    return [(row[0], row[1], row[3]) for row in rows]
+
+def _in_subquery(rows):
+    """IDs der Zeilen, die (auch indirekt) unter einem Subquery-Schritt stehen"""
+    details = {row_id: detail for row_id, parent, detail in rows}
+    parents = {row_id: parent for row_id, parent, detail in rows}
+    inside = set()
+    for row_id in details:
+        parent = parents[row_id]
+        while parent in details:
+            if _SUBQUERY_PATTERN.search(details[parent]):
+                inside.add(row_id)
+                break
+            parent = parents[parent]
+    return inside
+
+def find_full_scans(rows):
+    """
+    Tabellen, die laut Abfrageplan vollständig gelesen werden: ohne Index,
+    oder über einen Index, aber innerhalb eines Subquery-Schritts.
+    """
+    inside = _in_subquery(rows)
+    scans = []
+    for row_id, parent, detail in rows:
+        match = _SCAN_PATTERN.match(detail)
+        if not match or 'INTEGER PRIMARY KEY' in match.group(2) or 'VIRTUAL TABLE' in match.group(2):
+            continue
+        if 'INDEX' not in match.group(2) or row_id in inside:
+            scans.append(match.group(1))
+    return scans
+
+def format_query_plan(rows):
+    """Zeilen des Abfrageplans, nach Verschachtelung eingerückt (für die Ausgabe)"""
+    depths = {}
+    lines = []
+    for row_id, parent, detail in rows:
+        depths[row_id] = depths.get(parent, -1) + 1
+        lines.append('  ' * depths[row_id] + detail)
+    return lines
+
+def check_query_plans(today=None):
+    """
+    Prüft alle Abfragen aus get_hot_queries().
+    
+    Returns:
+        Liste von Dicts mit name, plan (Zeilen) und regressions (Tabellen mit unerlaubtem Full Scan)
+    """
+    results = []
+    for name, query, allowed_scans in get_hot_queries(today):
+        rows = explain_query_plan(query)
+        results.append({
+            'name': name,
+            'plan': format_query_plan(rows),
+            'regressions': [table for table in find_full_scans(rows) if table not in allowed_scans]
+        })
+    return results
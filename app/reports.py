@@ -0,0 +1,88 @@
+"""
+Vereinsweiter Bericht über abgelaufene und bald ablaufende Zertifikate
+
+Statt is_expired()/expires_soon() pro Objekt beim Rendern auszuwerten,
+liefert eine einzige Bereichsabfrage auf valid_until (Index
+ix_certificates_valid_until) alle Zertifikate, die bis in N Tagen ablaufen.
+Der Status eines Zertifikats ändert sich nur um Mitternacht, daher wird der
+Bericht pro Prozess bis Mitternacht gecacht - und zusätzlich verworfen,
+sobald sich Zertifikate oder Benutzer ändern (Versions-Abfrage wie in
+app/timeline.py, damit alle Gunicorn-Worker Änderungen sofort sehen).
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from app import db
+from app.models import User, Certificate
+import threading
+
+NO_TEAM = 'Ohne Team'
+
+_reports = {}  # days -> (version, report)
+_lock = threading.Lock()
+
+def get_certificates_version():
+    """Stand von Zertifikaten und Benutzern (Anzahl und letzte Änderung)"""
+    row = db.session.execute(select(
+        select(func.count(Certificate.id)).scalar_subquery(),
+        select(func.max(Certificate.updated_date)).scalar_subquery(),
+        select(func.count(User.id)).scalar_subquery(),
+        select(func.max(User.updated_date)).scalar_subquery()
+    )).first()
+    return tuple(row)
+
+def expiring_certificates_query(limit):
+    """Zertifikate mit valid_until bis limit samt Coach, nach Ablaufdatum sortiert"""
+    return db.session.query(
+        Certificate.id, Certificate.title, Certificate.organization, Certificate.valid_until,
+        User.id, User.full_name, User.email, User.team
+    ).join(User, User.id == Certificate.user_id) \
+        .filter(Certificate.valid_until <= limit) \
+        .order_by(Certificate.valid_until, Certificate.id)
+
+def build_expiry_report(days, today):
+    """
+    Berechnet den Bericht: alle Zertifikate mit valid_until bis today + days,
+    nach Team gruppiert und innerhalb eines Teams nach Ablaufdatum sortiert.
+    """
+    rows = expiring_certificates_query(today + timedelta(days=days)).all()
+    
+    teams = {}
+    for cert_id, title, organization, valid_until, user_id, full_name, email, team in rows:
+        group = teams.setdefault(team or NO_TEAM, {'team': team or NO_TEAM, 'expired': [], 'expiring': []})
+        days_left = (valid_until - today).days
+        group['expired' if days_left < 0 else 'expiring'].append({
+            'certificate_id': cert_id,
+            'title': title,
+            'organization': organization,
+            'valid_until': valid_until.isoformat(),
+            'days_left': days_left,
+            'user_id': user_id,
+            'coach': full_name or email,
+            'email': email
+        })
+    
+    return {
+        'today': today.isoformat(),
+        'days': days,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'expired_count': sum(len(group['expired']) for group in teams.values()),
+        'expiring_count': sum(len(group['expiring']) for group in teams.values()),
+        # Teams alphabetisch, "Ohne Team" zuletzt
+        'teams': sorted(teams.values(), key=lambda group: (group['team'] == NO_TEAM, group['team']))
+    }
+
+def get_expiry_report(days=30, today=None):
+    """
+    Gibt den (gecachten) Bericht für die nächsten days Tage zurück.
+    Der Cache gilt bis Mitternacht bzw. bis zur nächsten Änderung.
+    """
+    today = today or datetime.now().date()
+    version = (today,) + get_certificates_version()
+    entry = _reports.get(days)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    
+    report = build_expiry_report(days, today)
+    with _lock:
+        _reports[days] = (version, report)
+    return report
@@ -1,17 +1,37 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, send_file, abort, current_app
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, jsonify, send_file, abort, current_app,
+                   Response, stream_with_context, send_from_directory)
 from flask_login import login_required, current_user
 from sqlalchemy import func
+from werkzeug.security import safe_join
 from app import db
 from app.models import User, Certificate, Experience, TrainingPlan, TrainingActivity
 from app.forms import (ProfileForm, CertificateForm, ExperienceForm, TrainingPlanForm, 
                       TrainingActivityForm, AdminUserForm)
-from app.utils import save_certificate_file, calculate_activity_times, get_next_start_time, check_activity_status
-from app.backup_restore import export_backup, import_backup, create_backup_zip, restore_backup_from_zip
+from app.utils import save_certificate_file, calculate_activity_times
+from app.backup_restore import import_backup_stream, create_backup_zip, restore_backup_chain, backup_filename
+from app.queries import (get_coaches_listing, iter_coaches_with_stats, today_plan_query, training_plans_query,
+                         user_certificates_query, user_experiences_query, recent_certificates_query,
+                         recent_experiences_query, coaches_query, coaches_export_query,
+                         CERTIFICATE_SORT_KEYS, EXPERIENCE_SORT_KEYS, TRAINING_PLAN_SORT_KEYS)
+from app.pagination import paginate_keyset
+from app.storage import release_certificate_file, is_thumbnail, ensure_thumbnail
+from app.zitadel_http import get_metrics as get_zitadel_metrics
+from app.timeline import get_plan_timeline, get_plan_version
+from app.fragments import render_plan_activities
+from app.reports import get_expiry_report
+from app.jobs import start_backup_job, start_restore_job, get_job, artifact_path, JOB_STATUS_DONE
 from datetime import datetime, date, time, timedelta
+from time import sleep
+from urllib.parse import quote
 import csv
 import io
 import os
 import copy
+import zlib
+import mimetypes
+import json
+import hashlib
+import threading
 
 bp = Blueprint('routes', __name__)
 
@@ -62,6 +82,52 @@ def before_request():
     
     return None
 
+def wants_json():
+    """Listen liefern mit ?format=json dieselbe Seite als JSON (Cursor in next_cursor)"""
+    return request.args.get('format') == 'json'
+
+def certificate_json(cert):
+    return {
+        'id': cert.id,
+        'title': cert.title,
+        'organization': cert.organization,
+        'acquisition_date': cert.acquisition_date.isoformat(),
+        'valid_until': cert.valid_until.isoformat() if cert.valid_until else None,
+        'file_url': cert.file_url
+    }
+
+def experience_json(exp):
+    return {
+        'id': exp.id,
+        'start_year': exp.start_year,
+        'end_year': exp.end_year,
+        'team': exp.team,
+        'position': exp.position
+    }
+
+def coach_json(row):
+    coach, cert_count, experience_years = row
+    return {
+        'id': coach.id,
+        'full_name': coach.full_name,
+        'email': coach.email,
+        'team': coach.team,
+        'mobile_phone': coach.mobile_phone,
+        'certificate_count': cert_count,
+        'experience_years': experience_years
+    }
+
+def training_plan_json(plan):
+    return {
+        'id': plan.id,
+        'title': plan.title,
+        'team_name': plan.team_name,
+        'weekday': plan.weekday,
+        'start_time': plan.start_time.strftime('%H:%M'),
+        'start_date': plan.start_date.isoformat(),
+        'end_date': plan.end_date.isoformat()
+    }
+
 # Dashboard
 @bp.route('/')
 @bp.route('/dashboard')
@@ -69,27 +135,17 @@ def before_request():
 def dashboard():
     # Heutiger Trainingsplan
     today = datetime.now().date()
-    weekday = today.weekday()
-    today_plan = TrainingPlan.query.filter(
-        TrainingPlan.start_date <= today,
-        TrainingPlan.end_date >= today,
-        TrainingPlan.weekday == weekday
-    )
-    
-    if not current_user.is_admin:
-        today_plan = today_plan.filter(TrainingPlan.team_name == current_user.team)
-    
-    today_plan = today_plan.first()
+    today_plan = today_plan_query(today, current_user).first()
     
     # Statistiken
-    cert_count = current_user.certificates.count()
+    cert_count = user_certificates_query(current_user.id).count()
     experience_years = current_user.get_total_experience_years()
     
     # Neueste Zertifikate
-    recent_certificates = current_user.certificates.order_by(Certificate.acquisition_date.desc()).limit(5).all()
+    recent_certificates = recent_certificates_query(current_user.id).all()
     
     # Neueste Erfahrungen
-    recent_experiences = current_user.experiences.order_by(Experience.start_year.desc()).limit(5).all()
+    recent_experiences = recent_experiences_query(current_user.id).all()
     
     return render_template('dashboard.html', 
                         today_plan=today_plan,
@@ -132,8 +188,10 @@ def profile():
 @bp.route('/certificates')
 @login_required
 def certificates():
-    certs = current_user.certificates.order_by(Certificate.acquisition_date.desc()).all()
-    return render_template('certificates.html', certificates=certs)
+    page = paginate_keyset(user_certificates_query(current_user.id), CERTIFICATE_SORT_KEYS, request.args.get('cursor'))
+    if wants_json():
+        return jsonify(page.to_dict(certificate_json))
+    return render_template('certificates.html', certificates=page.items, page=page)
 
 @bp.route('/certificates/new', methods=['GET', 'POST'])
 @login_required
@@ -177,12 +235,15 @@ def edit_certificate(id):
         cert.acquisition_date = form.acquisition_date.data
         cert.valid_until = form.valid_until.data if form.valid_until.data else None
         
+        old_file_url = cert.file_url
         if form.file.data:
             file_url = save_certificate_file(form.file.data)
             if file_url:
                 cert.file_url = file_url
         
         db.session.commit()
+        if old_file_url and old_file_url != cert.file_url:
+            release_certificate_file(old_file_url)
         flash('Zertifikat erfolgreich aktualisiert.', 'success')
         return redirect(url_for('routes.certificates'))
     
@@ -196,8 +257,11 @@ def delete_certificate(id):
     if cert.user_id != current_user.id and not current_user.is_admin:
         abort(403)
     
+    file_url = cert.file_url
     db.session.delete(cert)
     db.session.commit()
+    if file_url:
+        release_certificate_file(file_url)
     flash('Zertifikat erfolgreich gelöscht.', 'success')
     return redirect(url_for('routes.certificates'))
 
@@ -205,8 +269,10 @@ def delete_certificate(id):
 @bp.route('/experience')
 @login_required
 def experience():
-    experiences = current_user.experiences.order_by(Experience.start_year.desc()).all()
-    return render_template('experience.html', experiences=experiences)
+    page = paginate_keyset(user_experiences_query(current_user.id), EXPERIENCE_SORT_KEYS, request.args.get('cursor'))
+    if wants_json():
+        return jsonify(page.to_dict(experience_json))
+    return render_template('experience.html', experiences=page.items, page=page)
 
 @bp.route('/experience/new', methods=['GET', 'POST'])
 @login_required
@@ -267,33 +333,26 @@ def delete_experience(id):
 @login_required
 def coaches():
     search = request.args.get('search', '')
-    coaches_list = User.query.filter(User.is_admin == False)
-    
-    if search:
-        coaches_list = coaches_list.filter(
-            db.or_(
-                User.full_name.contains(search),
-                User.email.contains(search),
-                User.team.contains(search)
-            )
-        )
+    coaches_list = coaches_query()
     
-    coaches_list = coaches_list.order_by(User.full_name).all()
+    # Zertifikate und Erfahrung in derselben Query mitladen (kein N+1)
+    page = get_coaches_listing(coaches_list, search)
+    if wants_json():
+        return jsonify(page.to_dict(coach_json))
     
-    return render_template('coaches.html', coaches=coaches_list, search=search)
+    return render_template('coaches.html', coaches=page.items, page=page, search=search)
 
 # Trainingspläne
 @bp.route('/training-plans')
 @login_required
 def training_plans():
-    plans = TrainingPlan.query
+    plans = training_plans_query(current_user)
     
-    if not current_user.is_admin:
-        plans = plans.filter(TrainingPlan.team_name == current_user.team)
+    page = paginate_keyset(plans, TRAINING_PLAN_SORT_KEYS, request.args.get('cursor'))
+    if wants_json():
+        return jsonify(page.to_dict(training_plan_json))
     
-    plans = plans.order_by(TrainingPlan.weekday, TrainingPlan.start_time).all()
-    
-    return render_template('training_plans.html', plans=plans)
+    return render_template('training_plans.html', plans=page.items, page=page)
 
 @bp.route('/training-plans/<int:id>')
 @login_required
@@ -303,9 +362,10 @@ def training_plan_detail(id):
     if not current_user.is_admin and plan.team_name != current_user.team:
         abort(403)
     
-    activities = plan.activities.all()
+    # Aktivitäten-Tabelle aus dem Fragment-Cache (neu gerendert nur nach Änderungen am Plan)
+    activities_table = render_plan_activities(plan, get_plan_version(plan.id), current_user.is_admin)
     
-    return render_template('training_plan_detail.html', plan=plan, activities=activities)
+    return render_template('training_plan_detail.html', plan=plan, activities_table=activities_table)
 
 @bp.route('/training-plans/new', methods=['GET', 'POST'])
 @login_required
@@ -345,10 +405,16 @@ def edit_training_plan(id):
         plan.start_date = form.start_date.data
         plan.end_date = form.end_date.data
         plan.weekday = form.weekday.data
+        start_time_changed = plan.start_time != form.start_time.data
         plan.start_time = form.start_time.data
         plan.dresscode = form.dresscode.data or None
         plan.focus = form.focus.data or None
         plan.goals = form.goals.data or None
+        
+        # Neue Startzeit verschiebt alle Aktivitäten (vollständig neu berechnen)
+        if start_time_changed:
+            calculate_activity_times(plan, plan.activities)
+        
         db.session.commit()
         flash('Trainingsplan erfolgreich aktualisiert.', 'success')
         return redirect(url_for('routes.training_plan_detail', id=plan.id))
@@ -521,7 +587,7 @@ def new_activity(plan_id):
         
         # Zeiten berechnen
         activities = plan.activities
-        calculate_activity_times(plan, activities, activity)
+        calculate_activity_times(plan, activities, activity, changed_order=activity.order)
         
         db.session.add(activity)
         db.session.commit()
@@ -580,8 +646,8 @@ def edit_activity(plan_id, id):
         
         activity.notes = form.notes.data or None
         
-        # Zeiten neu berechnen
-        calculate_activity_times(plan, plan.activities)
+        # Zeiten ab dieser Aktivität neu berechnen
+        calculate_activity_times(plan, plan.activities, changed_order=activity.order)
         
         db.session.commit()
         flash('Aktivität erfolgreich aktualisiert.', 'success')
@@ -600,9 +666,9 @@ def delete_activity(plan_id, id):
     
     db.session.delete(activity)
     
-    # Zeiten neu berechnen
+    # Zeiten ab der gelöschten Position neu berechnen
     plan = TrainingPlan.query.get_or_404(plan_id)
-    calculate_activity_times(plan, plan.activities)
+    calculate_activity_times(plan, plan.activities, changed_order=activity.order)
     
     db.session.commit()
     flash('Aktivität erfolgreich gelöscht.', 'success')
@@ -613,19 +679,31 @@ def delete_activity(plan_id, id):
 @admin_required
 def reorder_activities(plan_id):
     plan = TrainingPlan.query.get_or_404(plan_id)
-    data = request.get_json()
+    data = request.get_json(silent=True)
     
-    if 'order' not in data:
+    if not isinstance(data, dict) or not isinstance(data.get('order'), dict):
         return jsonify({'error': 'Keine Reihenfolge angegeben'}), 400
     
+    # {activity_id: order} mit ganzzahligen Werten (Eingabe des Clients)
+    try:
+        new_orders = {int(activity_id): int(order) for activity_id, order in data['order'].items()}
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Ungültige Reihenfolge'}), 400
+    
     # Aktualisiere Order-Werte
-    for activity_id, order in data['order'].items():
-        activity = TrainingActivity.query.get(activity_id)
-        if activity and activity.plan_id == plan_id:
+    changed_orders = []
+    for activity_id, order in new_orders.items():
+        activity = db.session.get(TrainingActivity, activity_id)
+        if activity and activity.plan_id == plan_id and activity.order != order:
+            changed_orders += [activity.order, order]
             activity.order = order
     
-    # Zeiten neu berechnen
-    calculate_activity_times(plan, plan.activities)
+    if not changed_orders:
+        return jsonify({'success': True})
+    
+    # Zeiten der verschobenen Positionen neu berechnen
+    calculate_activity_times(plan, plan.activities, changed_order=min(changed_orders),
+                             changed_until=max(changed_orders))
     
     db.session.commit()
     return jsonify({'success': True})
@@ -634,20 +712,117 @@ def reorder_activities(plan_id):
 @bp.route('/api/training-plans/<int:id>/activities/status')
 @login_required
 def get_activity_status(id):
-    plan = TrainingPlan.query.get_or_404(id)
+    """
+    Status der Aktivitäten und Zeitpunkt des nächsten Statuswechsels.
     
-    if not current_user.is_admin and plan.team_name != current_user.team:
+    Die Antwort trägt ein schwaches ETag (Plan-Stand + aktueller Abschnitt
+    des Tagesablaufs) und ist bis zum nächsten Statuswechsel cachebar;
+    unveränderte Abfragen werden mit 304 ohne Body beantwortet.
+    """
+    timeline = get_plan_timeline(id)
+    if timeline is None:
+        abort(404)
+    
+    if not current_user.is_admin and timeline.team_name != current_user.team:
+        abort(403)
+    
+    now = datetime.now()
+    status, next_transition = timeline.status_at(now)
+    etag = hashlib.sha1(repr((timeline.version, sorted(status.items()), next_transition)).encode()).hexdigest()[:20]
+    
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify({
+            'status': status,
+            # Mit Zeitzone, damit der Browser die Wartezeit selbst berechnen kann
+            'next_transition': next_transition.astimezone().isoformat() if next_transition else None
+        })
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    # Bis zum nächsten Statuswechsel, höchstens STATUS_MAX_AGE (damit Planänderungen sichtbar werden)
+    max_age = current_app.config.get('STATUS_MAX_AGE', 60)
+    if next_transition:
+        max_age = min(max_age, int((next_transition - now).total_seconds()))
+    response.cache_control.max_age = max_age
+    return response
+
+# Offene Status-Streams pro Prozess (jeder belegt einen Gunicorn-Thread)
+_status_stream_slots = None
+_status_stream_lock = threading.Lock()
+
+def _acquire_status_stream_slot():
+    """Reserviert einen Platz für einen Status-Stream (False, wenn alle belegt sind)"""
+    global _status_stream_slots
+    with _status_stream_lock:
+        if _status_stream_slots is None:
+            _status_stream_slots = threading.BoundedSemaphore(current_app.config.get('STATUS_STREAM_MAX_CONNECTIONS', 12))
+    return _status_stream_slots.acquire(blocking=False)
+
+def generate_activity_status_events(timeline):
+    """
+    Erzeugt Server-Sent Events mit dem Status der Aktivitäten (Generator).
+    
+    Der Stream schläft bis zum nächsten Statuswechsel des vorberechneten
+    Tagesablaufs und sendet dazwischen nur Heartbeats. Ein Event wird nur
+    bei einer Änderung gesendet. Nach STATUS_STREAM_MAX_DURATION endet der
+    Stream und der Browser verbindet sich neu (übernimmt dabei auch
+    geänderte Trainingspläne); nach der letzten Aktivität folgt 'done'.
+    """
+    config = current_app.config
+    heartbeat = config.get('STATUS_STREAM_HEARTBEAT', 15)
+    deadline = datetime.now() + timedelta(seconds=config.get('STATUS_STREAM_MAX_DURATION', 300))
+    last_status = None
+    
+    # Wartezeit des Browsers vor dem Neuverbinden (Millisekunden)
+    yield "retry: 5000\n\n"
+    while True:
+        now = datetime.now()
+        status, next_transition = timeline.status_at(now)
+        
+        if status != last_status:
+            yield f"event: status\ndata: {json.dumps(status)}\n\n"
+            last_status = status
+        else:
+            # Heartbeat: hält Proxies offen und erkennt getrennte Clients
+            yield ": ping\n\n"
+        
+        if next_transition is None:
+            # Keine Statuswechsel mehr heute - Client schließt die Verbindung
+            yield "event: done\ndata: {}\n\n"
+            return
+        if now >= deadline:
+            return
+        sleep(max(min((next_transition - now).total_seconds(), (deadline - now).total_seconds(), heartbeat), 0.05))
+
+@bp.route('/api/training-plans/<int:id>/activities/status/stream')
+@login_required
+def stream_activity_status(id):
+    """Live-Status als Server-Sent Events (Fallback im Browser: Polling von get_activity_status)"""
+    timeline = get_plan_timeline(id)
+    if timeline is None:
+        abort(404)
+    
+    if not current_user.is_admin and timeline.team_name != current_user.team:
         abort(403)
     
-    activities = plan.activities.all()
-    status = {}
+    # Keine Datenbankverbindung für die Dauer des Streams halten
+    db.session.close()
     
-    for activity in activities:
-        activity_status = check_activity_status(activity, plan)
-        if activity_status:
-            status[activity.id] = activity_status
+    if not _acquire_status_stream_slot():
+        # Alle Plätze in diesem Worker belegt - der Browser fällt auf Polling zurück
+        abort(503)
     
-    return jsonify(status)
+    response = Response(
+        stream_with_context(generate_activity_status_events(timeline)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Nginx: Events nicht puffern
+        }
+    )
+    response.call_on_close(_status_stream_slots.release)
+    return response
 
 # Admin-Bereich
 @bp.route('/admin/coaches')
@@ -655,28 +830,36 @@ def get_activity_status(id):
 @admin_required
 def admin_coaches():
     search = request.args.get('search', '')
-    coaches_list = User.query
+    page = get_coaches_listing(User.query, search)
+    if wants_json():
+        return jsonify(page.to_dict(coach_json))
     
-    if search:
-        coaches_list = coaches_list.filter(
-            db.or_(
-                User.full_name.contains(search),
-                User.email.contains(search)
-            )
-        )
-    
-    coaches_list = coaches_list.order_by(User.full_name).all()
-    
-    return render_template('admin/coaches.html', coaches=coaches_list, search=search)
+    return render_template('admin/coaches.html', coaches=page.items, page=page, search=search)
 
-@bp.route('/admin/coaches/export')
-@login_required
-@admin_required
-def export_coaches_csv():
-    coaches = User.query.order_by(User.full_name).all()
+# Anzahl CSV-Zeilen pro Datenbank-Batch und pro gesendetem Chunk
+CSV_EXPORT_BATCH_SIZE = 500
+
+def generate_coaches_csv(compress=False):
+    """
+    Erzeugt den Coach-Export als CSV-Chunks (Generator).
+    
+    Die Coaches werden batchweise über yield_per() gelesen, jeder Batch wird
+    sofort geschrieben und verworfen - der Speicherbedarf bleibt unabhängig
+    von der Anzahl Coaches konstant.
     
+    Args:
+        compress: Wenn True, wird der Datenstrom gzip-komprimiert
+    """
     output = io.StringIO()
     writer = csv.writer(output)
+    # wbits=31 erzeugt gzip-Header und -Trailer (statt rohem zlib)
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    
+    def take_chunk():
+        data = output.getvalue().encode('utf-8')
+        output.seek(0)
+        output.truncate(0)
+        return compressor.compress(data) if compressor else data
     
     # Header
     writer.writerow([
@@ -685,7 +868,8 @@ def export_coaches_csv():
     ])
     
     # Daten
-    for coach in coaches:
+    coaches = iter_coaches_with_stats(coaches_export_query().yield_per(CSV_EXPORT_BATCH_SIZE))
+    for row_number, (coach, cert_count, experience_years) in enumerate(coaches, start=1):
         writer.writerow([
             coach.full_name or '',
             coach.email,
@@ -696,16 +880,40 @@ def export_coaches_csv():
             coach.zip_code or '',
             coach.city or '',
             coach.birth_date.strftime('%d.%m.%Y') if coach.birth_date else '',
-            coach.certificates.count(),
-            coach.get_total_experience_years()
+            cert_count,
+            experience_years
         ])
-    
-    output.seek(0)
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'coaches_export_{datetime.now().strftime("%Y%m%d")}.csv'
+        if row_number % CSV_EXPORT_BATCH_SIZE == 0:
+            chunk = take_chunk()
+            if chunk:
+                yield chunk
+    
+    chunk = take_chunk()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+@bp.route('/admin/coaches/export')
+@login_required
+@admin_required
+def export_coaches_csv():
+    """Streamt den Coach-Export als CSV (optional gzip-komprimiert mit ?gzip=1)"""
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'on')
+    filename = f'coaches_export_{datetime.now().strftime("%Y%m%d")}.csv'
+    mimetype = 'text/csv'
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    
+    return Response(
+        stream_with_context(generate_coaches_csv(compress=compress)),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            # Reverse Proxy (nginx) soll den Stream nicht puffern
+            'X-Accel-Buffering': 'no'
+        }
     )
 
 @bp.route('/admin/coaches/<int:id>', methods=['GET', 'POST'])
@@ -739,21 +947,29 @@ def admin_edit_coach(id):
     return render_template('admin/coach_detail.html', coach=coach, form=form, certificates=certificates)
 
 # Backup & Restore
+def validate_backup_uploads(files):
+    """Prüft hochgeladene Backup-Dateien; gibt eine Fehlermeldung oder None zurück"""
+    # Unterstütze sowohl ZIP als auch JSON (für Rückwärtskompatibilität)
+    if not all(f.filename.lower().endswith(('.zip', '.json')) for f in files):
+        return 'Nur ZIP- oder JSON-Dateien werden unterstützt.'
+    if len(files) > 1 and not all(f.filename.lower().endswith('.zip') for f in files):
+        return 'Backup-Ketten (mehrere Dateien) werden nur als ZIP-Dateien unterstützt.'
+    return None
+
 @bp.route('/admin/backup')
 @login_required
 @admin_required
 def backup_data():
-    """Erstellt ein Backup aller Daten (inklusive Dateien)"""
+    """Erstellt ein Backup aller Daten (inklusive Dateien), mit ?mode=incremental nur die Änderungen"""
     try:
-        zip_buffer = create_backup_zip()
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'coaches_backup_{timestamp}.zip'
+        incremental = request.args.get('mode') == 'incremental'
+        zip_buffer = create_backup_zip(incremental=incremental)
         
         return send_file(
             zip_buffer,
             mimetype='application/zip',
             as_attachment=True,
-            download_name=filename
+            download_name=backup_filename(incremental)
         )
     except Exception as e:
         flash(f'Fehler beim Erstellen des Backups: {str(e)}', 'error')
@@ -769,18 +985,18 @@ def restore_data():
             flash('Keine Datei ausgewählt.', 'error')
             return redirect(url_for('routes.admin_backup_restore'))
         
-        file = request.files['backup_file']
-        if file.filename == '':
+        # Mehrere Dateien: Backup-Kette aus vollständigem und inkrementellen Backups
+        files = [f for f in request.files.getlist('backup_file') if f.filename]
+        if not files:
             flash('Keine Datei ausgewählt.', 'error')
             return redirect(url_for('routes.admin_backup_restore'))
         
-        # Unterstütze sowohl ZIP als auch JSON (für Rückwärtskompatibilität)
-        is_zip = file.filename.endswith('.zip')
-        is_json = file.filename.endswith('.json')
-        
-        if not (is_zip or is_json):
-            flash('Nur ZIP- oder JSON-Dateien werden unterstützt.', 'error')
+        error = validate_backup_uploads(files)
+        if error:
+            flash(error, 'error')
             return redirect(url_for('routes.admin_backup_restore'))
+        file = files[0]
+        is_zip = file.filename.lower().endswith('.zip')
         
         try:
             clear_existing = request.form.get('clear_existing') == 'on'
@@ -793,12 +1009,12 @@ def restore_data():
                 current_user_is_admin = current_user.is_admin
             
             if is_zip:
-                # ZIP-Backup (mit Dateien)
-                success, message, stats = restore_backup_from_zip(file, clear_existing=clear_existing)
+                # ZIP-Backup (mit Dateien), ggf. mit inkrementellen Backups
+                success, message, stats = restore_backup_chain(files, clear_existing=clear_existing)
             else:
-                # JSON-Backup (nur Daten, Rückwärtskompatibilität)
-                backup_json = file.read().decode('utf-8')
-                success, message, stats = import_backup(backup_json, clear_existing=clear_existing)
+                # JSON-Backup (nur Daten, Rückwärtskompatibilität) - inkrementell gelesen
+                json_stream = io.TextIOWrapper(file.stream, encoding='utf-8')
+                success, message, stats = import_backup_stream(json_stream, clear_existing=clear_existing)
             
             # Nach dem Restore: Prüfe ob der eingeloggte Benutzer noch existiert
             if success and clear_existing and current_user_email:
@@ -850,50 +1066,123 @@ def admin_backup_restore():
     """Backup & Restore Verwaltungsseite"""
     return render_template('admin/backup_restore.html')
 
+# Backup & Restore als Hintergrund-Jobs (vermeidet Gunicorn-Timeouts bei grossen Backups)
+@bp.route('/admin/jobs/backup', methods=['POST'])
+@login_required
+@admin_required
+def start_backup():
+    """Startet ein Backup im Hintergrund"""
+    job, error = start_backup_job(incremental=request.form.get('mode') == 'incremental')
+    if error:
+        return jsonify({'error': error}), 409
+    return jsonify(job), 202
+
+@bp.route('/admin/jobs/restore', methods=['POST'])
+@login_required
+@admin_required
+def start_restore():
+    """Startet einen Restore im Hintergrund"""
+    files = [f for f in request.files.getlist('backup_file') if f.filename]
+    if not files:
+        return jsonify({'error': 'Keine Datei ausgewählt.'}), 400
+    
+    error = validate_backup_uploads(files)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    clear_existing = request.form.get('clear_existing') == 'on'
+    job, error = start_restore_job(files, clear_existing=clear_existing)
+    if error:
+        return jsonify({'error': error}), 409
+    return jsonify(job), 202
+
+@bp.route('/admin/jobs/<job_id>')
+@login_required
+@admin_required
+def job_status(job_id):
+    """Status und Fortschritt eines Hintergrund-Jobs"""
+    job = get_job(job_id)
+    if not job:
+        abort(404)
+    return jsonify(job)
+
+@bp.route('/admin/jobs/<job_id>/download')
+@login_required
+@admin_required
+def download_job_backup(job_id):
+    """Liefert das Backup-ZIP eines abgeschlossenen Backup-Jobs aus"""
+    job = get_job(job_id)
+    if not job or job['type'] != 'backup' or job['status'] != JOB_STATUS_DONE:
+        abort(404)
+    
+    zip_path = artifact_path(job_id, 'zip')
+    if not os.path.exists(zip_path):
+        abort(404)
+    return send_file(
+        zip_path,
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=job['artifact']
+    )
+
+@bp.route('/admin/certificates/expiry')
+@login_required
+@admin_required
+def admin_certificate_expiry():
+    """Abgelaufene und bald ablaufende Zertifikate aller Coaches, nach Team gruppiert"""
+    days = request.args.get('days', current_app.config.get('CERTIFICATE_EXPIRY_DAYS', 30), type=int)
+    days = max(0, min(days, 365))
+    report = get_expiry_report(days)
+    if wants_json():
+        return jsonify(report)
+    return render_template('admin/certificate_expiry.html', report=report, days=days)
+
+@bp.route('/admin/metrics/zitadel')
+@login_required
+@admin_required
+def zitadel_metrics():
+    """Latenz- und Fehler-Metriken der Zitadel-Aufrufe (pro Worker-Prozess)"""
+    metrics = get_zitadel_metrics()
+    metrics['pid'] = os.getpid()
+    return jsonify(metrics)
+
 # Route zum Servieren von Upload-Dateien (falls Flask sie nicht automatisch findet)
 @bp.route('/static/uploads/certificates/<path:filename>')
 def serve_certificate_file(filename):
     """Serviert Zertifikatsdateien explizit
     
     Hinweis: Login ist nicht erforderlich, da die Dateien auch in <img> Tags eingebettet werden können.
-    Die Sicherheitsprüfung stellt sicher, dass nur Dateien aus dem Upload-Ordner serviert werden.
+    send_from_directory stellt sicher, dass nur Dateien aus dem Upload-Ordner serviert werden, und
+    unterstützt bedingte Requests (ETag/Last-Modified -> 304) sowie HTTP Range.
+    Dateinamen werden nie wiederverwendet (Hash bzw. Zeitstempel im Namen), daher dürfen
+    Browser die Dateien unbegrenzt cachen. Geteilte Caches (Proxies, CDN) dürfen die
+    persönlichen Dokumente nicht speichern (private).
     """
-    try:
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        file_path = os.path.join(upload_folder, filename)
-        
-        # Normalisiere Pfade für Vergleich
-        upload_folder_abs = os.path.abspath(upload_folder)
-        file_path_abs = os.path.abspath(file_path)
-        
-        # Debug: Logge die verwendeten Pfade
-        current_app.logger.info(f"Suche Datei: {filename}")
-        current_app.logger.info(f"UPLOAD_FOLDER: {upload_folder_abs}")
-        current_app.logger.info(f"Datei-Pfad: {file_path_abs}")
-        current_app.logger.info(f"UPLOAD_BASE aus Config: {current_app.config.get('UPLOAD_BASE', 'NICHT GESETZT')}")
-        
-        # Sicherheitsprüfung: Stelle sicher, dass die Datei im Upload-Ordner ist
-        if not file_path_abs.startswith(upload_folder_abs):
-            current_app.logger.warning(f"Versuch, Datei außerhalb des Upload-Ordners zu laden: {file_path_abs}")
-            abort(403)
-        
-        if os.path.exists(file_path):
-            current_app.logger.info(f"Datei gefunden, serviere: {file_path}")
-            return send_file(file_path)
-        else:
-            current_app.logger.warning(f"Datei nicht gefunden: {file_path}")
-            # Prüfe ob das Verzeichnis existiert
-            if not os.path.exists(upload_folder):
-                current_app.logger.error(f"Upload-Ordner existiert nicht: {upload_folder_abs}")
-            else:
-                # Liste Dateien im Verzeichnis für Debugging
-                try:
-                    files_in_dir = os.listdir(upload_folder)
-                    current_app.logger.info(f"Dateien im Upload-Ordner: {files_in_dir[:10]}")  # Erste 10 Dateien
-                except Exception as e:
-                    current_app.logger.error(f"Konnte Upload-Ordner nicht lesen: {e}")
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    max_age = current_app.config.get('CERTIFICATE_CACHE_MAX_AGE', 365 * 24 * 3600)
+    
+    if is_thumbnail(filename) and current_user.is_authenticated:
+        # Fehlende Vorschaubilder (ältere Uploads) beim ersten Abruf erzeugen - nur mit Login,
+        # damit anonyme Anfragen kein Dekodieren und Schreiben von Bildern auslösen
+        thumbnail_path = safe_join(upload_folder, filename)
+        if thumbnail_path and not os.path.exists(thumbnail_path):
+            ensure_thumbnail(thumbnail_path)
+    
+    accel_prefix = current_app.config.get('CERTIFICATE_X_ACCEL_PREFIX')
+    if accel_prefix:
+        # Nginx liefert die Datei aus (internal location), der Worker ist sofort wieder frei
+        file_path = safe_join(upload_folder, filename)
+        if file_path is None or not os.path.isfile(file_path):
             abort(404)
-    except Exception as e:
-        current_app.logger.error(f"Fehler beim Servieren der Datei {filename}: {str(e)}", exc_info=True)
-        abort(404)
-
+        response = current_app.response_class()
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(filename)
+        response.headers['Content-Type'] = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    else:
+        # Mit USE_X_SENDFILE setzt send_file den X-Sendfile Header statt die Datei zu streamen
+        response = send_from_directory(upload_folder, filename, max_age=max_age)
+    
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,179 @@
+"""
+Volltextsuche für Coaches
+
+Die Suche nach Name, E-Mail, Team, Ort und Lizenznummer lief über
+LIKE '%begriff%', was keinen Index nutzen kann. Unter SQLite gibt es dafür
+die FTS5-Tabelle coach_search (rowid = users.id):
+
+- Tokenizer unicode61 mit remove_diacritics 2: "Muller" findet "Müller"
+- Umlaute werden zusätzlich umschrieben indexiert: "Mueller" findet "Müller"
+- Jeder Suchbegriff ist ein Präfix: "mül" findet "Müller"
+- Sortierung nach Relevanz (bm25, Name stärker gewichtet als Ort)
+
+Die Tabelle wird über ORM-Events aktuell gehalten; nach Bulk-Änderungen
+(Backup-Import) oder bei Bedarf mit "flask coaches rebuild-search-index"
+neu aufgebaut. Fehlt die Tabelle (Migration noch nicht ausgeführt, FTS5
+nicht verfügbar, andere Datenbank), wird mit ILIKE gesucht (unter SQLite
+und PostgreSQL gleichermaßen ohne Beachtung der Gross-/Kleinschreibung).
+Unter PostgreSQL werden diese Suchen durch die pg_trgm-Indizes der
+Migration beschleunigt.
+"""
+from sqlalchemy import event, inspect, literal_column, or_, table, column, text, Float
+from app import db
+from app.models import User
+import re
+import threading
+import time
+
+SEARCH_TABLE = 'coach_search'
+SEARCH_FIELDS = ('full_name', 'email', 'team', 'city', 'license_number')
+# bm25-Gewichte in der Reihenfolge von SEARCH_FIELDS
+SEARCH_RANK = 'bm25(10.0, 2.0, 1.0, 1.0, 5.0)'
+
+_TRANSLITERATION = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'Ä': 'Ae', 'Ö': 'Oe', 'Ü': 'Ue', 'ß': 'ss'})
+_TERM_PATTERN = re.compile(r'\w+')
+
+coach_search = table(SEARCH_TABLE, column('rowid'), column('rank', Float))
+
+# Nur das Vorhandensein wird dauerhaft gecacht; fehlt die Tabelle, wird nach
+# einigen Sekunden erneut geprüft (sie kann in einem anderen Prozess entstehen)
+RECHECK_MISSING_AFTER = 30
+
+_available = {}  # Datenbank-URL -> True bzw. Zeitpunkt der letzten negativen Prüfung
+_lock = threading.Lock()
+
+def index_value(value):
+    """Wert für den Index: Original plus Umschrift der Umlaute ("Müller Mueller")"""
+    if not value:
+        return ''
+    transliterated = value.translate(_TRANSLITERATION)
+    return value if transliterated == value else f"{value} {transliterated}"
+
+def build_match_query(search):
+    """
+    Wandelt eine Benutzereingabe in eine FTS5-Abfrage um: jedes Wort als
+    Präfix, alle Wörter müssen vorkommen. Gibt None zurück, wenn die
+    Eingabe keine Wörter enthält.
+    """
+    terms = _TERM_PATTERN.findall(search)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def is_search_index_available(connection):
+    """Prüft, ob die FTS-Tabelle existiert (gecacht, fehlende Tabelle nur für kurze Zeit)"""
+    if connection.dialect.name != 'sqlite':
+        return False
+    key = str(connection.engine.url)
+    cached = _available.get(key)
+    if cached is True:
+        return True
+    if cached is not None and time.monotonic() - cached < RECHECK_MISSING_AFTER:
+        return False
+    
+    available = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': SEARCH_TABLE}
+    ).first() is not None
+    with _lock:
+        _available[key] = True if available else time.monotonic()
+    return available
+
+def _like_pattern(search):
+    """Muster für ILIKE '%begriff%' (%, _ und \\ in der Eingabe maskiert)"""
+    escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+def search_coaches(query, search):
+    """
+    Filtert eine User-Query nach dem Suchbegriff (ohne Sortierung).
+    
+    Returns:
+        (query, ranked): ranked ist True, wenn mit dem FTS-Index gesucht wird;
+        die Query kann dann nach coach_search.c.rank (Relevanz) sortiert werden,
+        sonst nur nach Spalten von User (ILIKE-Fallback).
+    """
+    match_query = build_match_query(search)
+    if match_query and is_search_index_available(db.session.connection()):
+        return query.join(coach_search, coach_search.c.rowid == User.id) \
+            .filter(literal_column(SEARCH_TABLE).op('MATCH')(match_query)), True
+    
+    pattern = _like_pattern(search)
+    return query.filter(
+        or_(*[getattr(User, field).ilike(pattern, escape='\\') for field in SEARCH_FIELDS])
+    ), False
+
+def _index_rows(users):
+    return [
+        dict({'rowid': user.id}, **{field: index_value(getattr(user, field)) for field in SEARCH_FIELDS})
+        for user in users
+    ]
+
+_INSERT = text(
+    f"INSERT INTO {SEARCH_TABLE} (rowid, {', '.join(SEARCH_FIELDS)}) "
+    f"VALUES (:rowid, {', '.join(':' + field for field in SEARCH_FIELDS)})"
+)
+_DELETE = text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid")
+
+def create_search_table(connection):
+    """Erstellt die FTS-Tabelle (falls nötig) und setzt die Gewichtung der Spalten"""
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        f"{', '.join(SEARCH_FIELDS)}, tokenize = 'unicode61 remove_diacritics 2')"
+    ))
+    connection.execute(text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rank) VALUES ('rank', :rank)"),
+                       {'rank': SEARCH_RANK})
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_table_with_schema(target, connection, **kw):
+    # db.create_all() kennt die virtuelle Tabelle nicht (kein Model)
+    if connection.dialect.name == 'sqlite':
+        create_search_table(connection)
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_table_with_schema(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+def rebuild_search_index():
+    """
+    Erstellt die FTS-Tabelle (falls nötig) und baut sie aus der users-Tabelle
+    neu auf. Gibt die Anzahl indexierter Benutzer zurück, oder None, wenn
+    die Datenbank kein SQLite ist.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name != 'sqlite':
+        return None
+    
+    create_search_table(connection)
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    rows = _index_rows(db.session.query(User.id, *[getattr(User, field) for field in SEARCH_FIELDS]))
+    if rows:
+        connection.execute(_INSERT, rows)
+    db.session.commit()
+    with _lock:
+        _available[str(connection.engine.url)] = True
+    return len(rows)
+
+def _index_user(connection, user):
+    connection.execute(_DELETE, {'rowid': user.id})
+    connection.execute(_INSERT, _index_rows([user]))
+
+@event.listens_for(User, 'after_insert')
+def _index_new_user(mapper, connection, target):
+    if is_search_index_available(connection):
+        _index_user(connection, target)
+
+@event.listens_for(User, 'after_update')
+def _reindex_user(mapper, connection, target):
+    # Nur wenn sich ein indexiertes Feld geändert hat (nicht z.B. beim Zitadel-Sync ohne Änderung)
+    state = inspect(target)
+    if not any(state.attrs[field].history.has_changes() for field in SEARCH_FIELDS):
+        return
+    if is_search_index_available(connection):
+        _index_user(connection, target)
+
+@event.listens_for(User, 'after_delete')
+def _unindex_user(mapper, connection, target):
+    if is_search_index_available(connection):
+        connection.execute(_DELETE, {'rowid': target.id})
@@ -0,0 +1,122 @@
+"""
+Engine-Profil für SQLite im Produktivbetrieb
+
+Mehrere Gunicorn-Worker teilen sich eine SQLite-Datei. Mit den Standard-
+Einstellungen (Rollback-Journal, synchronous=FULL) blockieren Leser hinter
+Schreibern, und gleichzeitige Schreiber erhalten "database is locked".
+Das Profil "production" setzt deshalb bei jeder neuen Verbindung:
+
+- journal_mode=WAL: Leser und ein Schreiber arbeiten gleichzeitig
+- synchronous=NORMAL: im WAL-Modus sicher, deutlich weniger fsyncs
+- busy_timeout: Schreiber warten auf die Sperre statt sofort abzubrechen
+- mmap_size, cache_size, temp_store=MEMORY: weniger Systemaufrufe beim Lesen
+
+Das Profil "default" lässt die Verbindungen unverändert.
+"""
+from sqlalchemy import event
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+def get_sqlite_pragmas(config):
+    """Liste von (pragma, wert) für das konfigurierte Profil (leer = keine Anpassung)"""
+    if config.get('SQLITE_ENGINE_PROFILE', 'production') != 'production':
+        return []
+    return [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('busy_timeout', config.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        ('mmap_size', config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        ('cache_size', config.get('SQLITE_CACHE_SIZE', -20000)),
+        ('temp_store', 'MEMORY')
+    ]
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    """Setzt die Pragmas auf einer DB-API-Verbindung (sqlite3)"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+def install_sqlite_pragmas(app, engine):
+    """Registriert die Pragmas des Profils für alle neuen Verbindungen der Engine"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = get_sqlite_pragmas(app.config)
+    if not pragmas:
+        return
+    
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+    
+    app.logger.debug(f"SQLite-Profil aktiv: {', '.join(f'{name}={value}' for name, value in pragmas)}")
+
+def _benchmark_worker(path, pragmas, seconds, write_ratio, seed, results):
+    """Ein Worker-Prozess: gemischte Lese- und Schreibzugriffe für eine feste Zeit"""
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    apply_sqlite_pragmas(connection, pragmas)
+    rows = connection.execute("SELECT COUNT(*) FROM bench").fetchone()[0]
+    reads = writes = locked = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                connection.execute("UPDATE bench SET value = value + 1, updated = ? WHERE id = ?",
+                                   (time.time(), rng.randint(1, rows)))
+                connection.commit()
+                writes += 1
+            else:
+                start = rng.randint(1, rows)
+                connection.execute("SELECT id, name, value FROM bench WHERE id BETWEEN ? AND ?",
+                                   (start, start + 50)).fetchall()
+                reads += 1
+        except sqlite3.OperationalError:
+            connection.rollback()
+            locked += 1
+    connection.close()
+    results.put((reads, writes, locked))
+
+def run_benchmark(pragmas, workers=4, seconds=5, write_ratio=0.2, rows=10000):
+    """
+    Misst den Durchsatz mit mehreren gleichzeitigen Prozessen (wie Gunicorn-Worker)
+    auf einer temporären Datenbank.
+    
+    Returns:
+        Dict mit reads/s, writes/s und der Anzahl "database is locked"-Fehler
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'benchmark.db')
+        connection = sqlite3.connect(path)
+        apply_sqlite_pragmas(connection, pragmas)
+        connection.execute("CREATE TABLE bench (id INTEGER PRIMARY KEY, name TEXT, value INTEGER, updated REAL)")
+        connection.executemany("INSERT INTO bench (name, value, updated) VALUES (?, 0, 0)",
+                               ((f"Eintrag {i}",) for i in range(rows)))
+        connection.commit()
+        connection.close()
+        
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=_benchmark_worker,
+                                    args=(path, pragmas, seconds, write_ratio, seed, results))
+            for seed in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    
+    reads = sum(total[0] for total in totals)
+    writes = sum(total[1] for total in totals)
+    return {
+        'reads_per_second': reads / seconds,
+        'writes_per_second': writes / seconds,
+        'locked': sum(total[2] for total in totals)
+    }
@@ -0,0 +1,294 @@
+"""
+Inhaltsadressierte Ablage für Zertifikatsdateien
+
+Jede Datei wird unter ihrem SHA-256-Hash gespeichert
+(UPLOAD_FOLDER/<ab>/<sha256><ext>). Identische Uploads belegen dadurch nur
+einmal Speicherplatz und Backups erkennen unveränderte Dateien am Namen.
+Referenzen werden über Certificate.file_url gezählt: eine Datei wird gelöscht,
+sobald kein Zertifikat mehr auf sie verweist. Kürzlich hochgeladene Dateien
+(jünger als UPLOAD_GC_GRACE_PERIOD) überlässt die Freigabe der Garbage
+Collection, da ein gleichzeitiger Upload desselben Inhalts sie gerade
+wiederverwenden könnte.
+"""
+from flask import current_app
+from werkzeug.utils import secure_filename
+from app import db
+from app.models import Certificate
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    # Pillow nicht installiert - es werden keine Vorschaubilder erzeugt
+    Image = None
+
+# URL-Präfix, unter dem der UPLOAD_FOLDER ausgeliefert wird
+UPLOAD_URL_PREFIX = '/static/uploads/certificates/'
+
+# Präfix temporärer Dateien während des Uploads (die Garbage Collection löscht verwaiste erst nach der Karenzzeit)
+TEMP_PREFIX = '.upload-'
+
+# Vorschaubilder liegen neben dem Original: <name>.thumb.webp (bzw. .thumb.jpg ohne WebP-Support)
+THUMBNAIL_SUFFIX = '.thumb'
+THUMBNAIL_SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+THUMBNAIL_EXTENSION = '.webp' if Image is not None and features.check('webp') else '.jpg'
+
+_CONTENT_PATH_PATTERN = re.compile(r'^([0-9a-f]{2})/(\1[0-9a-f]{62})(\.[a-z0-9]+)?$')
+
+def content_hash(relative_path):
+    """
+    Gibt den SHA-256-Hash einer inhaltsadressierten Datei zurück (aus dem Pfad),
+    oder None für Dateien im alten Format (Zeitstempel im Namen).
+    """
+    match = _CONTENT_PATH_PATTERN.match(relative_path.replace(os.sep, '/'))
+    return match.group(2) if match else None
+
+def file_url_to_path(file_url):
+    """Pfad im UPLOAD_FOLDER zu einer file_url (None, wenn die URL nicht dorthin zeigt)"""
+    if not file_url or not file_url.startswith(UPLOAD_URL_PREFIX):
+        return None
+    upload_folder = os.path.abspath(current_app.config['UPLOAD_FOLDER'])
+    path = os.path.abspath(os.path.join(upload_folder, file_url[len(UPLOAD_URL_PREFIX):]))
+    if not path.startswith(upload_folder + os.sep):
+        return None
+    return path
+
+def _store_stream(stream, ext):
+    """
+    Speichert einen Binär-Stream inhaltsadressiert und gibt die file_url zurück.
+    Die Datei wird beim Schreiben gehasht; existiert der Inhalt bereits,
+    wird die temporäre Kopie verworfen und die vorhandene Datei "berührt"
+    (mtime), damit sie während der Karenzzeit nicht gelöscht wird.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    os.makedirs(upload_folder, exist_ok=True)
+    
+    sha256 = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=upload_folder, prefix=TEMP_PREFIX, delete=False) as tmp:
+        for block in iter(lambda: stream.read(1024 * 1024), b''):
+            sha256.update(block)
+            tmp.write(block)
+    
+    digest = sha256.hexdigest()
+    relative_path = f'{digest[:2]}/{digest}{ext}'
+    target_path = os.path.join(upload_folder, relative_path)
+    try:
+        # Gleicher Inhalt ist bereits gespeichert
+        os.utime(target_path)
+        os.remove(tmp.name)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        os.chmod(tmp.name, 0o644)
+        os.replace(tmp.name, target_path)
+    return UPLOAD_URL_PREFIX + relative_path
+
+def store_certificate_file(file):
+    """
+    Speichert eine hochgeladene Datei (werkzeug FileStorage) inhaltsadressiert.
+    
+    Returns:
+        Relative URL der Datei
+    """
+    ext = os.path.splitext(secure_filename(file.filename))[1].lower()
+    file_url = _store_stream(file.stream, ext)
+    if ext in THUMBNAIL_SOURCE_EXTENSIONS:
+        create_thumbnail(file_url_to_path(file_url))
+    return file_url
+
+def release_certificate_file(file_url):
+    """
+    Gibt eine Datei frei, nachdem ein Zertifikat gelöscht oder seine Datei
+    ersetzt wurde. Die Datei wird gelöscht, wenn kein Zertifikat mehr auf sie
+    verweist. Muss nach dem Commit aufgerufen werden.
+    
+    Ist die Datei jünger als UPLOAD_GC_GRACE_PERIOD, bleibt sie liegen: ein
+    gleichzeitiger Upload desselben Inhalts kann sie gerade verwenden, ohne
+    dass sein Zertifikat schon committet ist. Sie wird dann später von
+    collect_garbage() gelöscht.
+    """
+    path = file_url_to_path(file_url)
+    if not path:
+        return False
+    if Certificate.query.filter_by(file_url=file_url).count() > 0:
+        return False
+    grace_period = current_app.config.get('UPLOAD_GC_GRACE_PERIOD', 3600)
+    try:
+        if os.stat(path).st_mtime > time.time() - grace_period:
+            return False
+        os.remove(path)
+        current_app.logger.info(f"Upload: Nicht mehr referenzierte Datei gelöscht: {path}")
+    except FileNotFoundError:
+        return False
+    thumbnail_path = _thumbnail_path(path)
+    if thumbnail_path and os.path.exists(thumbnail_path):
+        os.remove(thumbnail_path)
+    return True
+
+def _referenced_paths():
+    """Pfade aller Dateien, auf die noch ein Zertifikat verweist"""
+    referenced = set()
+    for (file_url,) in db.session.query(Certificate.file_url).filter(Certificate.file_url.isnot(None)).distinct():
+        path = file_url_to_path(file_url)
+        if path:
+            referenced.add(path)
+            # Vorschaubilder gehören zum Original
+            thumbnail_path = _thumbnail_path(path)
+            if thumbnail_path:
+                referenced.add(thumbnail_path)
+    return referenced
+
+def collect_garbage(dry_run=False):
+    """
+    Löscht Dateien im UPLOAD_FOLDER, auf die kein Zertifikat mehr verweist.
+    
+    Dateien, die jünger als UPLOAD_GC_GRACE_PERIOD sind, bleiben erhalten,
+    damit laufende Uploads (Datei gespeichert, Zertifikat noch nicht
+    committet) nicht gelöscht werden.
+    
+    Returns:
+        Dict mit 'files' (Anzahl) und 'bytes' der gelöschten Dateien
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    grace_period = current_app.config.get('UPLOAD_GC_GRACE_PERIOD', 3600)
+    threshold = time.time() - grace_period
+    referenced = _referenced_paths()
+    stats = {'files': 0, 'bytes': 0}
+    
+    for root, dirs, files in os.walk(upload_folder):
+        for file in files:
+            path = os.path.abspath(os.path.join(root, file))
+            if path in referenced:
+                continue
+            try:
+                stat = os.stat(path)
+                if stat.st_mtime > threshold:
+                    continue
+                if not dry_run:
+                    os.remove(path)
+            except OSError as e:
+                current_app.logger.warning(f"Upload GC: Konnte {path} nicht löschen: {e}")
+                continue
+            stats['files'] += 1
+            stats['bytes'] += stat.st_size
+    
+    # Leere Hash-Verzeichnisse entfernen
+    if not dry_run:
+        for root, dirs, files in os.walk(upload_folder, topdown=False):
+            if root != upload_folder and not os.listdir(root):
+                os.rmdir(root)
+    return stats
+
+def migrate_legacy_files():
+    """
+    Überführt Dateien im alten Format (Zeitstempel im Namen) in die
+    inhaltsadressierte Ablage und passt Certificate.file_url an.
+    Duplikate werden dabei zusammengelegt; die alten Dateien entfernt
+    anschließend die Garbage Collection.
+    
+    Returns:
+        Dict mit 'certificates' (angepasste Zertifikate) und 'missing' (fehlende Dateien)
+    """
+    stats = {'certificates': 0, 'missing': 0}
+    new_urls = {}
+    upload_folder = os.path.abspath(current_app.config['UPLOAD_FOLDER'])
+    for cert in Certificate.query.filter(Certificate.file_url.isnot(None)).all():
+        path = file_url_to_path(cert.file_url)
+        if not path or content_hash(os.path.relpath(path, upload_folder)):
+            continue
+        if cert.file_url not in new_urls:
+            if not os.path.isfile(path):
+                current_app.logger.warning(f"Upload-Migration: Datei fehlt: {path}")
+                stats['missing'] += 1
+                continue
+            with open(path, 'rb') as f:
+                new_urls[cert.file_url] = _store_stream(f, os.path.splitext(path)[1].lower())
+        cert.file_url = new_urls[cert.file_url]
+        stats['certificates'] += 1
+    db.session.commit()
+    create_missing_thumbnails()
+    return stats
+
+def _thumbnail_path(path):
+    """Pfad des Vorschaubilds zu einer Bilddatei (None für PDFs und ohne Pillow)"""
+    stem, ext = os.path.splitext(path)
+    if Image is None or ext.lower() not in THUMBNAIL_SOURCE_EXTENSIONS:
+        return None
+    return stem + THUMBNAIL_SUFFIX + THUMBNAIL_EXTENSION
+
+def is_thumbnail(path):
+    """Prüft, ob ein Pfad ein (ggf. noch nicht erzeugtes) Vorschaubild bezeichnet"""
+    return os.path.splitext(path)[0].endswith(THUMBNAIL_SUFFIX)
+
+def thumbnail_url(file_url):
+    """
+    URL des Vorschaubilds zu einer file_url, oder None (PDFs, ohne Pillow).
+    Vorschaubilder entstehen beim Upload, nach Restore und Migration (siehe
+    create_missing_thumbnails) bzw. beim ersten Abruf eines eingeloggten Benutzers.
+    """
+    if not file_url or not file_url.startswith(UPLOAD_URL_PREFIX):
+        return None
+    return _thumbnail_path(file_url)
+
+def create_thumbnail(path):
+    """
+    Erzeugt ein verkleinertes Vorschaubild (WebP, sonst JPEG) neben dem Original.
+    
+    PDFs werden nicht unterstützt: Pillow kann keine PDF-Seiten rendern.
+    
+    Returns:
+        Pfad des Vorschaubilds oder None, wenn keines erzeugt werden konnte
+    """
+    thumbnail_path = _thumbnail_path(path)
+    if not thumbnail_path:
+        return None
+    size = current_app.config.get('CERTIFICATE_THUMBNAIL_SIZE', 480)
+    try:
+        with Image.open(path) as img:
+            # JPEGs direkt in reduzierter Auflösung dekodieren (schnell bei grossen Handyfotos)
+            img.draft('RGB', (size, size))
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((size, size))
+            if thumbnail_path.endswith('.jpg') or img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGB')
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=TEMP_PREFIX)
+            with os.fdopen(fd, 'wb') as tmp:
+                img.save(tmp, format='WEBP' if thumbnail_path.endswith('.webp') else 'JPEG', quality=80)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, thumbnail_path)
+        return thumbnail_path
+    except Exception as e:
+        current_app.logger.warning(f"Vorschaubild für {path} konnte nicht erzeugt werden: {e}")
+        return None
+
+def create_missing_thumbnails():
+    """
+    Erzeugt fehlende Vorschaubilder für alle referenzierten Bilddateien
+    (z.B. nach einem Restore - Backups enthalten keine Vorschaubilder).
+    
+    Returns:
+        Anzahl erzeugter Vorschaubilder
+    """
+    created = 0
+    for (file_url,) in db.session.query(Certificate.file_url).filter(Certificate.file_url.isnot(None)).distinct():
+        path = file_url_to_path(file_url)
+        thumbnail_path = _thumbnail_path(path) if path else None
+        if thumbnail_path and os.path.isfile(path) and not os.path.exists(thumbnail_path):
+            if create_thumbnail(path):
+                created += 1
+    return created
+
+def ensure_thumbnail(thumbnail_path):
+    """
+    Erzeugt ein fehlendes Vorschaubild aus dem zugehörigen Original
+    (z.B. für ältere Uploads oder nach einem Restore).
+    """
+    stem = os.path.splitext(thumbnail_path)[0][:-len(THUMBNAIL_SUFFIX)]
+    for ext in THUMBNAIL_SOURCE_EXTENSIONS:
+        for candidate in (stem + ext, stem + ext.upper()):
+            if os.path.isfile(candidate) and _thumbnail_path(candidate) == thumbnail_path:
+                return create_thumbnail(candidate)
+    return None
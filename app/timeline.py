@@ -0,0 +1,116 @@
+"""
+Vorberechneter Tagesablauf eines Trainingsplans für den Live-Status
+
+Statt bei jeder Abfrage alle Aktivitäten zu laden und einzeln zu prüfen,
+wird pro Plan und Tag einmal eine sortierte Liste der Zeitpunkte erstellt,
+an denen sich ein Status ändert, zusammen mit dem ab dann gültigen Status.
+Eine Abfrage ist danach eine binäre Suche.
+
+Der Cache gilt pro Prozess und wird über eine Versions-Abfrage (Anzahl,
+höchste ID und letzte Änderung der Aktivitäten, Änderung des Plans)
+invalidiert - so sehen alle Gunicorn-Worker Änderungen sofort.
+"""
+from bisect import bisect_right
+from datetime import datetime
+from sqlalchemy import func
+from app import db
+from app.models import TrainingPlan, TrainingActivity
+from app.utils import get_status_at, get_status_boundaries
+import threading
+
+class PlanTimeline:
+    """Statuswechsel eines Trainingsplans an einem Tag"""
+    
+    def __init__(self, plan_id, team_name, day, activity_times, version=None):
+        """
+        Args:
+            activity_times: Liste von (activity_id, from_time, to_time) mit datetime-Werten
+                (leer, wenn der Plan an diesem Tag nicht stattfindet)
+            version: Stand des Plans, aus dem der Ablauf berechnet wurde (für ETags)
+        """
+        self.plan_id = plan_id
+        self.version = version
+        self.team_name = team_name
+        self.day = day
+        self.boundaries = get_status_boundaries(activity_times)
+        # Status, der ab boundaries[i] bis zum nächsten Zeitpunkt gilt
+        self.states = []
+        for boundary in self.boundaries:
+            status = {}
+            for activity_id, from_time, to_time in activity_times:
+                activity_status = get_status_at(from_time, to_time, boundary)
+                if activity_status:
+                    status[activity_id] = activity_status
+            self.states.append(status)
+    
+    def status_at(self, now):
+        """
+        Gibt (status, next_transition) zum Zeitpunkt now zurück.
+        
+        status ist ein Dict {activity_id: 'now'|'soon'}, next_transition der
+        Zeitpunkt des nächsten Statuswechsels oder None.
+        """
+        index = bisect_right(self.boundaries, now)
+        status = self.states[index - 1] if index > 0 else {}
+        next_transition = self.boundaries[index] if index < len(self.boundaries) else None
+        return status, next_transition
+
+_timelines = {}  # plan_id -> (version, PlanTimeline)
+_lock = threading.Lock()
+
+def plan_version_query(plan_id):
+    """Query für den Stand eines Plans (siehe get_plan_version)"""
+    return db.session.query(
+        TrainingPlan.team_name,
+        TrainingPlan.updated_date,
+        func.count(TrainingActivity.id),
+        func.max(TrainingActivity.id),
+        func.max(TrainingActivity.updated_date)
+    ).outerjoin(TrainingActivity, TrainingActivity.plan_id == TrainingPlan.id) \
+        .filter(TrainingPlan.id == plan_id) \
+        .group_by(TrainingPlan.id)
+
+def activity_times_query(plan_id):
+    """Query für (id, time_from, time_to) aller Aktivitäten eines Plans"""
+    return db.session.query(
+        TrainingActivity.id, TrainingActivity.time_from, TrainingActivity.time_to
+    ).filter(TrainingActivity.plan_id == plan_id)
+
+def get_plan_version(plan_id):
+    """
+    Stand eines Plans als Tupel (team_name, Änderung des Plans, Anzahl,
+    höchste ID und letzte Änderung der Aktivitäten), oder None, wenn der
+    Plan nicht existiert. Jede Änderung am Plan oder an seinen Aktivitäten
+    ändert das Tupel.
+    """
+    row = plan_version_query(plan_id).first()
+    return tuple(row) if row is not None else None
+
+def get_plan_timeline(plan_id, day=None):
+    """
+    Gibt den (gecachten) Tagesablauf eines Plans zurück, oder None, wenn
+    der Plan nicht existiert.
+    """
+    day = day or datetime.now().date()
+    plan_version = get_plan_version(plan_id)
+    if plan_version is None:
+        with _lock:
+            _timelines.pop(plan_id, None)
+        return None
+    
+    version = (day,) + plan_version
+    entry = _timelines.get(plan_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    
+    plan = db.session.get(TrainingPlan, plan_id)
+    activity_times = []
+    if plan.is_active_on(day):
+        activity_times = [
+            (activity_id, datetime.combine(day, time_from), datetime.combine(day, time_to))
+            for activity_id, time_from, time_to in activity_times_query(plan_id)
+        ]
+    timeline = PlanTimeline(plan_id, plan.team_name, day, activity_times, version=version)
+    with _lock:
+        _timelines[plan_id] = (version, timeline)
+    return timeline
@@ -0,0 +1,130 @@
+"""
+Kurzlebiger Cache des eingeloggten Benutzers für den Flask-Login user_loader
+
+Der user_loader lief bei jeder Anfrage (auch beim 10-Sekunden-Polling der
+Trainingsplan-Ansicht) gegen die users-Tabelle, obwohl dort meist nur ID,
+Team, Admin-Status und Profilvollständigkeit gebraucht werden. Diese Felder
+werden pro Prozess für USER_CACHE_TTL Sekunden gehalten; alle anderen
+Attribute lädt CachedUser erst beim ersten Zugriff aus der Datenbank.
+"""
+from flask import current_app, abort
+from flask_login import UserMixin, logout_user
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app import db, login_manager
+from app.models import User
+import threading
+import time
+
+# Felder, die ohne Datenbankzugriff verfügbar sind
+CACHED_FIELDS = ('id', 'email', 'first_name', 'team', 'is_admin')
+
+_cache = {}  # user_id -> (expires_at, fields)
+_lock = threading.Lock()
+
+class CachedUser(UserMixin):
+    """
+    Stellvertreter für einen Benutzer aus dem Cache.
+    
+    Die gecachten Felder werden direkt beantwortet; jeder andere Zugriff
+    (Beziehungen, Methoden, Schreibzugriffe) lädt den echten User und leitet
+    ab dann alles an ihn weiter.
+    """
+    
+    def __init__(self, fields):
+        object.__setattr__(self, '_fields', fields)
+        object.__setattr__(self, '_user', None)
+    
+    def _get_user(self):
+        user = self._user
+        if user is None:
+            user = db.session.get(User, self._fields['id'])
+            if user is None:
+                _log_out_deleted_user(self._fields['id'])
+            object.__setattr__(self, '_user', user)
+        return user
+    
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if self._user is None and name in self._fields:
+            return self._fields[name]
+        return getattr(self._get_user(), name)
+    
+    def __setattr__(self, name, value):
+        setattr(self._get_user(), name, value)
+    
+    def is_profile_complete(self):
+        if self._user is None:
+            return self._fields['profile_complete']
+        return self._user.is_profile_complete()
+    
+    def __repr__(self):
+        return f"<CachedUser {self._fields['email']}>"
+
+def _log_out_deleted_user(user_id):
+    """
+    Der Benutzer wurde gelöscht, während er noch im Cache war (z.B. durch
+    einen Restore oder in einem anderen Worker): Session beenden und die
+    Anfrage wie ohne Login beantworten (Weiterleitung zum Login bzw. 401).
+    """
+    invalidate_user(user_id)
+    logout_user()
+    abort(login_manager.unauthorized())
+
+def _user_fields(user):
+    fields = {name: getattr(user, name) for name in CACHED_FIELDS}
+    fields['profile_complete'] = user.is_profile_complete()
+    return fields
+
+def load_cached_user(user_id):
+    """
+    Gibt den Benutzer zu user_id zurück - aus dem Cache als CachedUser oder,
+    bei ausgeschaltetem Cache, direkt als User.
+    """
+    ttl = current_app.config.get('USER_CACHE_TTL', 30)
+    if ttl <= 0:
+        return db.session.get(User, user_id)
+    
+    now = time.monotonic()
+    entry = _cache.get(user_id)
+    if entry is not None and entry[0] > now:
+        return CachedUser(entry[1])
+    
+    user = db.session.get(User, user_id)
+    if user is None:
+        invalidate_user(user_id)
+        return None
+    with _lock:
+        if len(_cache) > 1000:
+            # Abgelaufene Einträge entfernen
+            for key in [key for key, (expires_at, fields) in _cache.items() if expires_at <= now]:
+                del _cache[key]
+        _cache[user_id] = (now + ttl, _user_fields(user))
+    return user
+
+def invalidate_user(user_id):
+    """Entfernt einen Benutzer aus dem Cache"""
+    with _lock:
+        _cache.pop(user_id, None)
+
+def clear_user_cache():
+    """Leert den Cache (z.B. nach Bulk-Operationen ohne ORM-Events)"""
+    with _lock:
+        _cache.clear()
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_on_change(mapper, connection, target):
+    invalidate_user(target.id)
+    # Nach dem Commit nochmals, falls ein paralleler Request zwischen Flush und Commit neu geladen hat
+    object_session(target).info.setdefault('changed_user_ids', set()).add(target.id)
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        invalidate_user(user_id)
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_changes_on_rollback(session):
+    session.info.pop('changed_user_ids', None)
@@ -1,6 +1,4 @@
-import os
-from werkzeug.utils import secure_filename
-from datetime import datetime, time, timedelta
+from datetime import datetime, timedelta
 from flask import current_app
 
 def allowed_file(filename):
@@ -9,27 +7,32 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
 def save_certificate_file(file):
-    """Speichert eine hochgeladene Zertifikatsdatei"""
+    """Speichert eine hochgeladene Zertifikatsdatei (inhaltsadressiert, siehe app/storage.py)"""
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        # Eindeutigen Dateinamen erstellen
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        name, ext = os.path.splitext(filename)
-        filename = f"{timestamp}_{name}{ext}"
-        
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        # Relative URL zurückgeben
-        return f"/static/uploads/certificates/{filename}"
+        from app.storage import store_certificate_file
+        return store_certificate_file(file)
     return None
 
-def calculate_activity_times(plan, activities, new_activity=None):
+def calculate_activity_times(plan, activities, new_activity=None, changed_order=None, changed_until=None):
     """
     Berechnet die Zeiten für Aktivitäten basierend auf dem Plan-Startzeitpunkt.
     Prepractice-Aktivitäten werden rückwärts berechnet, andere vorwärts.
+    
+    Mit changed_order (Position der ersten geänderten, eingefügten oder
+    gelöschten Aktivität) wird nur ab dieser Position neu berechnet: reguläre
+    Aktivitäten davor und Prepractice-Aktivitäten danach behalten ihre Zeiten.
+    Wurden mehrere Positionen verschoben, gibt changed_until die höchste an -
+    Prepractice wird rückwärts gerechnet und behält erst danach ihre Zeiten.
+    
+    Gespeicherte Aktivitäten, deren Zeiten sich ändern, werden gesammelt in
+    einem einzigen UPDATE (executemany) geschrieben; unveränderte Zeilen werden
+    nicht angefasst. Neue, noch nicht gespeicherte Aktivitäten erhalten die
+    Zeiten direkt als Attribute.
     """
+    from app import db
     from app.models import TrainingActivity
+    from sqlalchemy import inspect, update
+    from sqlalchemy.orm.attributes import set_committed_value
     
     # Alle Aktivitäten sortieren
     all_activities = list(activities.order_by(TrainingActivity.order).all())
@@ -43,21 +46,53 @@ def calculate_activity_times(plan, activities, new_activity=None):
     prepractice_activities = [a for a in all_activities if a.activity_type == 'prepractice']
     regular_activities = [a for a in all_activities if a.activity_type != 'prepractice']
     
-    # Prepractice rückwärts berechnen
-    current_time = datetime.combine(datetime.today(), plan.start_time)
+    start_time = datetime.combine(datetime.today(), plan.start_time)
+    new_times = []  # (activity, time_from, time_to)
+    
+    if changed_until is None:
+        changed_until = changed_order
+    
+    # Prepractice rückwärts berechnen (ab der letzten Aktivität vor der Änderung)
+    current_time = start_time
     for activity in reversed(prepractice_activities):
+        if changed_until is not None and activity.order > changed_until and activity.time_from is not None:
+            current_time = datetime.combine(start_time.date(), activity.time_from)
+            continue
         duration = timedelta(minutes=activity.duration_minutes)
         current_time = current_time - duration
-        activity.time_from = current_time.time()
-        activity.time_to = (current_time + duration).time()
+        new_times.append((activity, current_time.time(), (current_time + duration).time()))
     
-    # Reguläre Aktivitäten vorwärts berechnen
-    current_time = datetime.combine(datetime.today(), plan.start_time)
+    # Reguläre Aktivitäten vorwärts berechnen (ab der ersten Aktivität nach der Änderung)
+    current_time = start_time
     for activity in regular_activities:
-        activity.time_from = current_time.time()
+        if changed_order is not None and activity.order < changed_order and activity.time_to is not None:
+            current_time = datetime.combine(start_time.date(), activity.time_to)
+            continue
+        time_from = current_time.time()
         duration = timedelta(minutes=activity.duration_minutes)
         current_time = current_time + duration
-        activity.time_to = current_time.time()
+        new_times.append((activity, time_from, current_time.time()))
+    
+    changed_rows = []
+    for activity, time_from, time_to in new_times:
+        if activity.time_from == time_from and activity.time_to == time_to:
+            continue
+        if activity is not new_activity and inspect(activity).persistent:
+            # Ohne das Objekt als geändert zu markieren (sonst ein UPDATE pro Zeile)
+            set_committed_value(activity, 'time_from', time_from)
+            set_committed_value(activity, 'time_to', time_to)
+            changed_rows.append({
+                'id': activity.id,
+                'time_from': time_from,
+                'time_to': time_to,
+                'updated_date': datetime.utcnow()
+            })
+        else:
+            activity.time_from = time_from
+            activity.time_to = time_to
+    
+    if changed_rows:
+        db.session.execute(update(TrainingActivity), changed_rows)
     
     return all_activities
 
@@ -74,34 +109,33 @@ def get_next_start_time(plan, activities):
     
     return plan.start_time
 
-def check_activity_status(activity, plan):
-    """
-    Prüft den Status einer Aktivität (JETZT, IN 2 MIN, oder normal)
-    Gibt zurück: 'now', 'soon', oder None
-    """
-    if not plan.is_active_today():
-        return None
-    
-    now = datetime.now()
-    today = now.date()
-    current_time = now.time()
-    
-    # Kombiniere Datum und Zeit für Vergleich
-    from_time = datetime.combine(today, activity.time_from)
-    to_time = datetime.combine(today, activity.time_to)
-    now_dt = datetime.combine(today, current_time)
-    
+# Vorlaufzeit für den Status 'soon' (IN 2 MIN)
+STATUS_SOON_BEFORE = timedelta(minutes=2)
+
+def get_status_at(from_time, to_time, now_dt):
+    """Status ('now', 'soon' oder None) einer Aktivität von from_time bis to_time zum Zeitpunkt now_dt"""
     # Prüfe ob Aktivität gerade läuft
     if from_time <= now_dt < to_time:
         return 'now'
     
     # Prüfe ob Aktivität in 2 Minuten startet
-    two_minutes = timedelta(minutes=2)
-    if from_time - two_minutes <= now_dt < from_time:
+    if from_time - STATUS_SOON_BEFORE <= now_dt < from_time:
         return 'soon'
     
     return None
 
+def get_status_boundaries(activity_times):
+    """
+    Zeitpunkte, an denen sich der Status einer Aktivität ändert (sortiert).
+    
+    Args:
+        activity_times: Liste von (activity_id, from_time, to_time) mit datetime-Werten
+    """
+    boundaries = set()
+    for activity_id, from_time, to_time in activity_times:
+        boundaries.update((from_time - STATUS_SOON_BEFORE, from_time, to_time))
+    return sorted(boundaries)
+
 def format_time_delta(td):
     """Formatiert ein timedelta-Objekt als lesbare Zeitspanne"""
     total_seconds = int(td.total_seconds())
@@ -3,13 +3,42 @@ Zitadel Integration Modul
 Handles OAuth2/OIDC authentication and user management via Zitadel API
 """
 import requests
+import time
 from flask import current_app, url_for, session, redirect
-from authlib.integrations.flask_client import OAuth
+from authlib.integrations.flask_client import OAuth, FlaskOAuth2App
 from app import db
 from app.models import User
+from app.zitadel_metadata import get_provider_metadata, get_jwks
+from app.zitadel_http import zitadel_request, guarded_call, mount_shared_adapter, get_timeout
 
 oauth = OAuth()
 
+class ZitadelOAuth2App(FlaskOAuth2App):
+    """
+    authlib-Client, der Discovery-Dokument und JWKS aus dem prozessweiten
+    Cache (app/zitadel_metadata.py) bezieht, statt sie einmalig pro Prozess
+    zu laden und nie zu aktualisieren.
+    """
+    
+    def load_server_metadata(self):
+        metadata = dict(get_provider_metadata())
+        metadata['_loaded_at'] = time.time()
+        self.server_metadata = metadata
+        return metadata
+    
+    def fetch_jwk_set(self, force=False):
+        return get_jwks(force=force)
+    
+    def _get_oauth_client(self, **metadata):
+        # Token-Requests über den gemeinsamen Connection-Pool und mit Timeout
+        session = super()._get_oauth_client(**metadata)
+        session.default_timeout = get_timeout('token')
+        return mount_shared_adapter(session)
+    
+    def fetch_access_token(self, redirect_uri=None, **kwargs):
+        with guarded_call('token'):
+            return super().fetch_access_token(redirect_uri=redirect_uri, **kwargs)
+
 def init_zitadel_oauth(app):
     """Initialisiert Zitadel OAuth2 Client"""
     # Prüfe ob Zitadel-Konfiguration vorhanden ist
@@ -32,6 +61,7 @@ def init_zitadel_oauth(app):
         client_id=client_id,
         client_secret=client_secret,
         server_metadata_url=f"{issuer}/.well-known/openid-configuration",
+        client_cls=ZitadelOAuth2App,
         client_kwargs={
             'scope': 'openid email profile urn:zitadel:iam:org:project:roles',
             'response_type': 'code'
@@ -63,10 +93,7 @@ def get_zitadel_authorize_url(prompt=None):
 def get_zitadel_logout_url():
     """Gibt die Zitadel Logout URL zurück"""
     try:
-        metadata_url = f"{current_app.config['ZITADEL_ISSUER']}/.well-known/openid-configuration"
-        metadata_response = requests.get(metadata_url, timeout=10)
-        metadata_response.raise_for_status()
-        metadata = metadata_response.json()
+        metadata = get_provider_metadata()
         end_session_endpoint = metadata.get('end_session_endpoint')
         if end_session_endpoint:
             return end_session_endpoint
@@ -82,91 +109,140 @@ def get_zitadel_password_change_url():
     # Zitadel Passwort-Änderungsseite
     return f"{issuer}/ui/login/password/change"
 
+def _extract_roles(claims):
+    """Extrahiert die Rollen aus ID-Token-Claims bzw. Userinfo"""
+    roles = []
+    
+    # Prüfe alle Keys nach Rollen-Feldern
+    for key, value in claims.items():
+        # Prüfe auf URN-basierte Rollen-Felder (Zitadel-spezifisch)
+        # Format: 'urn:zitadel:iam:org:project:...:roles' oder 'urn:zitadel:iam:org:project:roles'
+        if 'urn:zitadel' in key.lower() and 'role' in key.lower():
+            if isinstance(value, dict):
+                # Die Rollen-Namen sind die Keys im Dictionary
+                # Format: {'admin': {'org_id': 'org_name'}, 'coach': {'org_id': 'org_name'}}
+                roles.extend(value.keys())
+        
+        # Prüfe auch auf Standard-Rollen-Felder
+        elif key.lower() in ['roles', 'role']:
+            if isinstance(value, list):
+                roles.extend(value)
+            elif isinstance(value, str):
+                roles.append(value)
+            elif isinstance(value, dict):
+                # Wenn es ein Dict ist, könnten die Keys Rollen sein
+                roles.extend(value.keys())
+    
+    # Prüfe auch auf org_roles, project_roles etc.
+    for key in ['org_roles', 'project_roles', 'org_project_roles']:
+        if key in claims:
+            role_data = claims[key]
+            if isinstance(role_data, list):
+                roles.extend(role_data)
+            elif isinstance(role_data, dict):
+                # Wenn es ein Dict ist, könnten die Keys Rollen sein
+                roles.extend(role_data.keys())
+                for value in role_data.values():
+                    if isinstance(value, list):
+                        roles.extend(value)
+                    elif isinstance(value, str):
+                        roles.append(value)
+    
+    # Entferne Duplikate
+    return list(set(roles))
+
+def _has_role_claim(claims):
+    """Prüft, ob die Claims überhaupt ein Rollen-Feld enthalten"""
+    return any(
+        ('urn:zitadel' in key.lower() and 'role' in key.lower())
+        or key.lower() in ['roles', 'role', 'org_roles', 'project_roles', 'org_project_roles']
+        for key in claims
+    )
+
+def _get_email(claims):
+    """E-Mail-Adresse aus den Claims (mit Fallback auf den Benutzernamen)"""
+    return claims.get('email') or claims.get('preferred_username') or claims.get('username')
+
+def _needs_userinfo(claims):
+    """
+    Prüft, ob die Claims des ID Tokens für den Login ausreichen.
+    
+    Zitadel nimmt E-Mail und Rollen nur in das ID Token auf, wenn das in der
+    Applikation aktiviert ist ("User Info inside ID Token", "User roles inside
+    ID Token"). Ein fehlender Rollen-Claim kann auch "keine Rollen" bedeuten -
+    mit ZITADEL_ID_TOKEN_ROLES wird ihm vertraut, sonst wird Userinfo abgefragt.
+    """
+    if not claims or not claims.get('sub') or not _get_email(claims):
+        return True
+    if not _has_role_claim(claims) and not current_app.config.get('ZITADEL_ID_TOKEN_ROLES', False):
+        return True
+    return False
+
+def _fetch_userinfo(access_token):
+    """
+    Ruft den Userinfo-Endpoint von Zitadel ab.
+    
+    Returns:
+        Tuple (user_info, error)
+    """
+    # Discovery-Dokument aus dem Cache
+    try:
+        metadata = get_provider_metadata()
+    except Exception as e:
+        current_app.logger.error(f"Error fetching metadata: {str(e)}")
+        return None, f"Fehler beim Abrufen der Zitadel-Konfiguration: {str(e)}"
+    
+    userinfo_endpoint = metadata.get('userinfo_endpoint')
+    if not userinfo_endpoint:
+        current_app.logger.error("No userinfo_endpoint in metadata")
+        return None, "Userinfo-Endpoint nicht gefunden"
+    
+    # Rufe Userinfo ab
+    headers = {'Authorization': f'Bearer {access_token}'}
+    try:
+        user_info_response = zitadel_request('userinfo', 'GET', userinfo_endpoint, headers=headers)
+        user_info_response.raise_for_status()
+        user_info = user_info_response.json()
+    except Exception as e:
+        current_app.logger.error(f"Error fetching userinfo: {str(e)}, Response: {user_info_response.text if 'user_info_response' in locals() else 'N/A'}")
+        return None, f"Fehler beim Abrufen der Benutzerinformationen: {str(e)}"
+    
+    if not user_info:
+        current_app.logger.error("Empty user_info response")
+        return None, "Keine Benutzerinformationen erhalten"
+    return user_info, None
+
 def handle_zitadel_callback():
     """Verarbeitet den OAuth2 Callback von Zitadel"""
     try:
+        # authlib prüft das ID Token (Signatur gegen die gecachte JWKS, iss, aud,
+        # exp, nonce, at_hash) und legt die Claims unter 'userinfo' ab
         token = oauth.zitadel.authorize_access_token()
         
-        # Hole Userinfo separat über den Userinfo-Endpoint
         access_token = token.get('access_token')
         if not access_token:
             current_app.logger.error("No access_token in token response")
             return None, "Kein Access Token erhalten"
         
-        # Hole Userinfo von Zitadel
-        metadata_url = f"{current_app.config['ZITADEL_ISSUER']}/.well-known/openid-configuration"
-        try:
-            metadata_response = requests.get(metadata_url, timeout=10)
-            metadata_response.raise_for_status()
-            metadata = metadata_response.json()
-        except Exception as e:
-            current_app.logger.error(f"Error fetching metadata: {str(e)}")
-            return None, f"Fehler beim Abrufen der Zitadel-Konfiguration: {str(e)}"
-        
-        userinfo_endpoint = metadata.get('userinfo_endpoint')
-        if not userinfo_endpoint:
-            current_app.logger.error("No userinfo_endpoint in metadata")
-            return None, "Userinfo-Endpoint nicht gefunden"
-        
-        # Rufe Userinfo ab
-        headers = {'Authorization': f'Bearer {access_token}'}
-        try:
-            user_info_response = requests.get(userinfo_endpoint, headers=headers, timeout=10)
-            user_info_response.raise_for_status()
-            user_info = user_info_response.json()
-        except Exception as e:
-            current_app.logger.error(f"Error fetching userinfo: {str(e)}, Response: {user_info_response.text if 'user_info_response' in locals() else 'N/A'}")
-            return None, f"Fehler beim Abrufen der Benutzerinformationen: {str(e)}"
-        
-        if not user_info:
-            current_app.logger.error("Empty user_info response")
-            return None, "Keine Benutzerinformationen erhalten"
+        user_info = dict(token.get('userinfo') or {})
+        if _needs_userinfo(user_info):
+            # Claims fehlen im ID Token - Userinfo separat abrufen
+            current_app.logger.debug("ID Token unvollständig, rufe Userinfo-Endpoint ab")
+            fetched_info, error = _fetch_userinfo(access_token)
+            if error:
+                return None, error
+            if user_info.get('sub') and fetched_info.get('sub') != user_info['sub']:
+                current_app.logger.error("'sub' aus Userinfo passt nicht zum ID Token")
+                return None, "Benutzerinformationen passen nicht zum ID Token"
+            user_info.update(fetched_info)
         
         # Extrahiere Benutzerinformationen
         zitadel_user_id = user_info.get('sub')
-        email = user_info.get('email') or user_info.get('preferred_username') or user_info.get('username')
+        email = _get_email(user_info)
         name = user_info.get('name', '') or user_info.get('given_name', '')
         
         # Extrahiere Rollen aus verschiedenen möglichen Feldern
-        roles = []
-        
-        # Prüfe alle Keys in user_info nach Rollen-Feldern
-        for key, value in user_info.items():
-            # Prüfe auf URN-basierte Rollen-Felder (Zitadel-spezifisch)
-            # Format: 'urn:zitadel:iam:org:project:...:roles' oder 'urn:zitadel:iam:org:project:roles'
-            if 'urn:zitadel' in key.lower() and 'role' in key.lower():
-                if isinstance(value, dict):
-                    # Die Rollen-Namen sind die Keys im Dictionary
-                    # Format: {'admin': {'org_id': 'org_name'}, 'coach': {'org_id': 'org_name'}}
-                    roles.extend(value.keys())
-            
-            # Prüfe auch auf Standard-Rollen-Felder
-            elif key.lower() in ['roles', 'role']:
-                if isinstance(value, list):
-                    roles.extend(value)
-                elif isinstance(value, str):
-                    roles.append(value)
-                elif isinstance(value, dict):
-                    # Wenn es ein Dict ist, könnten die Keys Rollen sein
-                    roles.extend(value.keys())
-        
-        # Prüfe auch auf org_roles, project_roles etc.
-        for key in ['org_roles', 'project_roles', 'org_project_roles']:
-            if key in user_info:
-                role_data = user_info[key]
-                if isinstance(role_data, list):
-                    roles.extend(role_data)
-                elif isinstance(role_data, dict):
-                    # Wenn es ein Dict ist, könnten die Keys Rollen sein
-                    roles.extend(role_data.keys())
-                    for value in role_data.values():
-                        if isinstance(value, list):
-                            roles.extend(value)
-                        elif isinstance(value, str):
-                            roles.append(value)
-        
-        # Entferne Duplikate
-        roles = list(set(roles))
+        roles = _extract_roles(user_info)
         
         # Normalisiere Rollen (lowercase für Vergleich)
         roles_normalized = [r.lower() if isinstance(r, str) else str(r).lower() for r in roles]
@@ -268,7 +344,7 @@ def create_zitadel_user(email, password):
             }
         }
         
-        response = requests.post(create_user_url, json=user_data, headers=headers)
+        response = zitadel_request('management', 'POST', create_user_url, json=user_data, headers=headers)
         
         if response.status_code not in [200, 201]:
             try:
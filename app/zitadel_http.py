@@ -0,0 +1,240 @@
+"""
+Gemeinsamer HTTP-Client für alle Aufrufe an Zitadel
+
+Eine prozessweite requests.Session mit Connection-Pooling (Keep-Alive statt
+neuem TLS-Handshake pro Aufruf), Timeouts pro Endpoint, begrenzten
+Wiederholungen mit Backoff für idempotente Requests und einem Circuit
+Breaker pro Endpoint, der bei einem ausgefallenen Identity Provider sofort
+abbricht statt Worker in hängenden Verbindungen zu blockieren. Ein
+fehlerhafter Endpoint (z.B. userinfo) sperrt dabei nicht die anderen.
+
+Latenz und Fehler werden pro Endpoint gezählt (pro Gunicorn-Worker).
+"""
+from contextlib import contextmanager
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import requests
+import threading
+import time
+
+class ZitadelUnavailableError(requests.exceptions.RequestException):
+    """Der Circuit Breaker ist offen - Zitadel wird vorübergehend nicht aufgerufen"""
+
+class SharedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter, dessen Connection-Pool für die Lebensdauer des Prozesses
+    bestehen bleibt - auch wenn eine kurzlebige Session (authlib) ihn schließt.
+    """
+    
+    def close(self):
+        pass
+
+class CircuitBreaker:
+    """
+    Einfacher Circuit Breaker: nach failure_threshold aufeinanderfolgenden
+    Fehlern werden Aufrufe für reset_timeout Sekunden sofort abgelehnt.
+    Danach wird ein einzelner Probe-Aufruf durchgelassen (half-open).
+    """
+    
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+    
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+    
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.probing:
+                self.probing = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+    
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class EndpointMetrics:
+    """Zähler für Aufrufe, Fehler und Latenz eines Endpoints"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_error = None
+    
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'failures': self.failures,
+            'rejected': self.rejected,
+            'avg_ms': round(self.total_seconds / self.calls * 1000, 1) if self.calls else None,
+            'max_ms': round(self.max_seconds * 1000, 1),
+            'last_error': self.last_error
+        }
+
+_session = None
+_adapter = None
+_breakers = {}  # endpoint -> CircuitBreaker
+_metrics = {}
+_lock = threading.Lock()
+
+def _init():
+    """Erstellt Session und Adapter (einmal pro Prozess)"""
+    global _session, _adapter
+    with _lock:
+        if _session is None:
+            config = current_app.config
+            retry = Retry(
+                total=config.get('ZITADEL_HTTP_RETRIES', 2),
+                backoff_factor=config.get('ZITADEL_HTTP_BACKOFF', 0.3),
+                status_forcelist=(502, 503, 504),
+                allowed_methods=('GET', 'HEAD'),  # POST (z.B. Benutzer anlegen) nie wiederholen
+                raise_on_status=False
+            )
+            _adapter = SharedHTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=config.get('ZITADEL_HTTP_POOL_SIZE', 10),
+                max_retries=retry
+            )
+            session = requests.Session()
+            session.mount('https://', _adapter)
+            session.mount('http://', _adapter)
+            _session = session
+    return _session
+
+def get_session():
+    """Gibt die gemeinsame requests.Session für Zitadel zurück"""
+    return _session or _init()
+
+def mount_shared_adapter(session):
+    """Bindet den gemeinsamen Connection-Pool an eine fremde Session (z.B. von authlib)"""
+    get_session()
+    session.mount('https://', _adapter)
+    session.mount('http://', _adapter)
+    return session
+
+def _get_breaker(endpoint):
+    """Circuit Breaker eines Endpoints (wird bei Bedarf erstellt)"""
+    with _lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(
+                failure_threshold=current_app.config.get('ZITADEL_CIRCUIT_FAILURES', 5),
+                reset_timeout=current_app.config.get('ZITADEL_CIRCUIT_RESET', 30)
+            )
+        return breaker
+
+def get_timeout(endpoint):
+    """(connect, read) Timeout für einen Endpoint"""
+    config = current_app.config
+    read_timeouts = {
+        'metadata': config.get('ZITADEL_METADATA_TIMEOUT', 5),
+        'jwks': config.get('ZITADEL_METADATA_TIMEOUT', 5),
+        'token': config.get('ZITADEL_TOKEN_TIMEOUT', 10),
+        'userinfo': config.get('ZITADEL_USERINFO_TIMEOUT', 5),
+        'management': config.get('ZITADEL_MANAGEMENT_TIMEOUT', 15)
+    }
+    return (config.get('ZITADEL_CONNECT_TIMEOUT', 3), read_timeouts.get(endpoint, 10))
+
+@contextmanager
+def guarded_call(endpoint):
+    """
+    Umschließt einen Aufruf an Zitadel: prüft den Circuit Breaker des
+    Endpoints und erfasst Latenz und Fehler. Jede Exception zählt als Fehler,
+    ausser HTTP-Fehlern mit 4xx-Antwort (Zitadel hat geantwortet).
+    """
+    get_session()
+    breaker = _get_breaker(endpoint)
+    with _lock:
+        metrics = _metrics.setdefault(endpoint, EndpointMetrics())
+    if not breaker.allow():
+        with _lock:
+            metrics.rejected += 1
+        raise ZitadelUnavailableError(f"Zitadel ist vorübergehend nicht erreichbar (Circuit Breaker offen, {endpoint})")
+    
+    started = time.monotonic()
+    # Jeder Ausgang (auch z.B. GeneratorExit) wird erfasst, sonst bliebe ein
+    # Probe-Aufruf im Zustand half-open hängen
+    failed = True
+    error = None
+    try:
+        yield
+        failed = False
+    except requests.exceptions.RequestException as e:
+        if e.response is not None and e.response.status_code < 500:
+            # Zitadel hat geantwortet - kein Ausfall
+            failed = False
+        error = e
+        raise
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        if failed:
+            breaker.record_failure()
+            with _lock:
+                metrics.failures += 1
+                metrics.last_error = str(error)[:200] if error is not None else None
+        else:
+            breaker.record_success()
+        elapsed = time.monotonic() - started
+        with _lock:
+            metrics.calls += 1
+            metrics.total_seconds += elapsed
+            metrics.max_seconds = max(metrics.max_seconds, elapsed)
+        if elapsed > current_app.config.get('ZITADEL_SLOW_CALL_SECONDS', 2):
+            current_app.logger.warning(f"Zitadel: Langsamer Aufruf ({endpoint}): {elapsed:.2f}s")
+
+def zitadel_request(endpoint, method, url, **kwargs):
+    """
+    Führt einen Request an Zitadel über die gemeinsame Session aus.
+    
+    Args:
+        endpoint: Name für Timeouts und Metriken ('metadata', 'userinfo', 'management', ...)
+        method, url, kwargs: wie bei requests.request
+    
+    Returns:
+        requests.Response (5xx-Antworten werden als HTTPError ausgelöst)
+    
+    Raises:
+        requests.exceptions.RequestException (inkl. ZitadelUnavailableError)
+    """
+    kwargs.setdefault('timeout', get_timeout(endpoint))
+    with guarded_call(endpoint):
+        response = get_session().request(method, url, **kwargs)
+        if response.status_code >= 500:
+            response.raise_for_status()
+    return response
+
+def get_metrics():
+    """Metriken dieses Prozesses als Dict (für die Admin-Ansicht)"""
+    get_session()
+    with _lock:
+        endpoints = {name: metrics.as_dict() for name, metrics in _metrics.items()}
+        circuits = {name: breaker.state for name, breaker in _breakers.items()}
+    return {'circuit': circuits, 'endpoints': endpoints}
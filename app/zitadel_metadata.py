@@ -0,0 +1,132 @@
+"""
+Prozessweiter Cache für das OIDC Discovery-Dokument und die JWKS von Zitadel
+
+Beide Dokumente ändern sich selten, wurden aber bei jedem Login-Callback und
+jedem Logout neu geladen. Der Cache beachtet Cache-Control (max-age,
+stale-while-revalidate), aktualisiert abgelaufene Einträge im Hintergrund und
+liefert bei Fehlern oder Timeouts des Identity Providers die letzte gültige
+Kopie aus.
+"""
+from flask import current_app
+from werkzeug.http import parse_dict_header
+from app.zitadel_http import zitadel_request
+import threading
+import time
+
+class CachedJSONDocument:
+    """
+    Thread-sicherer Cache für ein per HTTP geladenes JSON-Dokument.
+    
+    - frisch (jünger als TTL): aus dem Cache
+    - abgelaufen, aber innerhalb von stale-while-revalidate: aus dem Cache,
+      Aktualisierung im Hintergrund
+    - älter: synchrone Aktualisierung; schlägt sie fehl, wird die letzte
+      gültige Kopie geliefert (nur ohne Kopie wird der Fehler weitergereicht)
+    """
+    
+    RETRY_AFTER = 30  # Sekunden zwischen Versuchen nach einem Fehler
+    
+    def __init__(self, name, endpoint):
+        self.name = name
+        self.endpoint = endpoint
+        self.url = None
+        self.data = None
+        self.fetched_at = 0
+        self.ttl = 0
+        self.stale_ttl = 0
+        self.next_attempt = 0
+        self.refreshing = False
+        self.lock = threading.Lock()
+    
+    def get(self, url, force=False):
+        """
+        Gibt das Dokument unter url zurück.
+        
+        Args:
+            url: URL des Dokuments (ein URL-Wechsel verwirft den Cache)
+            force: Sofort neu laden (z.B. unbekannte Key-ID in der JWKS),
+                höchstens einmal pro RETRY_AFTER
+        """
+        app = current_app._get_current_object()
+        now = time.time()
+        with self.lock:
+            if url != self.url:
+                self.url, self.data, self.fetched_at, self.next_attempt = url, None, 0, 0
+            data = self.data
+            age = now - self.fetched_at
+            if data is not None and not force and age < self.ttl:
+                return data
+            if data is not None and now < self.next_attempt:
+                # Kürzlich fehlgeschlagen oder erzwungen aktualisiert - nicht erneut versuchen
+                return data
+            if data is not None and not force and age < self.ttl + self.stale_ttl:
+                if not self.refreshing:
+                    self.refreshing = True
+                    threading.Thread(target=self._refresh_in_background, args=(app, url),
+                                     name=f'{self.name}-refresh', daemon=True).start()
+                return data
+        
+        try:
+            return self._refresh(url, force=force)
+        except Exception as e:
+            if data is None:
+                raise
+            app.logger.warning(f"{self.name}: Aktualisierung fehlgeschlagen, verwende letzte gültige Kopie: {e}")
+            return data
+    
+    def _refresh_in_background(self, app, url):
+        with app.app_context():
+            try:
+                self._refresh(url)
+            except Exception as e:
+                app.logger.warning(f"{self.name}: Aktualisierung im Hintergrund fehlgeschlagen: {e}")
+        with self.lock:
+            self.refreshing = False
+    
+    def _refresh(self, url, force=False):
+        """Lädt das Dokument und übernimmt TTL und stale-while-revalidate aus Cache-Control"""
+        config = current_app.config
+        try:
+            response = zitadel_request(self.endpoint, 'GET', url)
+            response.raise_for_status()
+            data = response.json()
+        except Exception:
+            with self.lock:
+                self.next_attempt = time.time() + self.RETRY_AFTER
+            raise
+        
+        ttl = config.get('ZITADEL_METADATA_TTL', 3600)
+        stale_ttl = config.get('ZITADEL_METADATA_STALE_TTL', 24 * 3600)
+        cache_control = parse_dict_header(response.headers.get('Cache-Control', ''))
+        if 'no-store' in cache_control or 'no-cache' in cache_control:
+            ttl = 0
+        elif cache_control.get('max-age', '').isdigit():
+            # Bereits in Proxies verbrachte Zeit abziehen
+            age = response.headers.get('Age', '0')
+            ttl = max(0, int(cache_control['max-age']) - (int(age) if age.isdigit() else 0))
+        if cache_control.get('stale-while-revalidate', '').isdigit():
+            stale_ttl = int(cache_control['stale-while-revalidate'])
+        
+        with self.lock:
+            if url == self.url:
+                self.data = data
+                self.fetched_at = time.time()
+                self.ttl = ttl
+                self.stale_ttl = stale_ttl
+                self.next_attempt = self.fetched_at + self.RETRY_AFTER if force else 0
+        return data
+
+_provider_metadata = CachedJSONDocument('Zitadel Discovery', 'metadata')
+_jwks = CachedJSONDocument('Zitadel JWKS', 'jwks')
+
+def get_provider_metadata():
+    """Gibt das (gecachte) OIDC Discovery-Dokument von Zitadel zurück"""
+    issuer = current_app.config['ZITADEL_ISSUER']
+    return _provider_metadata.get(f"{issuer}/.well-known/openid-configuration")
+
+def get_jwks(force=False):
+    """Gibt die (gecachte) JWKS von Zitadel zurück (force bei unbekannter Key-ID)"""
+    jwks_uri = get_provider_metadata().get('jwks_uri')
+    if not jwks_uri:
+        raise RuntimeError('Missing "jwks_uri" in metadata')
+    return _jwks.get(jwks_uri, force=force)
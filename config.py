@@ -60,6 +60,11 @@ class Config:
         else:
             SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_file_path}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Engine-Profil für SQLite: "production" (WAL, busy_timeout, mmap, ...) oder "default" (unverändert)
+    SQLITE_ENGINE_PROFILE = os.environ.get('SQLITE_ENGINE_PROFILE', 'production')
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # Millisekunden Warten auf Schreibsperre
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # Bytes
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -20000))  # negativ = KiB (20MB pro Verbindung)
     
     # Upload settings (kann über Umgebungsvariable überschrieben werden)
     _upload_base_env = os.environ.get('UPLOAD_BASE', basedir)
@@ -99,9 +104,54 @@ class Config:
     else:
         MAX_CONTENT_LENGTH = 500 * 1024 * 1024  # 500MB default (für Backup-Dateien)
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'zip', 'json'}  # Backup-Formate hinzugefügt
+    # Zertifikatsdateien ändern sich nie (Hash/Zeitstempel im Namen) und dürfen lange gecacht werden
+    CERTIFICATE_CACHE_MAX_AGE = int(os.environ.get('CERTIFICATE_CACHE_MAX_AGE', 365 * 24 * 3600))
+    # Maximale Kantenlänge der Vorschaubilder für hochgeladene Zertifikatsbilder (Pixel)
+    CERTIFICATE_THUMBNAIL_SIZE = int(os.environ.get('CERTIFICATE_THUMBNAIL_SIZE', 480))
+    # Auslieferung der Dateien durch den Reverse Proxy statt durch einen Gunicorn-Worker:
+    # - Nginx: CERTIFICATE_X_ACCEL_PREFIX auf eine "internal" Location setzen (z.B. /protected-uploads/)
+    # - Apache/Lighttpd (mod_xsendfile): USE_X_SENDFILE=true
+    CERTIFICATE_X_ACCEL_PREFIX = os.environ.get('CERTIFICATE_X_ACCEL_PREFIX') or None
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() in ('true', '1', 'yes')
+    # Nicht referenzierte Uploads werden von "flask uploads gc" erst nach dieser Zeit gelöscht (Sekunden)
+    UPLOAD_GC_GRACE_PERIOD = int(os.environ.get('UPLOAD_GC_GRACE_PERIOD', 3600))
+
+    # Backup-ZIPs werden bis zu dieser Größe im Speicher gehalten, danach auf die Festplatte ausgelagert
+    BACKUP_SPOOL_MAX_SIZE = int(os.environ.get('BACKUP_SPOOL_MAX_SIZE', 16 * 1024 * 1024))  # 16MB
+    # Verzeichnis für ausgelagerte Backup-Dateien (Standard: System-Temp-Verzeichnis)
+    BACKUP_TEMP_DIR = os.environ.get('BACKUP_TEMP_DIR') or None
+    # Anzahl Zeilen pro Bulk-Insert beim Wiederherstellen eines Backups
+    RESTORE_BATCH_SIZE = int(os.environ.get('RESTORE_BATCH_SIZE', 500))
+    # Manifeste erstellter Backups (Basis für inkrementelle Backups)
+    BACKUP_MANIFEST_FOLDER = os.environ.get('BACKUP_MANIFEST_FOLDER') or os.path.join(db_path, 'backups')
+    
+    # Hintergrund-Jobs für Backup & Restore (Status-Dateien und fertige Backups)
+    # Standard: Unterordner "jobs" im Datenbank-Verzeichnis (Docker: /app/data/jobs)
+    JOBS_FOLDER = os.environ.get('JOBS_FOLDER') or os.path.join(db_path, 'jobs')
+    JOBS_MAX_WORKERS = int(os.environ.get('JOBS_MAX_WORKERS', 1))  # Threads pro Gunicorn-Worker
+    JOBS_STALE_AFTER = int(os.environ.get('JOBS_STALE_AFTER', 600))  # Sekunden ohne Lebenszeichen -> abgebrochen
+    JOBS_HEARTBEAT_INTERVAL = int(os.environ.get('JOBS_HEARTBEAT_INTERVAL', 30))  # Lebenszeichen laufender Jobs (Sekunden)
+    JOBS_RETENTION = int(os.environ.get('JOBS_RETENTION', 7 * 24 * 3600))  # Aufbewahrung fertiger Jobs (Sekunden)
+    
+    # Zeitraum des Berichts über ablaufende Zertifikate (Tage, ?days= überschreibt)
+    CERTIFICATE_EXPIRY_DAYS = int(os.environ.get('CERTIFICATE_EXPIRY_DAYS', 30))
+    # Einträge pro Seite in Listen (Coaches, Zertifikate, Erfahrungen, Trainingspläne); ?per_page= bis PAGE_SIZE_MAX
+    PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 50))
+    PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', 200))
     
     # Session settings
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
+    # Cache des eingeloggten Benutzers im user_loader (Sekunden, 0 = aus). Änderungen werden im
+    # eigenen Prozess sofort sichtbar, in anderen Gunicorn-Workern spätestens nach Ablauf der TTL
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+    
+    # Live-Status der Trainingsaktivitäten per Server-Sent Events
+    STATUS_STREAM_MAX_DURATION = int(os.environ.get('STATUS_STREAM_MAX_DURATION', 300))  # Sekunden bis zum Neuverbinden
+    STATUS_STREAM_HEARTBEAT = int(os.environ.get('STATUS_STREAM_HEARTBEAT', 15))  # Sekunden zwischen Heartbeats
+    # Gleichzeitige Streams pro Gunicorn-Worker (muss unter --threads liegen, weitere Clients pollen)
+    STATUS_STREAM_MAX_CONNECTIONS = int(os.environ.get('STATUS_STREAM_MAX_CONNECTIONS', 12))
+    # Maximale Cache-Dauer der Status-API (Sekunden; sonst bis zum nächsten Statuswechsel)
+    STATUS_MAX_AGE = int(os.environ.get('STATUS_MAX_AGE', 60))
     
     # Server Name für url_for() mit _external=True
     # Wird verwendet, um absolute URLs zu generieren
@@ -119,4 +169,23 @@ class Config:
     ZITADEL_MANAGEMENT_API_TOKEN = os.environ.get('ZITADEL_MANAGEMENT_API_TOKEN') or ''
     # Standard-Rolle für neue Benutzer (optional, muss in Zitadel konfiguriert sein)
     ZITADEL_DEFAULT_ROLE = os.environ.get('ZITADEL_DEFAULT_ROLE') or 'coach'
+    # Cache für Discovery-Dokument und JWKS (Sekunden; Cache-Control des Servers hat Vorrang)
+    ZITADEL_METADATA_TTL = int(os.environ.get('ZITADEL_METADATA_TTL', 3600))
+    # So lange nach Ablauf wird die alte Kopie weiter verwendet und im Hintergrund aktualisiert
+    ZITADEL_METADATA_STALE_TTL = int(os.environ.get('ZITADEL_METADATA_STALE_TTL', 24 * 3600))
+    ZITADEL_METADATA_TIMEOUT = int(os.environ.get('ZITADEL_METADATA_TIMEOUT', 5))
+    # HTTP-Client für Zitadel: Timeouts pro Endpoint (Sekunden), Pool, Wiederholungen, Circuit Breaker
+    ZITADEL_CONNECT_TIMEOUT = float(os.environ.get('ZITADEL_CONNECT_TIMEOUT', 3))
+    ZITADEL_TOKEN_TIMEOUT = float(os.environ.get('ZITADEL_TOKEN_TIMEOUT', 10))
+    ZITADEL_USERINFO_TIMEOUT = float(os.environ.get('ZITADEL_USERINFO_TIMEOUT', 5))
+    ZITADEL_MANAGEMENT_TIMEOUT = float(os.environ.get('ZITADEL_MANAGEMENT_TIMEOUT', 15))
+    ZITADEL_HTTP_POOL_SIZE = int(os.environ.get('ZITADEL_HTTP_POOL_SIZE', 10))
+    ZITADEL_HTTP_RETRIES = int(os.environ.get('ZITADEL_HTTP_RETRIES', 2))  # nur GET, mit exponentiellem Backoff
+    ZITADEL_HTTP_BACKOFF = float(os.environ.get('ZITADEL_HTTP_BACKOFF', 0.3))
+    ZITADEL_CIRCUIT_FAILURES = int(os.environ.get('ZITADEL_CIRCUIT_FAILURES', 5))  # Fehler in Folge bis zum Öffnen
+    ZITADEL_CIRCUIT_RESET = int(os.environ.get('ZITADEL_CIRCUIT_RESET', 30))  # Sekunden bis zum nächsten Versuch
+    ZITADEL_SLOW_CALL_SECONDS = float(os.environ.get('ZITADEL_SLOW_CALL_SECONDS', 2))  # langsame Aufrufe loggen
+    # ID Token enthält Rollen immer ("User roles inside ID Token" aktiv) - dann wird ein fehlender
+    # Rollen-Claim als "keine Rollen" gewertet statt Userinfo abzufragen
+    ZITADEL_ID_TOKEN_ROLES = os.environ.get('ZITADEL_ID_TOKEN_ROLES', 'false').lower() in ('true', '1', 'yes')
 
@@ -0,0 +1,33 @@
+"""Add precomputed group cells to training activities
+
+Revision ID: 3c2e8a1f5b7d
+Revises: 7f0d4b46bcf0
+Create Date: 2026-10-17 13:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c2e8a1f5b7d'
+down_revision = '7f0d4b46bcf0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bestehende Aktivitäten anschließend mit 'flask activities backfill-cells' befüllen
+    # Prüfe ob group_cells bereits existiert (z.B. Datenbank per db.create_all() erstellt);
+    # batch_alter_table führt die Änderungen erst am Blockende aus, try/except greift hier nicht
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('training_activities')]
+    if 'group_cells' in columns:
+        return
+    
+    with op.batch_alter_table('training_activities', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('group_cells', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('training_activities', schema=None) as batch_op:
+        batch_op.drop_column('group_cells')
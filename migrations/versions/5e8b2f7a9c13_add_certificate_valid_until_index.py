@@ -0,0 +1,27 @@
+"""Add index on certificates.valid_until
+
+Revision ID: 5e8b2f7a9c13
+Revises: d4a7c93e1b26
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8b2f7a9c13'
+down_revision = 'd4a7c93e1b26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Index überspringen, wenn er bereits existiert (z.B. Datenbank per db.create_all() erstellt)
+    existing = [index['name'] for index in sa.inspect(op.get_bind()).get_indexes('certificates')]
+    if 'ix_certificates_valid_until' not in existing:
+        op.create_index('ix_certificates_valid_until', 'certificates', ['valid_until'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_certificates_valid_until', table_name='certificates')
@@ -0,0 +1,38 @@
+"""Add foreign key and training plan schedule indexes
+
+Revision ID: 9b1f6d2c4a80
+Revises: 3c2e8a1f5b7d
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1f6d2c4a80'
+down_revision = '3c2e8a1f5b7d'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_certificates_user_id', 'certificates', ['user_id']),
+    ('ix_experiences_user_id', 'experiences', ['user_id']),
+    ('ix_training_activities_plan_id', 'training_activities', ['plan_id']),
+    ('ix_training_plans_team_schedule', 'training_plans', ['team_name', 'weekday', 'start_date', 'end_date']),
+    ('ix_users_full_name', 'users', ['full_name']),
+]
+
+
+def upgrade():
+    # Indizes überspringen, die bereits existieren (z.B. Datenbank per db.create_all() erstellt)
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        existing = [index['name'] for index in inspector.get_indexes(table)]
+        if name not in existing:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,63 @@
+"""Add full-text search index for coaches
+
+Revision ID: d4a7c93e1b26
+Revises: 9b1f6d2c4a80
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7c93e1b26'
+down_revision = '9b1f6d2c4a80'
+branch_labels = None
+depends_on = None
+
+SEARCH_FIELDS = ['full_name', 'email', 'team', 'city', 'license_number']
+TRANSLITERATION = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'Ä': 'Ae', 'Ö': 'Oe', 'Ü': 'Ue', 'ß': 'ss'})
+
+
+def index_value(value):
+    # Entspricht app.search.index_value (Original plus Umschrift der Umlaute)
+    if not value:
+        return ''
+    transliterated = value.translate(TRANSLITERATION)
+    return value if transliterated == value else f"{value} {transliterated}"
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        # LIKE '%begriff%' kann unter PostgreSQL Trigramm-Indizes nutzen
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for field in SEARCH_FIELDS:
+            op.execute(f'CREATE INDEX IF NOT EXISTS ix_users_{field}_trgm ON users USING gin ({field} gin_trgm_ops)')
+        return
+    if bind.dialect.name != 'sqlite':
+        return
+
+    op.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS coach_search USING fts5("
+        f"{', '.join(SEARCH_FIELDS)}, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    op.execute("INSERT INTO coach_search (coach_search, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0, 1.0, 5.0)')")
+    op.execute("DELETE FROM coach_search")
+    users = bind.execute(sa.text(f"SELECT id, {', '.join(SEARCH_FIELDS)} FROM users")).all()
+    if users:
+        bind.execute(
+            sa.text(f"INSERT INTO coach_search (rowid, {', '.join(SEARCH_FIELDS)}) "
+                    f"VALUES (:rowid, {', '.join(':' + field for field in SEARCH_FIELDS)})"),
+            [dict({'rowid': user.id}, **{field: index_value(getattr(user, field)) for field in SEARCH_FIELDS})
+             for user in users]
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        for field in SEARCH_FIELDS:
+            op.execute(f'DROP INDEX IF EXISTS ix_users_{field}_trgm')
+    elif bind.dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS coach_search')
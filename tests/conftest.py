@@ -0,0 +1,70 @@
+"""
+Gemeinsame Fixtures für die Tests: App mit In-Memory-SQLite-Datenbank
+"""
+from contextlib import contextmanager
+from sqlalchemy import event
+from config import Config
+from app import create_app, db
+from app.user_cache import clear_user_cache
+import pytest
+
+class TestConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    ZITADEL_ISSUER = 'https://zitadel.example.com'
+    ZITADEL_CLIENT_ID = 'test'
+    ZITADEL_CLIENT_SECRET = 'test'
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    App mit leerer Datenbank (Schema über db.create_all()).
+    
+    Der App-Kontext bleibt nicht aktiv, damit jede Anfrage des Test-Clients
+    ihren eigenen Kontext (Session, Flask-Login-Benutzer) bekommt; Tests mit
+    Datenbankzugriff öffnen ihn mit "with app.app_context()".
+    """
+    class _Config(TestConfig):
+        UPLOAD_FOLDER = str(tmp_path / 'uploads' / 'certificates')
+        JOBS_FOLDER = str(tmp_path / 'jobs')
+        BACKUP_MANIFEST_FOLDER = str(tmp_path / 'backups')
+    
+    app = create_app(_Config)
+    clear_user_cache()
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def login(client):
+    """Meldet einen Benutzer im Test-Client an (Session wie nach dem Zitadel-Login)"""
+    def login(user_id):
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+    return login
+
+@pytest.fixture
+def count_queries(app):
+    """Kontextmanager, der die ausgeführten SQL-Statements sammelt (before_cursor_execute)"""
+    with app.app_context():
+        engine = db.engine
+    
+    @contextmanager
+    def count_queries():
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return count_queries
@@ -0,0 +1,71 @@
+"""
+Live-Status eines Trainingsplans: bedingte Abfragen (ETag -> 304) und
+neuer Stand nach Änderungen an Plan oder Aktivitäten
+"""
+from datetime import date, time
+from app import db
+from app.models import User, TrainingPlan, TrainingActivity
+
+def make_admin():
+    return User(email='admin@example.com', first_name='Admin', last_name='Test', full_name='Admin Test',
+                birth_date=date(1980, 1, 1), address='Teststrasse 1', zip_code='3000', city='Bern',
+                mobile_phone='079 000 00 00', team='U19 Tackle', is_admin=True)
+
+def create_plan(app, login):
+    """Plan mit einer Aktivität, der heute stattfindet; meldet einen Admin an"""
+    today = date.today()
+    with app.app_context():
+        admin = make_admin()
+        plan = TrainingPlan(title='Training', team_name='U19 Tackle', start_date=date(today.year, 1, 1),
+                            end_date=date(today.year, 12, 31), weekday=today.weekday(), start_time=time(18, 0))
+        activity = TrainingActivity(plan=plan, order=1, activity_name='Warm-up', activity_type='team_wide',
+                                    duration_minutes=20, time_from=time(18, 0), time_to=time(18, 20))
+        db.session.add_all([admin, plan, activity])
+        db.session.commit()
+        ids = plan.id, activity.id
+        login(admin.id)
+    return ids
+
+def get_etag(client, plan_id):
+    response = client.get(f'/api/training-plans/{plan_id}/activities/status')
+    assert response.status_code == 200
+    return response.headers['ETag']
+
+def test_unchanged_status_returns_304(app, client, login):
+    plan_id, activity_id = create_plan(app, login)
+    etag = get_etag(client, plan_id)
+    
+    response = client.get(f'/api/training-plans/{plan_id}/activities/status', headers={'If-None-Match': etag})
+    
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == etag
+
+def test_etag_changes_after_activity_edit(app, client, login):
+    plan_id, activity_id = create_plan(app, login)
+    etag = get_etag(client, plan_id)
+    assert 'Warm-up' in client.get(f'/training-plans/{plan_id}').get_data(as_text=True)
+    
+    response = client.post(f'/training-plans/{plan_id}/activities/{activity_id}/edit', data={
+        'activity_name': 'Stretching', 'activity_type': 'team_wide', 'duration_minutes': '25'
+    })
+    assert response.status_code == 302
+    
+    response = client.get(f'/api/training-plans/{plan_id}/activities/status', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    # Zwischengespeicherte Aktivitäten-Tabelle wurde neu gerendert
+    assert 'Stretching' in client.get(f'/training-plans/{plan_id}').get_data(as_text=True)
+
+def test_etag_changes_after_plan_edit(app, client, login):
+    plan_id, activity_id = create_plan(app, login)
+    etag = get_etag(client, plan_id)
+    today = date.today()
+    
+    response = client.post(f'/training-plans/{plan_id}/edit', data={
+        'title': 'Training', 'team_name': 'U19 Tackle', 'start_date': f'{today.year}-01-01',
+        'end_date': f'{today.year}-12-31', 'weekday': str(today.weekday()), 'start_time': '19:00'
+    })
+    assert response.status_code == 302
+    
+    assert get_etag(client, plan_id) != etag
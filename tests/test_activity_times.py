@@ -0,0 +1,166 @@
+"""
+Zeitberechnung der Aktivitäten eines Trainingsplans (calculate_activity_times)
+"""
+from datetime import date, time
+from app import db
+from app.models import User, TrainingPlan, TrainingActivity
+from app.utils import calculate_activity_times
+
+def make_admin():
+    return User(email='admin@example.com', first_name='Admin', last_name='Test', full_name='Admin Test',
+                birth_date=date(1980, 1, 1), address='Teststrasse 1', zip_code='3000', city='Bern',
+                mobile_phone='079 000 00 00', team='U19 Tackle', is_admin=True)
+
+def make_plan(start_time=time(18, 0)):
+    return TrainingPlan(title='Training', team_name='U19 Tackle', start_date=date(2026, 1, 1),
+                        end_date=date(2026, 12, 31), weekday=1, start_time=start_time)
+
+def add_activity(plan, order, name, minutes, activity_type='team_wide'):
+    # Platzhalter-Zeiten, die Tests setzen sie über calculate_activity_times
+    activity = TrainingActivity(plan=plan, order=order, activity_name=name, activity_type=activity_type,
+                                duration_minutes=minutes, time_from=time(0, 0), time_to=time(0, 0))
+    db.session.add(activity)
+    return activity
+
+def get_times(plan_id):
+    return {
+        activity.activity_name: (activity.time_from.strftime('%H:%M'), activity.time_to.strftime('%H:%M'))
+        for activity in TrainingActivity.query.filter_by(plan_id=plan_id)
+    }
+
+def create_plan(app, activities, start_time=time(18, 0)):
+    """Legt einen Plan mit Aktivitäten (name, minutes, activity_type) an und berechnet ihre Zeiten"""
+    with app.app_context():
+        plan = make_plan(start_time)
+        db.session.add(plan)
+        for order, (name, minutes, activity_type) in enumerate(activities, start=1):
+            add_activity(plan, order, name, minutes, activity_type)
+        db.session.flush()
+        calculate_activity_times(plan, plan.activities)
+        db.session.commit()
+        return plan.id
+
+def test_prepractice_counts_back_and_practice_forward(app):
+    plan_id = create_plan(app, [('Taping', 15, 'prepractice'), ('Meeting', 10, 'prepractice'),
+                                ('Warm-up', 20, 'team_wide'), ('Individual', 30, 'position_specific')])
+    
+    with app.app_context():
+        assert get_times(plan_id) == {
+            'Taping': ('17:35', '17:50'), 'Meeting': ('17:50', '18:00'),
+            'Warm-up': ('18:00', '18:20'), 'Individual': ('18:20', '18:50')
+        }
+
+def test_new_activity_gets_times_without_changing_others(app):
+    plan_id = create_plan(app, [('Meeting', 10, 'prepractice'), ('Warm-up', 20, 'team_wide')])
+    
+    with app.app_context():
+        plan = db.session.get(TrainingPlan, plan_id)
+        activity = TrainingActivity(plan_id=plan_id, order=3, activity_name='Team', activity_type='team_wide',
+                                    duration_minutes=25)
+        calculate_activity_times(plan, plan.activities, activity, changed_order=activity.order)
+        db.session.add(activity)
+        db.session.commit()
+        
+        assert get_times(plan_id) == {
+            'Meeting': ('17:50', '18:00'), 'Warm-up': ('18:00', '18:20'), 'Team': ('18:20', '18:45')
+        }
+
+def test_changed_practice_duration_shifts_only_later_activities(app):
+    plan_id = create_plan(app, [('Meeting', 10, 'prepractice'), ('Warm-up', 20, 'team_wide'),
+                                ('Individual', 30, 'position_specific'), ('Team', 15, 'team_wide')])
+    
+    with app.app_context():
+        plan = db.session.get(TrainingPlan, plan_id)
+        activity = TrainingActivity.query.filter_by(plan_id=plan_id, activity_name='Individual').one()
+        activity.duration_minutes = 40
+        calculate_activity_times(plan, plan.activities, changed_order=activity.order)
+        db.session.commit()
+        
+        assert get_times(plan_id) == {
+            'Meeting': ('17:50', '18:00'), 'Warm-up': ('18:00', '18:20'),
+            'Individual': ('18:20', '19:00'), 'Team': ('19:00', '19:15')
+        }
+
+def test_changed_prepractice_duration_shifts_only_earlier_prepractice(app):
+    plan_id = create_plan(app, [('Taping', 15, 'prepractice'), ('Meeting', 10, 'prepractice'),
+                                ('Walkthrough', 5, 'prepractice'), ('Warm-up', 20, 'team_wide')])
+    
+    with app.app_context():
+        plan = db.session.get(TrainingPlan, plan_id)
+        activity = TrainingActivity.query.filter_by(plan_id=plan_id, activity_name='Meeting').one()
+        activity.duration_minutes = 20
+        calculate_activity_times(plan, plan.activities, changed_order=activity.order)
+        db.session.commit()
+        
+        assert get_times(plan_id) == {
+            'Taping': ('17:20', '17:35'), 'Meeting': ('17:35', '17:55'),
+            'Walkthrough': ('17:55', '18:00'), 'Warm-up': ('18:00', '18:20')
+        }
+
+def test_deleted_activity_closes_the_gap(app):
+    plan_id = create_plan(app, [('Warm-up', 20, 'team_wide'), ('Individual', 30, 'position_specific'),
+                                ('Team', 15, 'team_wide')])
+    
+    with app.app_context():
+        plan = db.session.get(TrainingPlan, plan_id)
+        activity = TrainingActivity.query.filter_by(plan_id=plan_id, activity_name='Individual').one()
+        db.session.delete(activity)
+        calculate_activity_times(plan, plan.activities, changed_order=activity.order)
+        db.session.commit()
+        
+        assert get_times(plan_id) == {'Warm-up': ('18:00', '18:20'), 'Team': ('18:20', '18:35')}
+
+def test_changed_start_time_moves_all_activities(app, client, login):
+    plan_id = create_plan(app, [('Meeting', 10, 'prepractice'), ('Warm-up', 20, 'team_wide')])
+    with app.app_context():
+        admin = make_admin()
+        db.session.add(admin)
+        db.session.commit()
+        admin_id = admin.id
+    login(admin_id)
+    
+    response = client.post(f'/training-plans/{plan_id}/edit', data={
+        'title': 'Training', 'team_name': 'U19 Tackle', 'start_date': '2026-01-01', 'end_date': '2026-12-31',
+        'weekday': '1', 'start_time': '19:30'
+    })
+    
+    assert response.status_code == 302
+    with app.app_context():
+        assert get_times(plan_id) == {'Meeting': ('19:20', '19:30'), 'Warm-up': ('19:30', '19:50')}
+
+def test_reorder_prepractice_counts_back_from_start(app, client, login):
+    with app.app_context():
+        admin = make_admin()
+        plan = make_plan()
+        db.session.add_all([admin, plan])
+        first = add_activity(plan, 1, 'A', 10, 'prepractice')
+        second = add_activity(plan, 2, 'B', 20, 'prepractice')
+        add_activity(plan, 3, 'Warm-up', 15)
+        db.session.flush()
+        calculate_activity_times(plan, plan.activities)
+        db.session.commit()
+        assert get_times(plan.id) == {'A': ('17:30', '17:40'), 'B': ('17:40', '18:00'), 'Warm-up': ('18:00', '18:15')}
+        plan_id, first_id, second_id, admin_id = plan.id, first.id, second.id, admin.id
+    login(admin_id)
+    
+    response = client.post(f'/training-plans/{plan_id}/activities/reorder',
+                           json={'order': {str(first_id): 2, str(second_id): 1}})
+    
+    assert response.status_code == 200
+    with app.app_context():
+        assert get_times(plan_id) == {'B': ('17:30', '17:50'), 'A': ('17:50', '18:00'), 'Warm-up': ('18:00', '18:15')}
+
+def test_reorder_rejects_invalid_payload(app, client, login):
+    with app.app_context():
+        admin = make_admin()
+        plan = make_plan()
+        db.session.add_all([admin, plan])
+        db.session.commit()
+        plan_id, admin_id = plan.id, admin.id
+    login(admin_id)
+    url = f'/training-plans/{plan_id}/activities/reorder'
+    
+    assert client.post(url, json={'order': {'1': 'zwei'}}).status_code == 400
+    assert client.post(url, json={'order': {'eins': 2}}).status_code == 400
+    assert client.post(url, json={'order': [1, 2]}).status_code == 400
+    assert client.post(url, data='kein json', content_type='application/json').status_code == 400
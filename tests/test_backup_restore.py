@@ -0,0 +1,118 @@
+"""
+Backup & Restore: gestreamtes Lesen des Backup-JSON und Wiederherstellen
+einer Kette aus vollständigem und inkrementellem Backup
+"""
+from datetime import date, time
+from app import db
+from app.backup_restore import JSONStreamReader, create_backup_zip, restore_backup_chain
+from app.models import User, Certificate, Experience, TrainingPlan, TrainingActivity
+import io
+import json
+import os
+import pytest
+import types
+
+def read_members(text, **kwargs):
+    """Liest alle Felder; Arrays werden zu Listen"""
+    reader = JSONStreamReader(io.StringIO(text), **kwargs)
+    return {key: list(value) if isinstance(value, types.GeneratorType) else value
+            for key, value in reader.iter_members()}
+
+def test_reader_streams_values_across_blocks():
+    data = {
+        'version': '1.0',
+        'users': [{'id': i, 'email': f'coach{i}@example.com', 'score': i + 0.25} for i in range(50)],
+        'empty': [],
+        'count': 12345
+    }
+    
+    # Blockgröße kleiner als jeder Einzelwert: Werte und Zahlen über Blockgrenzen
+    assert read_members(json.dumps(data, indent=2), chunk_size=3) == data
+
+def test_reader_rejects_truncated_file():
+    text = json.dumps({'users': [{'id': 1, 'email': 'coach@example.com'}]})
+    
+    with pytest.raises(ValueError, match='unvollständig oder beschädigt'):
+        read_members(text[:-10], chunk_size=8)
+
+def test_reader_rejects_malformed_separator():
+    with pytest.raises(ValueError, match="',' oder ']' erwartet"):
+        read_members('{"users": [{"id": 1} {"id": 2}]}')
+
+def test_reader_limits_buffer_on_malformed_value():
+    # Fehlendes Anführungszeichen: der Rest der Datei wäre ein einziger (unvollständiger) Wert
+    text = '{"users": [{"email": "coach@example.com, "id": 1}' + ', {"id": 2}' * 1000 + ']}'
+    reader = JSONStreamReader(io.StringIO(text), chunk_size=64, max_value_size=1024)
+    
+    with pytest.raises(ValueError, match='länger als 1024 Zeichen'):
+        for key, rows in reader.iter_members():
+            list(rows)
+    assert len(reader.buffer) <= 1024 + 2 * 64
+
+def make_user(email, full_name):
+    first_name, last_name = full_name.split(' ')
+    return User(email=email, full_name=full_name, first_name=first_name, last_name=last_name,
+                birth_date=date(1990, 1, 1), address='Strasse 1', zip_code='3000', city='Bern',
+                mobile_phone='079 000 00 00', team='Seniors')
+
+def write_upload(app, name, content):
+    path = os.path.join(app.config['UPLOAD_FOLDER'], name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+def test_restore_chain_merges_incremental_backup(app):
+    with app.app_context():
+        anna = make_user('anna@example.com', 'Anna Muster')
+        beat = make_user('beat@example.com', 'Beat Beispiel')
+        db.session.add_all([anna, beat])
+        db.session.flush()
+        db.session.add_all([
+            Certificate(user_id=anna.id, title='C-Trainer', organization='SAFV',
+                        acquisition_date=date(2020, 5, 1), file_url='certificates/c-trainer.pdf'),
+            Experience(user_id=beat.id, start_year=2015, end_year=2018, team='Juniors', position='OL')
+        ])
+        plan = TrainingPlan(title='Dienstag', team_name='Seniors', start_date=date(2025, 1, 1),
+                            end_date=date(2025, 12, 31), weekday=1, start_time=time(19, 0))
+        db.session.add(plan)
+        db.session.flush()
+        db.session.add(TrainingActivity(plan_id=plan.id, time_from=time(19, 0), time_to=time(19, 15),
+                                        duration_minutes=15, activity_name='Warm-up',
+                                        activity_type='team_wide', order=1))
+        db.session.commit()
+        write_upload(app, 'c-trainer.pdf', b'full')
+        
+        full_backup = create_backup_zip(io.BytesIO())
+        
+        # Änderungen nach dem vollständigen Backup
+        anna.city = 'Thun'
+        db.session.delete(Experience.query.one())
+        cora = make_user('cora@example.com', 'Cora Neu')
+        db.session.add(cora)
+        db.session.flush()
+        db.session.add(Certificate(user_id=cora.id, title='B-Trainer', organization='SAFV',
+                                   acquisition_date=date(2024, 3, 1), file_url='certificates/b-trainer.pdf'))
+        db.session.commit()
+        write_upload(app, 'b-trainer.pdf', b'incremental')
+        
+        incremental_backup = create_backup_zip(io.BytesIO(), incremental=True)
+        
+        # Wiederherstellen in eine leere Datenbank ohne Upload-Dateien
+        for name in ('c-trainer.pdf', 'b-trainer.pdf'):
+            os.remove(os.path.join(app.config['UPLOAD_FOLDER'], name))
+        success, message, stats = restore_backup_chain([incremental_backup, full_backup], clear_existing=True)
+        
+        assert success, message
+        assert stats['files'] == 2
+        users = {user.email: user for user in User.query}
+        assert set(users) == {'anna@example.com', 'beat@example.com', 'cora@example.com'}
+        assert users['anna@example.com'].city == 'Thun'
+        assert Experience.query.count() == 0
+        assert sorted((cert.user.email, cert.title) for cert in Certificate.query) == [
+            ('anna@example.com', 'C-Trainer'), ('cora@example.com', 'B-Trainer')
+        ]
+        restored_plan = TrainingPlan.query.one()
+        assert [activity.activity_name for activity in restored_plan.activities] == ['Warm-up']
+        with open(os.path.join(app.config['UPLOAD_FOLDER'], 'b-trainer.pdf'), 'rb') as f:
+            assert f.read() == b'incremental'
@@ -0,0 +1,62 @@
+"""
+Auslieferung der Zertifikatsdateien (Cache-Header, Nginx X-Accel-Redirect)
+"""
+from datetime import date
+from app import db
+from app.models import User
+from app.storage import THUMBNAIL_SUFFIX, THUMBNAIL_EXTENSION
+import os
+import pytest
+
+def write_upload(app, relative_path, content=b'%PDF-1.4'):
+    path = os.path.join(app.config['UPLOAD_FOLDER'], relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+def test_files_are_not_cached_by_shared_caches(app, client):
+    write_upload(app, 'ab/zertifikat.pdf')
+    
+    response = client.get('/static/uploads/certificates/ab/zertifikat.pdf')
+    
+    assert response.status_code == 200
+    assert response.cache_control.private
+    assert not response.cache_control.public
+    assert response.cache_control.immutable
+
+def test_accel_redirect_quotes_filename(app, client):
+    app.config['CERTIFICATE_X_ACCEL_PREFIX'] = '/protected/certificates/'
+    write_upload(app, 'ab/zertifikat 1.pdf')
+    
+    response = client.get('/static/uploads/certificates/ab/zertifikat%201.pdf')
+    
+    assert response.headers['X-Accel-Redirect'] == '/protected/certificates/ab/zertifikat%201.pdf'
+    assert 'private' in response.headers['Cache-Control']
+
+def write_image(app, relative_path):
+    from PIL import Image
+    path = os.path.join(app.config['UPLOAD_FOLDER'], relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new('RGB', (800, 600), 'white').save(path)
+    return path
+
+def test_missing_thumbnail_is_only_generated_for_logged_in_users(app, client, login):
+    pytest.importorskip('PIL')
+    write_image(app, 'ab/foto.png')
+    thumbnail = 'ab/foto' + THUMBNAIL_SUFFIX + THUMBNAIL_EXTENSION
+    thumbnail_path = os.path.join(app.config['UPLOAD_FOLDER'], thumbnail)
+    
+    assert client.get('/static/uploads/certificates/' + thumbnail).status_code == 404
+    assert not os.path.exists(thumbnail_path)
+    
+    with app.app_context():
+        user = User(email='coach@example.com', first_name='Coach', last_name='Test', full_name='Coach Test',
+                    birth_date=date(1990, 1, 1), address='Teststrasse 1', zip_code='3000', city='Bern',
+                    mobile_phone='079 000 00 00', team='U19 Tackle')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    login(user_id)
+    
+    assert client.get('/static/uploads/certificates/' + thumbnail).status_code == 200
+    assert os.path.exists(thumbnail_path)
@@ -0,0 +1,46 @@
+"""
+Die Coach-Listen und der Export brauchen unabhängig von der Anzahl Coaches
+gleich viele Queries (kein N+1 für Zertifikate und Erfahrungen)
+"""
+from datetime import date
+from app import db
+from app.models import User, Certificate, Experience
+import pytest
+
+def make_user(number, is_admin=False):
+    return User(email=f'coach{number}@example.com', first_name='Coach', last_name=str(number),
+                full_name=f'Coach {number}', birth_date=date(1990, 1, 1), address='Teststrasse 1',
+                zip_code='3000', city='Bern', mobile_phone='079 000 00 00', team='U19 Tackle',
+                is_admin=is_admin)
+
+def add_coaches(app, start, count):
+    with app.app_context():
+        for number in range(start, start + count):
+            coach = make_user(number)
+            coach.certificates.append(Certificate(title='Trainer C', organization='Swiss American Football',
+                                                  acquisition_date=date(2020, 1, 1), valid_until=date(2030, 1, 1)))
+            coach.experiences.append(Experience(team='U19 Tackle', position='Head Coach', start_year=2015, end_year=2019))
+            db.session.add(coach)
+        db.session.commit()
+
+@pytest.mark.parametrize('url', ['/coaches', '/admin/coaches', '/admin/coaches/export'])
+def test_query_count_is_independent_of_coach_count(app, client, login, count_queries, url):
+    with app.app_context():
+        admin = make_user(0, is_admin=True)
+        db.session.add(admin)
+        db.session.commit()
+        login(admin.id)
+    
+    query_counts = []
+    for count in (2, 20):
+        add_coaches(app, len(query_counts) * 100 + 1, count)
+        # Erster Aufruf füllt die prozessweiten Caches (Benutzer, Suchindex)
+        client.get(url).get_data()
+        with count_queries() as statements:
+            response = client.get(url)
+            data = response.get_data(as_text=True)
+        assert response.status_code == 200
+        assert f'Coach {len(query_counts) * 100 + 1}' in data
+        query_counts.append(len(statements))
+    
+    assert query_counts[0] == query_counts[1]
@@ -0,0 +1,70 @@
+"""
+Coach-Suche: seitenweise nach Relevanz (Cursor aus Rang und ID) und
+ILIKE-Fallback ohne Suchindex
+"""
+from datetime import date
+from app import db, search
+from app.models import User
+
+def make_user(number, full_name, city='Bern', is_admin=False):
+    first_name, last_name = full_name.split(' ', 1)
+    return User(email=f'coach{number}@example.com', first_name=first_name, last_name=last_name,
+                full_name=full_name, birth_date=date(1990, 1, 1), address='Teststrasse 1',
+                zip_code='3000', city=city, mobile_phone='079 000 00 00', team='U19 Tackle',
+                is_admin=is_admin)
+
+def add_coaches(app, login):
+    with app.app_context():
+        admin = make_user(0, 'Admin Test', is_admin=True)
+        db.session.add_all([
+            admin,
+            make_user(1, 'Anna Müller'), make_user(2, 'Beat Keller', city='Müllheim'),
+            make_user(3, 'Cora Müller'), make_user(4, 'Dario Müller Müller'),
+            make_user(5, 'Eva Meier'), make_user(6, 'Fritz Müller')
+        ])
+        db.session.commit()
+        login(admin.id)
+
+def search_all(client, term, per_page=2):
+    """Alle Seiten einer Suche über ?format=json abrufen"""
+    names = []
+    cursor = ''
+    while True:
+        data = client.get('/admin/coaches', query_string={
+            'search': term, 'format': 'json', 'per_page': per_page, 'cursor': cursor
+        }).get_json()
+        assert len(data['items']) <= per_page
+        names += [item['full_name'] for item in data['items']]
+        if not data['has_next']:
+            return names
+        cursor = data['next_cursor']
+
+def test_search_pages_through_ranked_results(app, client, login):
+    add_coaches(app, login)
+    
+    names = search_all(client, 'müll')
+    
+    assert names == search_all(client, 'müll', per_page=50)
+    assert sorted(names) == ['Anna Müller', 'Beat Keller', 'Cora Müller', 'Dario Müller Müller', 'Fritz Müller']
+    # Treffer im Namen vor Treffern im Ort
+    assert names[-1] == 'Beat Keller'
+
+def test_search_page_links_to_next_page(app, client, login):
+    add_coaches(app, login)
+    
+    html = client.get('/admin/coaches?search=m%C3%BCller&per_page=2').get_data(as_text=True)
+    
+    assert 'Weiter' in html
+    assert 'search=m%C3%BCller' in html
+
+def test_fallback_without_index_ignores_case(app, client, login, monkeypatch):
+    add_coaches(app, login)
+    monkeypatch.setattr(search, 'is_search_index_available', lambda connection: False)
+    
+    names = search_all(client, 'KELLER')
+    assert names == ['Beat Keller']
+    # Platzhalter in der Eingabe werden nicht als LIKE-Muster ausgewertet
+    assert search_all(client, '%') == []
+    # Ohne Index nach Name sortiert, ebenfalls seitenweise
+    assert search_all(client, 'example.com') == sorted(search_all(client, 'example.com', per_page=50))
+    assert len(search_all(client, 'example.com')) == 7
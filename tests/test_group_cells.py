@@ -0,0 +1,30 @@
+"""
+Zellen der Gruppen-Spalten (build_group_cells): zusammengefasste Zellen für
+Gruppenkombinationen bei group_specific und special_teams
+"""
+from app.models import build_group_cells, GROUPS_ORDER
+import pytest
+
+COMBINATIONS = {'OL,DL': 'Line', 'LB': 'Backers', 'RB,TE': 'Skill', 'WR': 'Skill'}
+
+@pytest.mark.parametrize('activity_type', ['group_specific', 'special_teams'])
+def test_combinations_are_merged(activity_type):
+    cells = build_group_cells(activity_type, 'Special Teams', None, COMBINATIONS)
+    
+    assert cells == [
+        {'colspan': 2, 'text': 'Line', 'groups': ['OL', 'DL']},
+        {'colspan': 1, 'text': 'Backers', 'groups': ['LB']},
+        {'colspan': 3, 'text': 'Skill', 'groups': ['RB', 'TE', 'WR']},
+        {'colspan': 1, 'text': '-', 'groups': ['DB']},
+        {'colspan': 1, 'text': '-', 'groups': ['QB']}
+    ]
+
+def test_special_teams_without_combinations_spans_all_groups():
+    assert build_group_cells('special_teams', 'Punt', None, None) == [
+        {'colspan': 8, 'text': 'Punt', 'groups': GROUPS_ORDER}
+    ]
+
+def test_group_specific_without_combinations_shows_checkmarks():
+    cells = build_group_cells('group_specific', 'Drills', {'OL': True, 'QB': True}, None)
+    
+    assert [cell['text'] for cell in cells] == ['✓', '-', '-', '-', '-', '-', '-', '✓']
@@ -0,0 +1,28 @@
+"""
+Hintergrund-Jobs: höchstens ein aktiver Backup-/Restore-Job
+"""
+from concurrent.futures import ThreadPoolExecutor
+from app import jobs
+import time
+
+def test_only_one_job_is_created_concurrently(app, monkeypatch):
+    list_jobs = jobs.list_jobs
+    
+    def slow_list_jobs():
+        # Zeitfenster zwischen Prüfung und Anlegen vergrössern (wie bei parallelen Gunicorn-Workern)
+        result = list_jobs()
+        time.sleep(0.05)
+        return result
+    monkeypatch.setattr(jobs, 'list_jobs', slow_list_jobs)
+    
+    def create(number):
+        with app.app_context():
+            job, error = jobs._create_job('backup')
+            return job
+    
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        created = [job for job in executor.map(create, range(4)) if job]
+    
+    assert len(created) == 1
+    with app.app_context():
+        assert [job['status'] for job in list_jobs()] == [jobs.JOB_STATUS_QUEUED]
@@ -0,0 +1,75 @@
+"""
+Keyset-Pagination: Cursor, Reihenfolge mit NULL-Werten und JSON-Ausgabe
+"""
+from datetime import date, time
+from app import db
+from app.models import User, TrainingPlan
+from app.pagination import decode_cursor, encode_cursor, keyset_query, paginate_keyset
+from app.queries import COACH_SORT_KEYS, TRAINING_PLAN_SORT_KEYS
+import pytest
+
+def make_user(number, full_name, is_admin=False):
+    first_name, last_name = (full_name or 'Coach X').split(' ')
+    return User(email=f'coach{number}@example.com', first_name=first_name, last_name=last_name,
+                full_name=full_name, birth_date=date(1990, 1, 1), address='Teststrasse 1',
+                zip_code='3000', city='Bern', mobile_phone='079 000 00 00', team='U19 Tackle',
+                is_admin=is_admin)
+
+def test_cursor_round_trip():
+    values = [3, time(18, 30), 17]
+    
+    assert decode_cursor(encode_cursor(values), TRAINING_PLAN_SORT_KEYS) == values
+    assert decode_cursor(encode_cursor([None, 5]), COACH_SORT_KEYS) == [None, 5]
+    date_keys = [(TrainingPlan.start_date, False), (TrainingPlan.id, False)]
+    assert decode_cursor(encode_cursor([date(2024, 2, 29), 1]), date_keys) == [date(2024, 2, 29), 1]
+
+@pytest.mark.parametrize('cursor', [
+    None, '', 'kein-base64!', encode_cursor(['Anna']), encode_cursor({'id': 1}),
+    encode_cursor([1, 'x', 2]), encode_cursor(['Anna', 'keine-zahl'])
+])
+def test_invalid_cursor_starts_from_the_beginning(cursor):
+    assert decode_cursor(cursor, COACH_SORT_KEYS) is None
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_pages_with_null_values_match_single_sorted_list(app, descending):
+    names = ['Cora Test', None, 'Anna Test', None, 'Beat Test', 'Anna Test', None]
+    sort_keys = [(User.full_name, descending), (User.id, descending)]
+    with app.app_context():
+        db.session.add_all([make_user(number, name) for number, name in enumerate(names)])
+        db.session.commit()
+        expected = [user.id for user in keyset_query(User.query, sort_keys)]
+        
+        walked = []
+        cursor = None
+        while True:
+            page = paginate_keyset(User.query, sort_keys, cursor, per_page=2)
+            walked += [user.id for user in page.items]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+    
+    assert walked == expected
+    assert len(walked) == len(names)
+
+def test_coaches_json_pages(app, client, login):
+    with app.app_context():
+        admin = make_user(0, 'Admin Test', is_admin=True)
+        db.session.add(admin)
+        db.session.add_all([make_user(number, f'Coach {number:02d}') for number in range(1, 6)])
+        db.session.commit()
+        login(admin.id)
+    
+    names = []
+    cursor = ''
+    while True:
+        data = client.get(f'/coaches?format=json&per_page=2&cursor={cursor}').get_json()
+        assert len(data['items']) <= 2
+        names += [item['full_name'] for item in data['items']]
+        assert data['has_next'] == (data['next_cursor'] is not None)
+        if not data['has_next']:
+            break
+        cursor = data['next_cursor']
+    
+    assert names == [f'Coach {number:02d}' for number in range(1, 6)]
+    assert set(data['items'][0]) == {'id', 'full_name', 'email', 'team', 'mobile_phone',
+                                     'certificate_count', 'experience_years'}
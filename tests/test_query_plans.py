@@ -0,0 +1,21 @@
+"""
+Die häufigsten Abfragen dürfen keine Tabelle ohne Index vollständig lesen
+(entspricht "flask sqlite explain")
+"""
+from app.query_plans import check_query_plans, find_full_scans
+
+def test_hot_queries_use_indexes(app):
+    with app.app_context():
+        results = check_query_plans()
+    assert results
+    regressions = {result['name']: result['plan'] for result in results if result['regressions']}
+    assert regressions == {}
+
+def test_index_scan_inside_materialize_is_a_full_scan():
+    rows = [
+        (2, 0, 'MATERIALIZE anon_1'),
+        (5, 2, 'SCAN certificates USING COVERING INDEX ix_certificates_user_id'),
+        (20, 0, 'SCAN users USING INDEX ix_users_full_name'),
+        (25, 0, 'SEARCH anon_1 USING AUTOMATIC COVERING INDEX (user_id=?) LEFT-JOIN')
+    ]
+    assert find_full_scans(rows) == ['certificates']
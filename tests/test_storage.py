@@ -0,0 +1,90 @@
+"""
+Inhaltsadressierte Ablage: Referenzzählung, Freigabe und Garbage Collection
+"""
+from datetime import date
+from app import db
+from app.models import User, Certificate
+from app.storage import _store_stream, collect_garbage, file_url_to_path, release_certificate_file, TEMP_PREFIX
+import io
+import os
+import time
+
+def store(content):
+    return _store_stream(io.BytesIO(content), '.pdf')
+
+def make_old(path, seconds=2 * 3600):
+    """Setzt die Änderungszeit zurück (älter als die Karenzzeit von 1 Stunde)"""
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+def add_certificate(file_url):
+    user = User.query.first()
+    if user is None:
+        user = User(email='coach@example.com', full_name='Coach Test')
+        db.session.add(user)
+        db.session.flush()
+    cert = Certificate(user_id=user.id, title='Trainer', organization='SAFV',
+                       acquisition_date=date(2024, 1, 1), file_url=file_url)
+    db.session.add(cert)
+    db.session.commit()
+    return cert
+
+def test_shared_file_is_deleted_with_last_reference(app):
+    with app.app_context():
+        first_url = store(b'same content')
+        second_url = store(b'same content')
+        assert first_url == second_url
+        path = file_url_to_path(first_url)
+        first = add_certificate(first_url)
+        second = add_certificate(second_url)
+        make_old(path)
+        
+        db.session.delete(first)
+        db.session.commit()
+        assert release_certificate_file(first_url) is False
+        assert os.path.exists(path)
+        
+        db.session.delete(second)
+        db.session.commit()
+        assert release_certificate_file(second_url) is True
+        assert not os.path.exists(path)
+
+def test_release_keeps_recently_touched_file(app):
+    with app.app_context():
+        file_url = store(b'content')
+        path = file_url_to_path(file_url)
+        make_old(path)
+        
+        # Gleichzeitiger Upload desselben Inhalts, Zertifikat noch nicht committet
+        assert store(b'content') == file_url
+        assert release_certificate_file(file_url) is False
+        assert os.path.exists(path)
+        
+        # Nach der Karenzzeit räumt die Garbage Collection die Datei ab
+        assert collect_garbage()['files'] == 0
+        make_old(path)
+        assert collect_garbage()['files'] == 1
+        assert not os.path.exists(path)
+
+def test_collect_garbage_keeps_referenced_and_recent_files(app):
+    with app.app_context():
+        referenced_path = file_url_to_path(store(b'referenced'))
+        add_certificate(store(b'referenced'))
+        orphan_path = file_url_to_path(store(b'orphan'))
+        recent_path = file_url_to_path(store(b'recent'))
+        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{TEMP_PREFIX}abandoned')
+        with open(temp_path, 'wb') as f:
+            f.write(b'partial')
+        for path in (referenced_path, orphan_path, temp_path):
+            make_old(path)
+        
+        assert collect_garbage(dry_run=True) == {'files': 2, 'bytes': len(b'orphan') + len(b'partial')}
+        assert os.path.exists(orphan_path)
+        
+        assert collect_garbage() == {'files': 2, 'bytes': len(b'orphan') + len(b'partial')}
+        assert os.path.exists(referenced_path)
+        assert os.path.exists(recent_path)
+        assert not os.path.exists(orphan_path)
+        assert not os.path.exists(temp_path)
+        # Leeres Hash-Verzeichnis wurde entfernt
+        assert not os.path.exists(os.path.dirname(orphan_path))
@@ -0,0 +1,29 @@
+"""
+Ein gelöschter Benutzer im User-Cache wird ausgeloggt statt einen Fehler auszulösen
+"""
+from datetime import date
+from sqlalchemy import delete
+from app import db
+from app.models import User
+
+def test_deleted_cached_user_is_logged_out(app, client, login):
+    with app.app_context():
+        user = User(email='coach@example.com', first_name='Coach', last_name='Test', full_name='Coach Test',
+                    birth_date=date(1990, 1, 1), address='Teststrasse 1', zip_code='3000', city='Bern',
+                    mobile_phone='079 000 00 00', team='U19 Tackle')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    login(user_id)
+    assert client.get('/dashboard').status_code == 200
+    
+    # Bulk-Delete ohne ORM-Events (wie beim Restore): der Cache-Eintrag bleibt bestehen
+    with app.app_context():
+        db.session.execute(delete(User).where(User.id == user_id))
+        db.session.commit()
+    
+    response = client.get('/dashboard')
+    assert response.status_code == 302
+    assert '/auth/login' in response.headers['Location']
+    with client.session_transaction() as session:
+        assert '_user_id' not in session
@@ -0,0 +1,47 @@
+"""
+Circuit Breaker der Zitadel-Aufrufe (pro Endpoint)
+"""
+from app import zitadel_http
+from app.zitadel_http import guarded_call, ZitadelUnavailableError
+import pytest
+import requests
+
+@pytest.fixture
+def breakers(app, monkeypatch):
+    monkeypatch.setattr(zitadel_http, '_breakers', {})
+    monkeypatch.setattr(zitadel_http, '_metrics', {})
+    app.config['ZITADEL_CIRCUIT_FAILURES'] = 2
+    with app.app_context():
+        yield zitadel_http._breakers
+
+def fail(endpoint, error):
+    with pytest.raises(type(error)):
+        with guarded_call(endpoint):
+            raise error
+
+def test_every_exception_counts_as_failure(breakers):
+    fail('token', ValueError('ungültige Antwort'))
+    fail('token', requests.exceptions.ConnectionError('keine Verbindung'))
+    
+    assert breakers['token'].state == 'open'
+    with pytest.raises(ZitadelUnavailableError):
+        with guarded_call('token'):
+            pass
+
+def test_client_errors_do_not_open_the_breaker(breakers):
+    response = requests.Response()
+    response.status_code = 404
+    for attempt in range(3):
+        fail('userinfo', requests.exceptions.HTTPError('nicht gefunden', response=response))
+    
+    assert breakers['userinfo'].state == 'closed'
+
+def test_breakers_are_separate_per_endpoint(breakers):
+    fail('userinfo', requests.exceptions.Timeout('Timeout'))
+    fail('userinfo', requests.exceptions.Timeout('Timeout'))
+    
+    with guarded_call('token'):
+        pass
+    assert breakers['userinfo'].state == 'open'
+    assert breakers['token'].state == 'closed'
+    assert zitadel_http.get_metrics()['circuit'] == {'userinfo': 'open', 'token': 'closed'}